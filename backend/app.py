@@ -1,23 +1,41 @@
 import os
+import atexit
+import hmac
+import html
 import logging
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import torch
 import numpy as np
 import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 
-from models.hoax_detector import HoaxDetector
+from models.model_manager import ModelManager
 from models.text_processor import TextProcessor
-from utils.scraper import ArticleScraper
-from utils.database import Database
+from utils.scraper import ArticleScraper, canonicalize_url, parse_article_html
+from utils.extraction_pool import ExtractionPool
+from utils.host_health import HostHealthTracker, CircuitOpenError
+from utils.database import Database, RetentionJob, EXPORT_COLUMNS, SNIPPET_MARKER_CHARS
+from utils.archive import PredictionArchiver
+from utils.export import EXPORT_FORMATS, stream_export
+from utils.batch import predict_chunk, predict_texts, result_record
+from utils.jobs import JobQueue, FINISHED
+from utils.limiter_storage import SQLiteStorage  # registers the sqlite:// storage scheme
+from utils.profiling import RequestProfiler
+from utils.admission import AdmissionController, AdmissionRejected, INTERACTIVE, BATCH
+from utils.singleflight import SingleFlight, SingleFlightTimeout, text_key
+from utils.json_provider import dumps, get_json_provider
+from utils.compression import choose_encoding, compress, is_compressible
+from utils.metrics import (stage, start_timings, get_timings, stop_timings, render_metrics,
+                           BATCH_SIZE, EVENTS, REQUEST_SECONDS)
 
 # Load environment variables
 load_dotenv()
@@ -31,56 +49,535 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['JSON_SORT_KEYS'] = False
+
+# orjson-backed JSON (with NumPy support) unless JSON_PROVIDER=stdlib; keys
+# keep their insertion order
+app.json = get_json_provider(os.getenv('JSON_PROVIDER', 'orjson'))(app)
+
+# Complete (non-streamed) responses of at least this many bytes are gzip or
+# brotli compressed when the client accepts it; 0 disables compression
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+
+# Uploads (/api/batch, /api/jobs) larger than this are refused with 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 100)) * 1024 * 1024
 
 # Configure CORS
 CORS(app, origins=os.getenv('ALLOWED_ORIGINS', '*').split(','))
 
-# Configure rate limiting
+# Configure rate limiting; set RATELIMIT_STORAGE_URI=sqlite:///data/ratelimits.db
+# (the gunicorn.conf.py default) to share counters between worker processes
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+)
+
+# Rows per inference batch when processing /api/batch uploads
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 64))
+
+# Limits of one /api/predict/batch request: model tokens across all items,
+# and URLs fetched (their text is only known after fetching)
+MULTI_PREDICT_MAX_TOKENS = int(os.getenv('MULTI_PREDICT_MAX_TOKENS', 16384))
+MULTI_PREDICT_MAX_URLS = int(os.getenv('MULTI_PREDICT_MAX_URLS', 10))
+
+# Optional outputs a prediction request can select with "fields" (the label is
+# always returned); keywords are only extracted when selected
+PREDICT_FIELDS = ('confidence', 'probabilities', 'rationale', 'keywords', 'text')
+
+# Opt-in request profiling (PROFILE_DIR, PROFILE_ADMIN_TOKEN, PROFILE_SAMPLE_RATE);
+# None unless configured
+profiler = RequestProfiler.from_env()
+
+# Load shedding for inference: requests whose predicted queue wait
+# exceeds their class's share of the SLO get a 503 (batch traffic first)
+admission = AdmissionController(
+    slo_seconds=float(os.getenv('ADMISSION_SLO_SECONDS', 2.0)),
+    concurrency=int(os.getenv('ADMISSION_CONCURRENCY', 1)),
+    shares={INTERACTIVE: 1.0, BATCH: float(os.getenv('ADMISSION_BATCH_SHARE', 0.5))},
+    degrade_at=float(os.getenv('ADMISSION_DEGRADE_AT', 0.75))
 )
 
+# Concurrent /api/predict requests for the same URL or text share one
+# scrape and one inference instead of repeating them
+SINGLEFLIGHT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_TIMEOUT', 30))
+scrape_flight = SingleFlight('scrape', timeout=SINGLEFLIGHT_TIMEOUT)
+predict_flight = SingleFlight('predict', timeout=SINGLEFLIGHT_TIMEOUT)
+
+# Token for POST /api/admin/model/reload (the endpoint is disabled without one);
+# with MODEL_WATCH_INTERVAL > 0 the model also reloads when its files change
+MODEL_ADMIN_TOKEN = os.getenv('MODEL_ADMIN_TOKEN')
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))
+
+# Reloads requested from one gunicorn worker reach the others through this
+# file, which every worker checks every MODEL_RELOAD_POLL_INTERVAL seconds
+MODEL_RELOAD_FILE = os.getenv('MODEL_RELOAD_FILE',
+                              os.path.join(os.path.dirname(__file__), 'data', 'model_reload'))
+MODEL_RELOAD_POLL_INTERVAL = float(os.getenv('MODEL_RELOAD_POLL_INTERVAL', 2))
+
+# Uploads and results of /api/jobs batch jobs (processed by worker.py)
+JOB_STORAGE_DIR = os.getenv('JOB_STORAGE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'jobs'))
+
+# Completed, failed and cancelled jobs are deleted with their files after this
+# many days by the retention job; 0 keeps them
+JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', 7))
+
 # Initialize components
-hoax_detector = None
+model_manager = None
 text_processor = None
 article_scraper = None
+extraction_pool = None
 database = None
+retention_job = None
+job_queue = None
 
 def initialize_components():
     """Initialize all components on startup"""
-    global hoax_detector, text_processor, article_scraper, database
+    global model_manager, text_processor, article_scraper, extraction_pool, database, retention_job, job_queue
     
     try:
         logger.info("Initializing components...")
         
+        # Start HTML extraction workers before the model is loaded
+        extraction_workers = int(os.getenv('EXTRACTION_WORKERS', 2))
+        if extraction_workers > 0:
+            extraction_pool = ExtractionPool(
+                parse_article_html,
+                workers=extraction_workers,
+                max_queue=int(os.getenv('EXTRACTION_MAX_QUEUE', 16)),
+                task_timeout=float(os.getenv('EXTRACTION_TIMEOUT', 5)),
+                max_tasks_per_worker=int(os.getenv('EXTRACTION_MAX_TASKS', 200)),
+                max_rss_mb=int(os.getenv('EXTRACTION_MAX_RSS_MB', 512))
+            )
+            atexit.register(extraction_pool.shutdown)
+            logger.info("Extraction pool initialized")
+        
         # Initialize text processor
         text_processor = TextProcessor()
         logger.info("Text processor initialized")
         
-        # Initialize hoax detector
+        # Initialize hoax detector; reloads swap in a new model without downtime
         model_path = os.getenv('MODEL_PATH', 'models/hoax_model')
-        hoax_detector = HoaxDetector(model_path)
-        logger.info("Hoax detector initialized")
+        model_manager = ModelManager(model_path, generation_path=MODEL_RELOAD_FILE)
+        model_manager.load()
+        watch_interval = MODEL_RELOAD_POLL_INTERVAL
+        if MODEL_WATCH_INTERVAL > 0:
+            watch_interval = min(watch_interval, MODEL_WATCH_INTERVAL)
+        model_manager.watch(watch_interval, files=MODEL_WATCH_INTERVAL > 0)
+        atexit.register(model_manager.stop)
+        logger.info(f"Hoax detector initialized (version {model_manager.version})")
         
         # Initialize article scraper
-        article_scraper = ArticleScraper()
+        host_health = HostHealthTracker(
+            failure_threshold=int(os.getenv('SCRAPER_FAILURE_THRESHOLD', 5)),
+            open_seconds=float(os.getenv('SCRAPER_CIRCUIT_OPEN_SECONDS', 30)),
+            max_timeout=float(os.getenv('SCRAPER_MAX_TIMEOUT', 10))
+        )
+        article_scraper = ArticleScraper(extraction_pool=extraction_pool, host_health=host_health)
         logger.info("Article scraper initialized")
         
         # Initialize database
-        database = Database()
+        database = Database(pool_size=int(os.getenv('DB_POOL_SIZE', 4)))
+        if os.getenv('DB_WRITE_BEHIND', '1') != '0':
+            database.enable_write_behind(
+                batch_size=int(os.getenv('DB_WRITE_BATCH_SIZE', 100)),
+                flush_interval=float(os.getenv('DB_WRITE_FLUSH_INTERVAL', 1.0)),
+                max_queue=int(os.getenv('DB_WRITE_MAX_QUEUE', 10000))
+            )
+        atexit.register(database.close)
         logger.info("Database initialized")
         
+        # Batch jobs are queued here and run by separate worker processes
+        job_queue = JobQueue(
+            database,
+            JOB_STORAGE_DIR,
+            stale_seconds=float(os.getenv('JOB_STALE_SECONDS', 120))
+        )
+        logger.info("Job queue initialized")
+        
+        # Apply the retention policy in the background, in small batches
+        # (aged predictions are moved to Parquet first when ARCHIVE_DIR is set);
+        # finished batch jobs are deleted after JOB_RETENTION_DAYS
+        retention_days = os.getenv('RETENTION_DAYS')
+        if retention_days or JOB_RETENTION_DAYS > 0:
+            archive_dir = os.getenv('ARCHIVE_DIR')
+            retention_job = RetentionJob(
+                database,
+                days=int(retention_days) if retention_days else None,
+                interval_seconds=float(os.getenv('RETENTION_INTERVAL_SECONDS', 3600)),
+                batch_size=int(os.getenv('RETENTION_BATCH_SIZE', 1000)),
+                archiver=PredictionArchiver(database, archive_dir) if archive_dir and retention_days else None,
+                # One gunicorn worker runs it; the others stand by
+                lock_path=f'{database.db_path}.retention.lock',
+                job_queue=job_queue if JOB_RETENTION_DAYS > 0 else None,
+                job_days=JOB_RETENTION_DAYS
+            )
+            atexit.register(retention_job.stop)
+            logger.info(f"Retention job started (records: {retention_days or 'kept'} days, "
+                        f"jobs: {JOB_RETENTION_DAYS or 'kept'} days)")
+        
         logger.info("All components initialized successfully")
         
     except Exception as e:
         logger.error(f"Failed to initialize components: {e}")
         raise
 
-# Initialize components on startup
-initialize_components()
+# Initialize components on startup (skipped in extraction workers, which
+# re-import this module as __mp_main__ when it is run directly)
+if __name__ != '__mp_main__':
+    initialize_components()
+
+def validate_text_length(text: str) -> Optional[str]:
+    """Return an error message if the text is too short or too long for the model"""
+    if len(text) > 4096:
+        return 'Text too long. Maximum 4096 characters allowed.'
+    if len(text) < 10:
+        return 'Text too short. Minimum 10 characters required.'
+    return None
+
+def analyze_text(text: str, top_k: int = 5) -> Dict:
+    """
+    Clean, classify and extract keywords from a validated text
+    
+    Runs the models synchronously; the ASGI server calls it on its
+    inference executor.
+    
+    Returns:
+        Dictionary with processed_text, prediction, keywords and model_version
+    """
+    with stage('clean_text'):
+        processed_text = text_processor.clean_text(text)
+    
+    with model_manager.acquire() as model, torch.no_grad():
+        prediction = model.detector.predict(processed_text)
+    
+    keywords = []
+    if top_k > 0:
+        with stage('keywords'):
+            keywords = text_processor.extract_keywords(processed_text, top_k=top_k)
+    
+    return {
+        'processed_text': processed_text,
+        'prediction': prediction,
+        'keywords': keywords,
+        'model_version': model.version
+    }
+
+def analyze_admitted(text: str, keywords: bool = True) -> Dict:
+    """
+    Analyze a text as interactive work under admission control
+    
+    Args:
+        text: Validated input text
+        keywords: Whether to extract keywords
+    
+    Returns:
+        analyze_text() result plus "degraded" (requested keywords were skipped under load)
+        
+    Raises:
+        AdmissionRejected: If the server is too loaded to meet the latency SLO
+    """
+    with admission.admit(INTERACTIVE) as ticket:
+        analysis = analyze_text(text, top_k=5 if keywords and not ticket.degraded else 0)
+    analysis['degraded'] = keywords and ticket.degraded
+    return analysis
+
+def analysis_key(text: str, fields: Optional[frozenset]) -> str:
+    """Coalescing key of a prediction; requests with and without keywords differ"""
+    return text_key(text) if wants_field(fields, 'keywords') else text_key(text) + ':label'
+
+def parse_fields(data, args) -> Tuple[Optional[frozenset], Optional[str]]:
+    """
+    Read the optional output selection of a prediction request
+    
+    "fields" is a list or a comma-separated string in the JSON body or the
+    query string, e.g. "label" or "probabilities,keywords".
+    
+    Returns:
+        (None, None) if every output is wanted, (fields, None) for a
+        selection, or (None, error message) if it is invalid
+    """
+    value = data.get('fields') if isinstance(data, dict) else None
+    if value is None:
+        value = args.get('fields')
+    if value is None:
+        return None, None
+    
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(field, str) for field in value):
+        return None, 'fields must be a list or a comma-separated string'
+    
+    fields = frozenset(field.strip() for field in value if field.strip()) - {'label'}
+    unknown = fields.difference(PREDICT_FIELDS)
+    if unknown:
+        return None, f"Unknown fields: {', '.join(sorted(unknown))} (allowed: label, {', '.join(PREDICT_FIELDS)})"
+    return fields, None
+
+def wants_field(fields: Optional[frozenset], name: str) -> bool:
+    """Whether an optional output was selected (all are without a selection)"""
+    return fields is None or name in fields
+
+def format_prediction(prediction: Dict, fields: Optional[frozenset] = None) -> Dict:
+    """The "prediction" object of a response, limited to the selected fields"""
+    formatted = {'label': prediction['label']}
+    if wants_field(fields, 'confidence'):
+        formatted['confidence'] = prediction['confidence']
+    if wants_field(fields, 'probabilities'):
+        formatted['probabilities'] = {
+            'hoax': prediction['probabilities']['hoax'],
+            'faktual': prediction['probabilities']['faktual']
+        }
+    return formatted
+
+def build_prediction_response(request_id: str, text: str, analysis: Dict, start_time: float,
+                              fields: Optional[frozenset] = None) -> Dict:
+    """Build the /api/predict response body with the selected fields"""
+    processed_text = analysis['processed_text']
+    prediction = analysis['prediction']
+    
+    response = {'request_id': request_id}
+    if wants_field(fields, 'text'):
+        response['input_text'] = text[:200] + '...' if len(text) > 200 else text
+        response['processed_text'] = processed_text[:200] + '...' if len(processed_text) > 200 else processed_text
+    response['prediction'] = format_prediction(prediction, fields)
+    if wants_field(fields, 'keywords'):
+        response['keywords'] = analysis['keywords']
+    if wants_field(fields, 'rationale'):
+        response['rationale'] = prediction.get('rationale', '')
+    response['model_version'] = analysis['model_version']
+    response['processing_time'] = round(time.time() - start_time, 3)
+    return response
+
+def parse_predict_items(data) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """
+    Validate the body of a /api/predict/batch request
+    
+    Returns:
+        (items, None) with one {"id", "text", "url"} dict per item, or
+        (None, error message) if the body itself is malformed
+    """
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, 'items must be a non-empty list'
+    
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {'text': item}
+        if not isinstance(item, dict):
+            return None, f'items[{index}] must be an object or a string'
+        
+        text = item.get('text') or ''
+        url = item.get('url') or ''
+        if not isinstance(text, str) or not isinstance(url, str):
+            return None, f'items[{index}]: text and url must be strings'
+        
+        parsed.append({
+            'id': str(item.get('id', index)),
+            'text': text.strip(),
+            'url': url.strip()
+        })
+    
+    ids = [item['id'] for item in parsed]
+    if len(set(ids)) != len(ids):
+        return None, 'Item ids must be unique'
+    
+    if sum(1 for item in parsed if item['url']) > MULTI_PREDICT_MAX_URLS:
+        return None, f'At most {MULTI_PREDICT_MAX_URLS} URL items allowed per request'
+    
+    return parsed, None
+
+def token_limit_exceeded(total_tokens: int):
+    """413 response for a /api/predict/batch request over its token budget"""
+    return jsonify({
+        'error': f'Request too large: {total_tokens} tokens, maximum {MULTI_PREDICT_MAX_TOKENS}',
+        'total_tokens': total_tokens,
+        'max_tokens': MULTI_PREDICT_MAX_TOKENS
+    }), 413
+
+def process_batch_chunk(chunk: pd.DataFrame) -> List[Dict]:
+    """Predict one chunk of a batch CSV with the loaded models"""
+    # Counted as backlog, but never rejected once the batch has started;
+    # a model reload takes effect from the next chunk
+    with admission.admit(BATCH, len(chunk), force=True), model_manager.acquire() as model:
+        return predict_chunk(chunk, model.detector, text_processor)
+
+def coalesce_timeout(e: SingleFlightTimeout):
+    """504 response for a request that gave up waiting on an identical one"""
+    return jsonify({'error': str(e)}), 504
+
+def overloaded(e: AdmissionRejected):
+    """503 response for a request shed by the admission controller"""
+    error_response = jsonify({
+        'error': 'Server overloaded, please retry later',
+        'retry_after': e.retry_after
+    })
+    error_response.headers['Retry-After'] = str(e.retry_after)
+    return error_response, 503
+
+class BatchCsvError(Exception):
+    """Raised when a chunk after the first of a batch CSV cannot be parsed"""
+    
+    def __init__(self, row: int, error: Exception):
+        super().__init__(f"Malformed CSV from row {row}: {error}")
+        self.row = row
+    
+    def to_result(self) -> Dict:
+        """Error row for the batch results; rows from here on are not processed"""
+        return {'row': self.row, 'error': str(self)}
+
+class BatchProgress:
+    """Turns per-chunk /api/batch results into NDJSON records"""
+    
+    def __init__(self):
+        self.start_time = time.time()
+        self.processed = 0
+        self.errors = 0
+    
+    def chunk_lines(self, results: List[Dict]) -> List[Dict]:
+        """Row records (type "result" or "error") for a chunk, then a "progress" record"""
+        lines = []
+        for result in results:
+            self.errors += 'error' in result
+            lines.append(result_record(result))
+        
+        self.processed += len(results)
+        lines.append({'type': 'progress', 'processed': self.processed, 'errors': self.errors,
+                      'elapsed': round(time.time() - self.start_time, 3)})
+        return lines
+    
+    def error_line(self, e: BatchCsvError) -> Dict:
+        """Error record for a chunk that could not be read; the summary follows"""
+        self.errors += 1
+        return result_record(e.to_result())
+    
+    def summary(self) -> Dict:
+        """Final "summary" record"""
+        return {'type': 'summary', 'message': f'Processed {self.processed} rows',
+                'processed': self.processed, 'errors': self.errors,
+                'elapsed': round(time.time() - self.start_time, 3)}
+
+def iter_batch_lines(chunks: Iterable[pd.DataFrame]) -> Iterator[str]:
+    """Process batch CSV chunks lazily, yielding NDJSON lines as each chunk finishes"""
+    progress = BatchProgress()
+    try:
+        for chunk in chunks:
+            for line in progress.chunk_lines(process_batch_chunk(chunk)):
+                yield dumps(line) + '\n'
+    except BatchCsvError as e:
+        yield dumps(progress.error_line(e)) + '\n'
+    yield dumps(progress.summary()) + '\n'
+
+def read_batch_csv(file) -> Optional[Iterator[pd.DataFrame]]:
+    """
+    Open a batch CSV as an iterator of chunks
+    
+    The first chunk is read up front so a missing "text" column is
+    reported before any output is streamed. Later chunks that cannot be
+    parsed raise BatchCsvError from the iterator.
+    
+    Returns:
+        Chunk iterator, or None if the CSV has no "text" column
+        
+    Raises:
+        BatchCsvError: If the first chunk cannot be parsed
+    """
+    reader = pd.read_csv(file, chunksize=BATCH_CHUNK_SIZE)
+    try:
+        first = next(reader, None)
+    except ValueError as e:
+        raise BatchCsvError(1, e) from e
+    if first is None or 'text' not in first.columns:
+        return None
+    return _checked_chunks(reader, first)
+
+def _checked_chunks(reader, first: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """Yield CSV chunks, turning parse errors into BatchCsvError"""
+    yield first
+    rows = len(first)
+    while True:
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            return
+        except ValueError as e:
+            # pandas ParserError and UnicodeDecodeError are ValueErrors
+            raise BatchCsvError(rows + 1, e) from e
+        rows += len(chunk)
+        yield chunk
+
+def wants_timings(data) -> bool:
+    """Whether a prediction request asked for a per-stage timing breakdown"""
+    return request.args.get('timings') in ('1', 'true') or data.get('timings') is True
+
+def wants_ndjson(args, accept: str) -> bool:
+    """Whether a batch request asked for streamed NDJSON instead of one JSON document"""
+    return args.get('format') == 'ndjson' or 'application/x-ndjson' in (accept or '')
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Timing breakdowns are opt-in per request; do not inherit one from a previous request
+    stop_timings()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+            time.perf_counter() - start
+        )
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress large complete responses by Accept-Encoding; streamed ones are left alone"""
+    if (not COMPRESS_MIN_BYTES or response.is_streamed or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or not is_compressible(response.mimetype)
+            or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# Profiling hooks are only installed when a profiler is configured
+if profiler:
+    @app.before_request
+    def start_profile():
+        mode = profiler.select_mode(request.headers)
+        if mode:
+            # Profiling must never fail the request; serve it unprofiled instead
+            try:
+                g.profile = profiler.start(mode, f"{request.endpoint}-{uuid.uuid4().hex[:8]}")
+            except Exception as e:
+                logger.error(f"Failed to start {mode} profile: {e}")
+    
+    @app.after_request
+    def add_profile_header(response):
+        handle = g.get('profile')
+        if handle:
+            response.headers['X-Profile-Id'] = handle['id']
+        return response
+    
+    @app.teardown_request
+    def stop_profile(exc):
+        handle = g.pop('profile', None)
+        if handle:
+            profiler.stop(handle)
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Prometheus metrics, aggregated across worker processes"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -89,11 +586,13 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'components': {
-            'hoax_detector': hoax_detector is not None,
+            'hoax_detector': model_manager is not None,
             'text_processor': text_processor is not None,
             'article_scraper': article_scraper is not None,
             'database': database is not None
-        }
+        },
+        'model': model_manager.get_status() if model_manager else None,
+        'admission': admission.get_stats()
     })
 
 @app.route('/api/predict', methods=['POST'])
@@ -109,6 +608,13 @@ def predict():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        fields, error = parse_fields(data, request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if wants_timings(data):
+            start_timings()
+        
         text = data.get('text', '').strip()
         url = data.get('url', '').strip()
         
@@ -118,63 +624,213 @@ def predict():
         # Extract text from URL if provided
         if url:
             try:
-                extracted_text = article_scraper.extract_text(url)
+                with stage('scrape'):
+                    extracted_text = scrape_flight.do(canonicalize_url(url),
+                                                      lambda: article_scraper.extract_text(url))
                 if not extracted_text:
                     return jsonify({'error': 'Failed to extract text from URL'}), 400
                 text = extracted_text
+            except CircuitOpenError as e:
+                EVENTS.labels('circuit_open').inc()
+                error_response = jsonify({'error': f'Source temporarily unavailable: {str(e)}'})
+                error_response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+                return error_response, 503
+            except SingleFlightTimeout as e:
+                return coalesce_timeout(e)
             except Exception as e:
                 logger.error(f"URL scraping failed: {e}")
                 return jsonify({'error': f'Failed to extract text from URL: {str(e)}'}), 400
         
         # Validate text length
-        if len(text) > 4096:
-            return jsonify({'error': 'Text too long. Maximum 4096 characters allowed.'}), 400
+        error = validate_text_length(text)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if len(text) < 10:
-            return jsonify({'error': 'Text too short. Minimum 10 characters required.'}), 400
+        # Process text, predict and extract keywords (only if selected, and
+        # skipped when degraded); identical texts already being analyzed share that result
+        try:
+            analysis = predict_flight.do(analysis_key(text, fields),
+                                         lambda: analyze_admitted(text, wants_field(fields, 'keywords')))
+        except AdmissionRejected as e:
+            return overloaded(e)
+        except SingleFlightTimeout as e:
+            return coalesce_timeout(e)
         
-        # Process text
-        processed_text = text_processor.clean_text(text)
+        response = build_prediction_response(request_id, text, analysis, start_time, fields)
+        if analysis['degraded']:
+            response['degraded'] = True
+        prediction = analysis['prediction']
         
-        # Get prediction
-        with torch.no_grad():
-            prediction = hoax_detector.predict(processed_text)
+        # Log request
+        logger.info(f"Request {request_id} completed in {response['processing_time']}s")
         
-        # Extract keywords
-        keywords = text_processor.extract_keywords(processed_text, top_k=5)
+        # Queue for a batched write in the background
+        if database:
+            with stage('db_write'):
+                database.queue_prediction(
+                    request_id=request_id,
+                    input_text=text,
+                    predicted_label=prediction['label'],
+                    confidence=prediction['confidence'],
+                    processing_time=response['processing_time'],
+                    model_version=analysis['model_version']
+                )
         
-        # Prepare response
-        response = {
+        timings = get_timings()
+        if timings is not None:
+            response['timings'] = timings
+        
+        with stage('serialize'):
+            return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Request {request_id} failed: {e}")
+        return jsonify({
+            'error': 'Internal server error',
             'request_id': request_id,
-            'input_text': text[:200] + '...' if len(text) > 200 else text,
-            'processed_text': processed_text[:200] + '...' if len(processed_text) > 200 else processed_text,
-                         'prediction': {
-                 'label': prediction['label'],
-                 'confidence': float(prediction['confidence']),
-                 'probabilities': {
-                     'hoax': float(prediction['probabilities']['hoax']),
-                     'faktual': float(prediction['probabilities']['faktual'])
-                 }
-             },
-            'keywords': keywords,
-            'rationale': prediction.get('rationale', ''),
             'processing_time': round(time.time() - start_time, 3)
-        }
+        }), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+def predict_many():
+    """Predict a list of texts or URLs in one request, batched through the model"""
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+    
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
         
-        # Log request
-        logger.info(f"Request {request_id} completed in {response['processing_time']}s")
+        items, error = parse_predict_items(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        fields, error = parse_fields(data, request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if wants_timings(data):
+            start_timings()
+        BATCH_SIZE.labels('multi_predict').observe(len(items))
+        
+        try:
+            top_k = int(data.get('top_k', 5)) if data.get('keywords', True) else 0
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_k must be an integer'}), 400
+        top_k = max(0, min(top_k, 10)) if wants_field(fields, 'keywords') else 0
+        
+        results = {}
+        
+        def check_length(item):
+            error = validate_text_length(item['text'])
+            if error:
+                results[item['id']] = {'id': item['id'], 'error': error}
+                return False
+            return True
+        
+        def count_tokens(batch):
+            with stage('clean_text'):
+                for item in batch:
+                    item['processed_text'] = text_processor.clean_text(item['text'])
+            with stage('count_tokens'), model_manager.acquire() as model:
+                counts = model.detector.count_tokens([item['processed_text'] for item in batch])
+            for item, tokens in zip(batch, counts):
+                item['tokens'] = tokens
+            return sum(counts)
+        
+        # Check the budget on the inline texts before fetching any URL
+        valid = [item for item in items if not item['url'] and check_length(item)]
+        total_tokens = count_tokens(valid) if valid else 0
+        if total_tokens > MULTI_PREDICT_MAX_TOKENS:
+            return token_limit_exceeded(total_tokens)
+        
+        fetched = []
+        for item in items:
+            if not item['url']:
+                continue
+            try:
+                with stage('scrape'):
+                    item['text'] = (article_scraper.extract_text(item['url']) or '').strip()
+                if not item['text']:
+                    results[item['id']] = {'id': item['id'], 'error': 'Failed to extract text from URL'}
+                elif check_length(item):
+                    fetched.append(item)
+            except CircuitOpenError as e:
+                EVENTS.labels('circuit_open').inc()
+                results[item['id']] = {'id': item['id'], 'error': f'Source temporarily unavailable: {str(e)}',
+                                       'retry_after': int(e.retry_after) + 1}
+            except Exception as e:
+                logger.error(f"URL scraping failed: {e}")
+                results[item['id']] = {'id': item['id'], 'error': f'Failed to extract text from URL: {str(e)}'}
+        
+        if fetched:
+            total_tokens += count_tokens(fetched)
+            if total_tokens > MULTI_PREDICT_MAX_TOKENS:
+                return token_limit_exceeded(total_tokens)
+            valid.extend(fetched)
+        
+        degraded = False
+        model_version = None
+        stored = []
+        if valid:
+            try:
+                ticket = admission.admit(BATCH, len(valid))
+            except AdmissionRejected as e:
+                return overloaded(e)
+            
+            degraded = ticket.degraded
+            with ticket, model_manager.acquire() as model, torch.no_grad():
+                model_version = model.version
+                analyses = predict_texts([item['processed_text'] for item in valid],
+                                         model.detector, text_processor,
+                                         top_k=0 if degraded else top_k)
+            
+            for item, analysis in zip(valid, analyses):
+                prediction = analysis['prediction']
+                result = {'id': item['id'], 'prediction': format_prediction(prediction, fields)}
+                if wants_field(fields, 'keywords'):
+                    result['keywords'] = analysis['keywords']
+                if wants_field(fields, 'rationale'):
+                    result['rationale'] = prediction.get('rationale', '')
+                result['tokens'] = item['tokens']
+                results[item['id']] = result
+                stored.append((item, prediction))
+        
+        processing_time = round(time.time() - start_time, 3)
+        logger.info(f"Request {request_id} predicted {len(valid)}/{len(items)} items in {processing_time}s")
         
-        # Store in database
         if database:
-            database.store_prediction(
-                request_id=request_id,
-                input_text=text,
-                predicted_label=prediction['label'],
-                confidence=prediction['confidence'],
-                processing_time=response['processing_time']
-            )
+            with stage('db_write'):
+                for item, prediction in stored:
+                    database.queue_prediction(
+                        request_id=f"{request_id}:{item['id']}",
+                        input_text=item['text'],
+                        predicted_label=prediction['label'],
+                        confidence=float(prediction['confidence']),
+                        processing_time=processing_time,
+                        model_version=model_version
+                    )
         
-        return jsonify(response)
+        response = {
+            'request_id': request_id,
+            'results': [results[item['id']] for item in items],
+            'processed': len(valid),
+            'errors': len(items) - len(valid),
+            'total_tokens': total_tokens,
+            'model_version': model_version,
+            'processing_time': processing_time
+        }
+        if degraded:
+            response['degraded'] = True
+        
+        timings = get_timings()
+        if timings is not None:
+            response['timings'] = timings
+        
+        with stage('serialize'):
+            return jsonify(response)
         
     except Exception as e:
         logger.error(f"Request {request_id} failed: {e}")
@@ -231,72 +887,173 @@ def batch_predict():
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'Only CSV files are supported'}), 400
         
-        # Read CSV
-        df = pd.read_csv(file)
-        if 'text' not in df.columns:
+        # Read the CSV in chunks; spooled uploads are not loaded into memory at once
+        try:
+            chunks = read_batch_csv(file.stream)
+        except BatchCsvError as e:
+            return jsonify({'error': str(e)}), 400
+        if chunks is None:
             return jsonify({'error': 'CSV must contain a "text" column'}), 400
         
+        # Shed the batch up front; once it streams its chunks are always run
+        try:
+            admission.check(BATCH)
+        except AdmissionRejected as e:
+            return overloaded(e)
+        
+        if wants_ndjson(request.args, request.headers.get('Accept')):
+            return Response(stream_with_context(iter_batch_lines(chunks)),
+                            mimetype='application/x-ndjson')
+        
+        # Single JSON document, as before
         results = []
-        for idx, row in df.iterrows():
-            try:
-                text = str(row['text']).strip()
-                if len(text) < 10 or len(text) > 4096:
-                    results.append({
-                        'row': idx + 1,
-                        'text': text[:100] + '...' if len(text) > 100 else text,
-                        'error': 'Text length invalid (10-4096 characters)'
-                    })
-                    continue
-                
-                # Process and predict
-                processed_text = text_processor.clean_text(text)
-                with torch.no_grad():
-                    prediction = hoax_detector.predict(processed_text)
-                
-                keywords = text_processor.extract_keywords(processed_text, top_k=3)
-                
-                results.append({
-                    'row': idx + 1,
-                    'text': text[:100] + '...' if len(text) > 100 else text,
-                    'prediction': {
-                        'label': prediction['label'],
-                        'confidence': float(prediction['confidence'])
-                    },
-                    'keywords': keywords
-                })
-                
-            except Exception as e:
-                results.append({
-                    'row': idx + 1,
-                    'text': str(row['text'])[:100] + '...',
-                    'error': str(e)
-                })
+        rows = 0
+        try:
+            for chunk in chunks:
+                results.extend(process_batch_chunk(chunk))
+                rows += len(chunk)
+        except BatchCsvError as e:
+            # Keep the rows already predicted and report where reading stopped
+            results.append(e.to_result())
         
         return jsonify({
-            'message': f'Processed {len(df)} rows',
+            'message': f'Processed {rows} rows',
             'results': results
         })
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         logger.error(f"Batch prediction failed: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a batch prediction job for a CSV file; results are fetched later"""
+    try:
+        if not job_queue:
+            return jsonify({'error': 'Job queue not available'}), 503
+        
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not file.filename.endswith('.csv'):
+            return jsonify({'error': 'Only CSV files are supported'}), 400
+        
+        # Check the header now so a bad file fails here rather than in a worker
+        try:
+            columns = pd.read_csv(file.stream, nrows=0).columns
+        except (ValueError, pd.errors.ParserError):
+            columns = []
+        if 'text' not in columns:
+            return jsonify({'error': 'CSV must contain a "text" column'}), 400
+        file.stream.seek(0)
+        
+        job_id = job_queue.submit(file.stream, filename=file.filename)
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/jobs/{job_id}',
+            'results_url': f'/api/jobs/{job_id}/results'
+        }), 202
+        
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error(f"Job submission failed: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and progress of a batch job"""
+    if not job_queue:
+        return jsonify({'error': 'Job queue not available'}), 503
+    
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running batch job, or delete a finished one with its files"""
+    if not job_queue:
+        return jsonify({'error': 'Job queue not available'}), 503
+    
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job['status'] in FINISHED:
+        if not job_queue.delete(job_id):
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'job_id': job_id, 'status': 'deleted'})
+    
+    if not job_queue.cancel(job_id):
+        # Finished in the meantime; a second DELETE removes it
+        return jsonify({'error': 'Job already finished'}), 409
+    
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Stream a batch job's results as NDJSON (the rows processed so far while it runs)"""
+    if not job_queue:
+        return jsonify({'error': 'Job queue not available'}), 503
+    
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return Response(
+        stream_with_context(job_queue.iter_results(job_id, job['result_bytes'])),
+        mimetype='application/x-ndjson',
+        headers={
+            'X-Job-Status': job['status'],
+            'X-Processed-Rows': str(job['processed_rows'])
+        }
+    )
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Get prediction history"""
+    """Get prediction or feedback history, paginated with an opaque cursor"""
     try:
-        limit = min(int(request.args.get('limit', 50)), 100)
+        limit = max(1, min(int(request.args.get('limit', 50)), 100))
+        history_type = request.args.get('type', 'predictions')
+        
+        if history_type not in ('predictions', 'feedback'):
+            return jsonify({'error': 'type must be "predictions" or "feedback"'}), 400
         
         if database:
-            history = database.get_prediction_history(limit=limit)
+            get_page = (database.get_prediction_page if history_type == 'predictions'
+                        else database.get_feedback_page)
+            try:
+                page = get_page(
+                    limit=limit,
+                    cursor=request.args.get('cursor'),
+                    label=request.args.get('label'),
+                    start=request.args.get('start'),
+                    end=request.args.get('end')
+                )
+            except ValueError as e:
+                return jsonify({'error': f'Invalid pagination parameters: {str(e)}'}), 400
+            
             return jsonify({
-                'history': history,
-                'total': len(history)
+                'history': page['items'],
+                'total': len(page['items']),
+                'next_cursor': page['next_cursor']
             })
         else:
             return jsonify({
                 'history': [],
                 'total': 0,
+                'next_cursor': None,
                 'message': 'Database not available'
             })
             
@@ -304,6 +1061,168 @@ def get_history():
         logger.error(f"History retrieval failed: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/export', methods=['GET'])
+@limiter.limit("5 per minute")
+def export_history():
+    """Stream full prediction or feedback history as NDJSON or CSV"""
+    try:
+        if not database:
+            return jsonify({'error': 'Database not available'}), 503
+        
+        export_type = request.args.get('type', 'predictions')
+        export_format = request.args.get('format', 'ndjson')
+        compress = request.args.get('compress') == 'gzip'
+        
+        if export_type not in EXPORT_COLUMNS:
+            return jsonify({'error': 'type must be "predictions" or "feedback"'}), 400
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be "ndjson" or "csv"'}), 400
+        
+        try:
+            batches = database.iter_export(
+                kind=export_type,
+                label=request.args.get('label'),
+                start=request.args.get('start'),
+                end=request.args.get('end')
+            )
+        except ValueError as e:
+            return jsonify({'error': f'Invalid export parameters: {str(e)}'}), 400
+        
+        # No Content-Length: the body goes out with chunked transfer encoding
+        response = Response(
+            stream_with_context(stream_export(batches, EXPORT_COLUMNS[export_type],
+                                              export_format, compress)),
+            mimetype=EXPORT_FORMATS[export_format]
+        )
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename="{export_type}.{export_format}"'
+        )
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Snippet markers the index strips from stored text; swapped for <mark> after escaping
+SNIPPET_START, SNIPPET_END = SNIPPET_MARKER_CHARS
+
+def _render_snippet(snippet: str) -> str:
+    """HTML-escape a search snippet and highlight its matched terms"""
+    return (html.escape(snippet)
+            .replace(SNIPPET_START, '<mark>')
+            .replace(SNIPPET_END, '</mark>'))
+
+@app.route('/api/search', methods=['GET'])
+@limiter.limit("60 per minute")
+def search_history():
+    """Full-text search over prediction or feedback history"""
+    try:
+        if not database:
+            return jsonify({'error': 'Database not available'}), 503
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        offset = max(0, int(request.args.get('offset', 0)))
+        search_type = request.args.get('type', 'predictions')
+        
+        if search_type not in ('predictions', 'feedback'):
+            return jsonify({'error': 'type must be "predictions" or "feedback"'}), 400
+        
+        try:
+            results = database.search(
+                query,
+                kind=search_type,
+                label=request.args.get('label'),
+                start=request.args.get('start'),
+                end=request.args.get('end'),
+                limit=limit,
+                offset=offset,
+                highlight=(SNIPPET_START, SNIPPET_END)
+            )
+        except ValueError as e:
+            return jsonify({'error': f'Invalid search parameters: {str(e)}'}), 400
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 503
+        
+        for result in results:
+            result['snippet'] = _render_snippet(result['snippet'])
+        
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'query': query,
+            'offset': offset
+        })
+        
+    except Exception as e:
+        logger.error(f"Search failed: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Get prediction statistics from the rollup tables, optionally over a time window"""
+    try:
+        if not database:
+            return jsonify({'error': 'Database not available'}), 503
+        
+        start = request.args.get('start')
+        end = request.args.get('end')
+        granularity = request.args.get('granularity')
+        
+        try:
+            response = {
+                'statistics': database.get_statistics(start=start, end=end),
+                'start': start,
+                'end': end
+            }
+            if granularity:
+                response['granularity'] = granularity
+                response['series'] = database.get_statistics_series(
+                    granularity=granularity, start=start, end=end
+                )
+        except ValueError as e:
+            return jsonify({'error': f'Invalid statistics parameters: {str(e)}'}), 400
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Statistics retrieval failed: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/scraper/hosts', methods=['GET'])
+def get_scraper_hosts():
+    """Get per-host latency and circuit breaker state of the article scraper"""
+    if not article_scraper:
+        return jsonify({'hosts': {}})
+    
+    hosts = article_scraper.host_health.get_stats()
+    open_hosts = [host for host, stats in hosts.items() if stats['state'] != 'closed']
+    return jsonify({
+        'hosts': hosts,
+        'open_hosts': open_hosts
+    })
+
+@app.route('/api/admin/model/reload', methods=['POST'])
+def reload_model():
+    """Load the model from MODEL_PATH in the background in every worker and swap it in when ready"""
+    token = request.headers.get('X-Admin-Token', '')
+    if not MODEL_ADMIN_TOKEN or not hmac.compare_digest(token, MODEL_ADMIN_TOKEN):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    if not model_manager:
+        return jsonify({'error': 'Model not initialized'}), 503
+
+    if not model_manager.request_reload():
+        return jsonify({'error': 'A reload is already running', 'model': model_manager.get_status()}), 409
+
+    logger.info(f"Model reload requested (serving version {model_manager.version})")
+    return jsonify({'status': 'reloading', 'model': model_manager.get_status()}), 202
+
 @app.errorhandler(429)
 def ratelimit_handler(e):
     """Handle rate limit exceeded"""
@@ -312,6 +1231,14 @@ def ratelimit_handler(e):
         'message': 'Too many requests. Please try again later.'
     }), 429
 
+@app.errorhandler(413)
+def too_large_handler(e):
+    """Handle uploads over MAX_CONTENT_LENGTH"""
+    return jsonify({
+        'error': 'File too large',
+        'message': f'Uploads are limited to {app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)} MB.'
+    }), 413
+
 @app.errorhandler(500)
 def internal_error(e):
     """Handle internal server errors"""
@@ -0,0 +1,417 @@
+"""
+ASGI serving mode
+
+Run with `uvicorn asgi:app` from the backend directory. URL fetches and
+database calls run without holding a worker: fetches go through an httpx
+AsyncClient on the event loop, blocking SQLite calls run in the thread pool
+and model inference runs on a small bounded executor. /api/predict,
+/api/batch, /api/feedback and /api/history keep the same contracts as the
+Flask app; every other route is served by the Flask app mounted underneath.
+"""
+
+import os
+import time
+import asyncio
+import uuid
+import logging
+import contextlib
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette import responses
+from starlette.responses import StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as wsgi
+from utils.admission import AdmissionRejected, BATCH, INTERACTIVE
+from utils.host_health import CircuitOpenError
+from utils.inference_executor import InferenceExecutor, InferenceQueueFull
+from utils.scraper import AsyncArticleScraper, canonicalize_url
+from utils.singleflight import AsyncSingleFlight, SingleFlightTimeout
+from utils.json_provider import dumps, encode
+from utils.compression import CompressionMiddleware
+
+logger = logging.getLogger(__name__)
+
+class JSONResponse(responses.JSONResponse):
+    """JSON response encoded like the Flask routes (orjson, NumPy-aware)"""
+
+    def render(self, content) -> bytes:
+        return encode(content)
+
+# Created per event loop in lifespan()
+inference_executor = None
+async_scraper = None
+scrape_flight = None
+predict_flight = None
+
+# Same limits and storage as the Flask routes (flask-limiter's fixed window)
+rate_limiter = FixedWindowRateLimiter(storage_from_string(os.getenv('RATELIMIT_STORAGE_URI', 'memory://')))
+DEFAULT_LIMITS = [parse("200 per day"), parse("50 per hour")]
+PREDICT_LIMITS = [parse("10 per minute")]
+
+def rate_limited(request: Request, limits) -> JSONResponse:
+    """Count a request against its limits; return a 429 response once one is exceeded"""
+    client = request.client.host if request.client else '127.0.0.1'
+    endpoint = request.url.path
+
+    for item in limits:
+        if not rate_limiter.hit(item, endpoint, client):
+            reset_at, _ = rate_limiter.get_window_stats(item, endpoint, client)
+            return JSONResponse(
+                {'error': f'Rate limit exceeded: {item}'},
+                status_code=429,
+                headers={'Retry-After': str(max(1, int(reset_at - time.time())))}
+            )
+    return None
+
+def inference_busy(e: InferenceQueueFull) -> JSONResponse:
+    return JSONResponse(
+        {'error': f'Server busy: {str(e)}'},
+        status_code=503,
+        headers={'Retry-After': '1'}
+    )
+
+def overloaded(e: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        {'error': 'Server overloaded, please retry later', 'retry_after': e.retry_after},
+        status_code=503,
+        headers={'Retry-After': str(e.retry_after)}
+    )
+
+def coalesce_timeout(e: SingleFlightTimeout) -> JSONResponse:
+    return JSONResponse({'error': str(e)}, status_code=504)
+
+async def analyze_admitted(text: str, keywords: bool = True):
+    """Run analyze_text on the inference executor under admission control"""
+    with wsgi.admission.admit(INTERACTIVE) as ticket:
+        analysis = await inference_executor.run(wsgi.analyze_text, text,
+                                                top_k=5 if keywords and not ticket.degraded else 0)
+    analysis['degraded'] = keywords and ticket.degraded
+    return analysis
+
+async def read_json(request: Request):
+    """Parse a JSON body, returning None when it is missing or malformed"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    return JSONResponse({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'components': {
+            'hoax_detector': wsgi.model_manager is not None,
+            'text_processor': wsgi.text_processor is not None,
+            'article_scraper': wsgi.article_scraper is not None,
+            'database': wsgi.database is not None
+        },
+        'model': wsgi.model_manager.get_status() if wsgi.model_manager else None,
+        'inference': inference_executor.get_stats(),
+        'admission': wsgi.admission.get_stats()
+    })
+
+async def predict(request: Request):
+    """Predict hoax/factual classification for text or URL"""
+    limited = rate_limited(request, PREDICT_LIMITS)
+    if limited:
+        return limited
+
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        fields, error = wsgi.parse_fields(data, request.query_params)
+        if error:
+            return JSONResponse({'error': error}, status_code=400)
+
+        text = data.get('text', '').strip()
+        url = data.get('url', '').strip()
+
+        if not text and not url:
+            return JSONResponse({'error': 'Either text or URL must be provided'}, status_code=400)
+
+        # Extract text from URL if provided; the fetch awaits on the event loop
+        if url:
+            try:
+                extracted_text = await scrape_flight.do(canonicalize_url(url),
+                                                        lambda: async_scraper.extract_text(url))
+                if not extracted_text:
+                    return JSONResponse({'error': 'Failed to extract text from URL'}, status_code=400)
+                text = extracted_text
+            except CircuitOpenError as e:
+                return JSONResponse(
+                    {'error': f'Source temporarily unavailable: {str(e)}'},
+                    status_code=503,
+                    headers={'Retry-After': str(int(e.retry_after) + 1)}
+                )
+            except SingleFlightTimeout as e:
+                return coalesce_timeout(e)
+            except Exception as e:
+                logger.error(f"URL scraping failed: {e}")
+                return JSONResponse({'error': f'Failed to extract text from URL: {str(e)}'},
+                                    status_code=400)
+
+        error = wsgi.validate_text_length(text)
+        if error:
+            return JSONResponse({'error': error}, status_code=400)
+
+        # Identical texts already being analyzed share that result
+        try:
+            analysis = await predict_flight.do(wsgi.analysis_key(text, fields),
+                                               lambda: analyze_admitted(text, wsgi.wants_field(fields, 'keywords')))
+        except AdmissionRejected as e:
+            return overloaded(e)
+        except InferenceQueueFull as e:
+            return inference_busy(e)
+        except SingleFlightTimeout as e:
+            return coalesce_timeout(e)
+
+        response = wsgi.build_prediction_response(request_id, text, analysis, start_time, fields)
+        if analysis['degraded']:
+            response['degraded'] = True
+        logger.info(f"Request {request_id} completed in {response['processing_time']}s")
+
+        if wsgi.database:
+            await run_in_threadpool(
+                wsgi.database.queue_prediction,
+                request_id=request_id,
+                input_text=text,
+                predicted_label=analysis['prediction']['label'],
+                confidence=analysis['prediction']['confidence'],
+                processing_time=response['processing_time'],
+                model_version=analysis['model_version']
+            )
+
+        return JSONResponse(response)
+
+    except Exception as e:
+        logger.error(f"Request {request_id} failed: {e}")
+        return JSONResponse({
+            'error': 'Internal server error',
+            'request_id': request_id,
+            'processing_time': round(time.time() - start_time, 3)
+        }, status_code=500)
+
+async def submit_feedback(request: Request):
+    """Submit user feedback for predictions"""
+    limited = rate_limited(request, DEFAULT_LIMITS)
+    if limited:
+        return limited
+
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        text = data.get('text', '').strip()
+        predicted_label = data.get('predicted_label', '').strip()
+        user_label = data.get('user_label', '').strip()
+
+        if not all([text, predicted_label, user_label]):
+            return JSONResponse({'error': 'text, predicted_label, and user_label are required'},
+                                status_code=400)
+
+        if wsgi.database:
+            feedback_id = await run_in_threadpool(
+                wsgi.database.store_feedback,
+                text=text,
+                predicted_label=predicted_label,
+                user_label=user_label
+            )
+            return JSONResponse({
+                'message': 'Feedback submitted successfully',
+                'feedback_id': feedback_id
+            })
+        else:
+            return JSONResponse({'message': 'Feedback submitted successfully (database not available)'})
+
+    except Exception as e:
+        logger.error(f"Feedback submission failed: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def batch_predict(request: Request):
+    """Batch prediction from CSV file"""
+    limited = rate_limited(request, DEFAULT_LIMITS)
+    if limited:
+        return limited
+
+    try:
+        form = await request.form()
+        file = form.get('file')
+        if file is None or isinstance(file, str):
+            return JSONResponse({'error': 'No file provided'}, status_code=400)
+
+        if file.filename == '':
+            return JSONResponse({'error': 'No file selected'}, status_code=400)
+
+        if not file.filename.endswith('.csv'):
+            return JSONResponse({'error': 'Only CSV files are supported'}, status_code=400)
+
+        # Read the CSV in chunks straight from the spooled upload
+        try:
+            chunks = await run_in_threadpool(wsgi.read_batch_csv, file.file)
+        except wsgi.BatchCsvError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        if chunks is None:
+            return JSONResponse({'error': 'CSV must contain a "text" column'}, status_code=400)
+
+        try:
+            wsgi.admission.check(BATCH)
+        except AdmissionRejected as e:
+            return overloaded(e)
+
+        if wsgi.wants_ndjson(request.query_params, request.headers.get('accept')):
+            return StreamingResponse(stream_batch_lines(chunks), media_type='application/x-ndjson')
+
+        results = []
+        rows = 0
+        try:
+            async for chunk_results in process_batch_chunks(chunks):
+                results.extend(chunk_results)
+                rows += len(chunk_results)
+        except wsgi.BatchCsvError as e:
+            # Keep the rows already predicted and report where reading stopped
+            results.append(e.to_result())
+
+        return JSONResponse({
+            'message': f'Processed {rows} rows',
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def process_batch_chunks(chunks):
+    """Run batch chunks through the inference executor one at a time"""
+    while True:
+        chunk = await run_in_threadpool(next, chunks, None)
+        if chunk is None:
+            break
+
+        # A batch waits for room on the executor instead of failing halfway
+        while True:
+            try:
+                yield await inference_executor.run(wsgi.process_batch_chunk, chunk)
+                break
+            except InferenceQueueFull:
+                await asyncio.sleep(0.1)
+
+async def stream_batch_lines(chunks):
+    """NDJSON lines for a streamed batch, sent as each chunk finishes"""
+    progress = wsgi.BatchProgress()
+    try:
+        async for results in process_batch_chunks(chunks):
+            yield ''.join(dumps(line) + '\n' for line in progress.chunk_lines(results))
+    except wsgi.BatchCsvError as e:
+        yield dumps(progress.error_line(e)) + '\n'
+    yield dumps(progress.summary()) + '\n'
+
+async def get_history(request: Request):
+    """Get prediction or feedback history, paginated with an opaque cursor"""
+    limited = rate_limited(request, DEFAULT_LIMITS)
+    if limited:
+        return limited
+
+    try:
+        args = request.query_params
+        limit = max(1, min(int(args.get('limit', 50)), 100))
+        history_type = args.get('type', 'predictions')
+
+        if history_type not in ('predictions', 'feedback'):
+            return JSONResponse({'error': 'type must be "predictions" or "feedback"'}, status_code=400)
+
+        if wsgi.database:
+            get_page = (wsgi.database.get_prediction_page if history_type == 'predictions'
+                        else wsgi.database.get_feedback_page)
+            try:
+                page = await run_in_threadpool(
+                    get_page,
+                    limit=limit,
+                    cursor=args.get('cursor'),
+                    label=args.get('label'),
+                    start=args.get('start'),
+                    end=args.get('end')
+                )
+            except ValueError as e:
+                return JSONResponse({'error': f'Invalid pagination parameters: {str(e)}'}, status_code=400)
+
+            return JSONResponse({
+                'history': page['items'],
+                'total': len(page['items']),
+                'next_cursor': page['next_cursor']
+            })
+        else:
+            return JSONResponse({
+                'history': [],
+                'total': 0,
+                'next_cursor': None,
+                'message': 'Database not available'
+            })
+
+    except Exception as e:
+        logger.error(f"History retrieval failed: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Start the inference executor and async scraper for the lifetime of the server"""
+    global inference_executor, async_scraper, scrape_flight, predict_flight
+
+    inference_executor = InferenceExecutor(
+        workers=int(os.getenv('INFERENCE_WORKERS', 1)),
+        max_pending=int(os.getenv('INFERENCE_MAX_PENDING', 64))
+    )
+
+    # Shares circuit breakers and extraction workers with the Flask scraper
+    async_scraper = AsyncArticleScraper(
+        extraction_pool=wsgi.extraction_pool,
+        host_health=wsgi.article_scraper.host_health if wsgi.article_scraper else None,
+        max_connections=int(os.getenv('SCRAPER_MAX_CONNECTIONS', 1000))
+    )
+
+    scrape_flight = AsyncSingleFlight('scrape', timeout=wsgi.SINGLEFLIGHT_TIMEOUT)
+    predict_flight = AsyncSingleFlight('predict', timeout=wsgi.SINGLEFLIGHT_TIMEOUT)
+
+    yield
+
+    await async_scraper.close()
+    await run_in_threadpool(inference_executor.shutdown)
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/predict', predict, methods=['POST']),
+        Route('/api/feedback', submit_feedback, methods=['POST']),
+        Route('/api/batch', batch_predict, methods=['POST']),
+        Route('/api/history', get_history, methods=['GET']),
+        # Everything else (search, export, stats, ...) is served by Flask
+        Mount('/', app=WSGIMiddleware(wsgi.app))
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=os.getenv('ALLOWED_ORIGINS', '*').split(','),
+            allow_methods=['*'],
+            allow_headers=['*']
+        ),
+        # Flask responses arrive already compressed and pass through
+        Middleware(CompressionMiddleware, min_size=wsgi.COMPRESS_MIN_BYTES)
+    ],
+    lifespan=lifespan
+)
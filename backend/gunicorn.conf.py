@@ -0,0 +1,33 @@
+"""
+Gunicorn settings
+
+Run with `gunicorn app:app` from the backend directory. Metrics from all
+workers are merged through files in PROMETHEUS_MULTIPROC_DIR, so /metrics
+reports the same totals whichever worker answers it, and rate limits are
+counted in a SQLite file shared by all workers.
+"""
+
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Must be set before prometheus_client is imported by the app
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'hoax_metrics'))
+
+# Rate limits counted once per host rather than once per worker
+os.environ.setdefault('RATELIMIT_STORAGE_URI', 'sqlite:///data/ratelimits.db')
+
+def on_starting(server):
+    # Values left over from a previous run would be merged into the new totals
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
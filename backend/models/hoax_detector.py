@@ -6,8 +6,13 @@ from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from peft import PeftModel, PeftConfig
 from typing import Dict, List, Optional
 
+from utils.metrics import stage, BATCH_SIZE, FALLBACK_PREDICTIONS
+
 logger = logging.getLogger(__name__)
 
+# Untrained stand-in loaded when the fine-tuned model cannot be
+FALLBACK_MODEL = 'distilbert-base-multilingual-cased'
+
 class HoaxDetector:
     """Hoax news detector using transformer models"""
     
@@ -28,6 +33,7 @@ class HoaxDetector:
         
         self.model_path = model_path
         self.labels = ['hoax', 'faktual']  # Updated based on training data
+        self.fallback = False  # True when the untrained fallback model is serving
         
         self._load_model()
     
@@ -72,16 +78,15 @@ class HoaxDetector:
             logger.info("Loading fallback model...")
             
             # Use a smaller, more accessible model
-            fallback_model = 'distilbert-base-multilingual-cased'
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(fallback_model)
+            self.tokenizer = AutoTokenizer.from_pretrained(FALLBACK_MODEL)
             self.model = AutoModelForSequenceClassification.from_pretrained(
-                fallback_model,
+                FALLBACK_MODEL,
                 num_labels=len(self.labels)
             )
             
             self.model.to(self.device)
             self.model.eval()
+            self.fallback = True
             
             logger.info("Fallback model loaded successfully")
             
@@ -104,19 +109,20 @@ class HoaxDetector:
         
         try:
             # Tokenize input
-            inputs = self.tokenizer(
-                text,
-                truncation=True,
-                padding=True,
-                max_length=512,
-                return_tensors='pt'
-            )
-            
-            # Move inputs to device
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            with stage('tokenize'):
+                inputs = self.tokenizer(
+                    text,
+                    truncation=True,
+                    padding=True,
+                    max_length=512,
+                    return_tensors='pt'
+                )
+                
+                # Move inputs to device
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
             
             # Get prediction
-            with torch.no_grad():
+            with stage('forward'), torch.no_grad():
                 outputs = self.model(**inputs)
                 logits = outputs.logits
                 probabilities = torch.softmax(logits, dim=-1)
@@ -145,6 +151,75 @@ class HoaxDetector:
             # Return fallback prediction
             return self._fallback_prediction(text)
     
+    def predict_batch(self, texts: List[str], batch_size: int = 16) -> List[Dict]:
+        """
+        Predict several texts with one forward pass per batch
+        
+        Args:
+            texts: Input texts to classify
+            batch_size: Texts per forward pass
+            
+        Returns:
+            One prediction dictionary per text, in order
+        """
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("Model not loaded")
+        
+        results = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            BATCH_SIZE.labels('inference').observe(len(batch))
+            
+            try:
+                with stage('tokenize'):
+                    inputs = self.tokenizer(
+                        batch,
+                        truncation=True,
+                        padding=True,
+                        max_length=512,
+                        return_tensors='pt'
+                    )
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                
+                with stage('forward'), torch.no_grad():
+                    probabilities = torch.softmax(self.model(**inputs).logits, dim=-1).cpu().numpy()
+                
+                for text, probs in zip(batch, probabilities):
+                    predicted_idx = int(np.argmax(probs))
+                    predicted_label = self.labels[predicted_idx]
+                    confidence = float(probs[predicted_idx])
+                    
+                    results.append({
+                        'label': predicted_label,
+                        'confidence': confidence,
+                        'probabilities': {label: float(prob) for label, prob in zip(self.labels, probs)},
+                        'rationale': self._generate_rationale(text, predicted_label, confidence)
+                    })
+                    
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {e}")
+                results.extend(self._fallback_prediction(text) for text in batch)
+        
+        return results
+    
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens the model would see for each text
+        
+        Texts are truncated to the model's 512-token window, as in predict.
+        
+        Args:
+            texts: Input texts
+            
+        Returns:
+            Token count per text, in order
+        """
+        if not self.tokenizer:
+            raise RuntimeError("Model not loaded")
+        
+        encoded = self.tokenizer(texts, truncation=True, max_length=512)
+        return [len(ids) for ids in encoded['input_ids']]
+    
     def _generate_rationale(self, text: str, label: str, confidence: float) -> str:
         """Generate explanation for the prediction"""
         if confidence > 0.8:
@@ -163,6 +238,8 @@ class HoaxDetector:
     
     def _fallback_prediction(self, text: str) -> Dict:
         """Fallback prediction when model fails"""
+        FALLBACK_PREDICTIONS.inc()
+        
         # Simple rule-based fallback
         text_lower = text.lower()
         
@@ -201,5 +278,6 @@ class HoaxDetector:
             'device': str(self.device),
             'labels': self.labels,
             'model_loaded': self.model is not None,
+            'fallback': self.fallback,
             'tokenizer_loaded': self.tokenizer is not None
         } 
\ No newline at end of file
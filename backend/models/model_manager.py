@@ -0,0 +1,363 @@
+import gc
+import os
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import torch
+
+from .hoax_detector import HoaxDetector, FALLBACK_MODEL
+from utils.metrics import MODEL_RELOADS
+
+logger = logging.getLogger(__name__)
+
+# Run through a freshly loaded model before it takes traffic, so the first
+# real request does not pay for lazy initialization
+WARMUP_TEXTS = [
+    'Pemerintah resmi mengumumkan jadwal pencairan bantuan sosial bulan ini.',
+    'Viral! Pesan berantai ini mengklaim minum air hangat bisa menyembuhkan semua penyakit.'
+]
+
+def model_files(model_path: str) -> List[str]:
+    """Files directly under a local model directory, sorted by name"""
+    if not os.path.isdir(model_path):
+        return []
+    return sorted(
+        entry.path for entry in os.scandir(model_path) if entry.is_file()
+    )
+
+def model_signature(model_path: str) -> tuple:
+    """Cheap change marker of the model files: (name, size, mtime) of each"""
+    signature = []
+    for path in model_files(model_path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def model_version(model_path: str) -> str:
+    """
+    Version tag of a model: a short content hash of its files
+
+    Identical weights get the same tag wherever they are deployed. A model
+    that is not a local directory (a HuggingFace name) is tagged by name.
+    """
+    files = model_files(model_path)
+    if not files:
+        return model_path
+
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+def read_generation(path: str) -> Optional[str]:
+    """Current reload request token in a generation file, None if there is none"""
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def bump_generation(path: str) -> str:
+    """Write a new reload request token to a generation file, atomically"""
+    generation = f'{time.time_ns()}-{os.getpid()}'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(generation)
+    os.replace(tmp_path, path)
+    return generation
+
+class LoadedModel:
+    """One loaded detector and the number of requests currently using it"""
+
+    def __init__(self, detector: HoaxDetector, version: str):
+        self.detector = detector
+        self.version = version
+        self.loaded_at = datetime.now()
+        self.users = 0
+        self.retired = False
+
+class ModelManager:
+    """Serve the hoax detector and replace it without downtime
+
+    A reload loads and warms the new model next to the old one, then swaps
+    it in under a lock. Requests take the model with acquire() and keep it
+    for their whole batch, so a swap only affects batches that start after
+    it; the old model is released once the last batch using it finishes.
+    If the new model fails to load, the old one keeps serving.
+
+    Each process (e.g. gunicorn worker) has its own manager. With a
+    generation_path, request_reload() writes a new token to that shared
+    file and every manager whose watch() thread sees the change reloads, so
+    a reload requested from one worker reaches all of them.
+    """
+
+    def __init__(self, model_path: str, loader: Callable[[str], HoaxDetector] = HoaxDetector,
+                 warmup_texts: List[str] = WARMUP_TEXTS, generation_path: Optional[str] = None):
+        """
+        Initialize the manager (no model is loaded until load())
+
+        Args:
+            model_path: Path to the model or model name from HuggingFace
+            loader: Builds a detector from model_path
+            warmup_texts: Texts predicted once before a new model takes traffic
+            generation_path: File shared by all processes to request reloads
+        """
+        self.model_path = model_path
+        self.loader = loader
+        self.warmup_texts = warmup_texts
+        self.generation_path = generation_path
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._current: Optional[LoadedModel] = None
+        self._draining: List[LoadedModel] = []
+        self._signature = None
+        self._generation = None
+        self._reload_thread = None
+
+        self._watch_thread = None
+        self._watch_interval = None
+        self._watch_files = True
+        self._stop = threading.Event()
+
+        self.last_error = None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version tag of the model currently serving"""
+        current = self._current
+        return current.version if current else None
+
+    def load(self, requested_only: bool = False) -> Optional[LoadedModel]:
+        """
+        Load and warm up the model from model_path and swap it in
+
+        Blocks until done; only one load runs at a time.
+
+        Args:
+            requested_only: Only load if the generation file changed since
+                the last load (another process requested a reload)
+
+        Returns:
+            The newly serving model, or None if nothing was requested
+
+        Raises:
+            Exception: If loading or warm-up failed (the old model stays)
+        """
+        with self._load_lock:
+            generation = read_generation(self.generation_path) if self.generation_path else None
+            if requested_only and generation == self._generation:
+                return None
+            # A request that failed is not retried until the next one
+            self._generation = generation
+
+            signature = model_signature(self.model_path)
+            start = time.perf_counter()
+
+            try:
+                detector = self.loader(self.model_path)
+                # HoaxDetector falls back to an untrained model when the
+                # files cannot be loaded; never replace a working model with it
+                fallback = getattr(detector, 'fallback', False) is True
+                if self._current is not None and fallback:
+                    raise RuntimeError(f"Model at {self.model_path} could not be loaded")
+                if self.warmup_texts:
+                    detector.predict_batch(self.warmup_texts)
+                # The fallback's weights have nothing to do with model_path
+                version = f'fallback:{FALLBACK_MODEL}' if fallback else model_version(self.model_path)
+                model = LoadedModel(detector, version)
+            except Exception as e:
+                MODEL_RELOADS.labels('failed').inc()
+                self.last_error = str(e)
+                raise
+
+            self._signature = signature
+            self.last_error = None
+            self._swap(model)
+
+            MODEL_RELOADS.labels('success').inc()
+            logger.info(f"Model version {model.version} serving "
+                        f"(loaded in {time.perf_counter() - start:.1f}s)")
+            return model
+
+    def reload_async(self) -> bool:
+        """
+        Reload the model in a background thread, in this process only
+
+        Returns:
+            False if a reload is already running
+        """
+        return self._start_reload(requested_only=False)
+
+    def request_reload(self) -> bool:
+        """
+        Reload the model in every process sharing the generation file
+
+        This process reloads right away in a background thread; the others
+        follow when their watch() thread sees the new generation. Without a
+        generation file this is reload_async().
+
+        Returns:
+            False if a reload is already running in this process
+        """
+        if self.generation_path is None:
+            return self.reload_async()
+
+        with self._lock:
+            if self._load_lock.locked() or (self._reload_thread is not None
+                                            and self._reload_thread.is_alive()):
+                return False
+        bump_generation(self.generation_path)
+        return self._start_reload(requested_only=True)
+
+    def _start_reload(self, requested_only: bool) -> bool:
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self._reload, args=(requested_only,),
+                                                   name='model-reload', daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def _reload(self, requested_only: bool = False):
+        try:
+            self.load(requested_only=requested_only)
+        except Exception as e:
+            logger.error(f"Model reload failed, keeping version {self.version}: {e}")
+
+    def _swap(self, model: LoadedModel):
+        """Make model the serving one and retire the previous model"""
+        with self._lock:
+            old = self._current
+            self._current = model
+            release = False
+            if old is not None:
+                old.retired = True
+                release = old.users == 0
+                if not release:
+                    self._draining.append(old)
+
+        if release:
+            self._release(old)
+
+    @contextmanager
+    def acquire(self) -> Iterator[LoadedModel]:
+        """
+        Use the serving model for one request or batch
+
+        The model stays loaded until the block exits, even if a reload
+        swaps in a new one meanwhile.
+
+        Raises:
+            RuntimeError: If no model has been loaded yet
+        """
+        with self._lock:
+            model = self._current
+            if model is None:
+                raise RuntimeError("Model not loaded")
+            model.users += 1
+
+        try:
+            yield model
+        finally:
+            with self._lock:
+                model.users -= 1
+                release = model.retired and model.users == 0
+                if release and model in self._draining:
+                    self._draining.remove(model)
+            if release:
+                self._release(model)
+
+    def _release(self, model: LoadedModel):
+        """Free a retired model once nothing uses it"""
+        model.detector = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Released model version {model.version}")
+
+    def watch(self, interval: float = 10.0, files: bool = True):
+        """
+        Reload automatically when the files under model_path change, or when
+        another process requests a reload through the generation file
+
+        A change is picked up once the files are unchanged for one more
+        interval, so a model still being copied is not loaded half-written.
+        Files that failed to load are not retried until they change again.
+
+        Args:
+            interval: Seconds between checks
+            files: Watch the model files; with False only reload requests
+                from the generation file are followed
+        """
+        if self._watch_thread is not None:
+            return
+
+        self._watch_interval = interval
+        self._watch_files = files
+        self._watch_thread = threading.Thread(target=self._watch, name='model-watch', daemon=True)
+        self._watch_thread.start()
+
+    def _watch(self):
+        pending = None
+        failed = None
+        while not self._stop.wait(self._watch_interval):
+            if self.generation_path and read_generation(self.generation_path) != self._generation:
+                logger.info("Model reload requested by another process")
+                self._reload(requested_only=True)
+                continue
+
+            if not self._watch_files:
+                continue
+
+            signature = model_signature(self.model_path)
+            if signature == self._signature or signature == failed:
+                pending = None
+                continue
+
+            if signature != pending:
+                # Changed since the last check; wait for it to settle
+                pending = signature
+                continue
+
+            logger.info(f"Model files under {self.model_path} changed, reloading")
+            try:
+                self.load()
+            except Exception as e:
+                failed = signature
+                logger.error(f"Model reload failed, keeping version {self.version}: {e}")
+            pending = None
+
+    def stop(self):
+        """Stop watching the model files"""
+        self._stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+
+    def get_status(self) -> Dict:
+        """Serving version, reload state and models still draining"""
+        with self._lock:
+            current = self._current
+            return {
+                'version': current.version if current else None,
+                'model_path': self.model_path,
+                'loaded_at': current.loaded_at.isoformat() if current else None,
+                'reloading': self._load_lock.locked(),
+                'draining': [{'version': model.version, 'in_flight': model.users}
+                             for model in self._draining],
+                'watch_interval': self._watch_interval,
+                'generation': self._generation,
+                'last_error': self.last_error
+            }
@@ -104,6 +104,43 @@ class TextProcessor:
             logger.warning(f"KeyBERT keyword extraction failed: {e}")
             return self._fallback_keywords(text, top_k)
     
+    def extract_keywords_batch(self, texts: List[str], top_k: int = 5) -> List[List[str]]:
+        """
+        Extract keywords from several texts, embedding them in one KeyBERT call
+        
+        Args:
+            texts: Input texts
+            top_k: Number of keywords to extract per text
+            
+        Returns:
+            One keyword list per text, in order
+        """
+        if len(texts) < 2 or not self.keyword_model:
+            return [self.extract_keywords(text, top_k) for text in texts]
+        
+        try:
+            batch_keywords = self.keyword_model.extract_keywords(
+                texts,
+                keyphrase_ngram_range=(1, 2),
+                stop_words='indonesian',
+                use_maxsum=True,
+                nr_candidates=top_k * 2,
+                top_n=top_k
+            )
+            
+            results = []
+            for text, keywords in zip(texts, batch_keywords):
+                keyword_list = [keyword for keyword, score in keywords]
+                if len(keyword_list) < top_k:
+                    keyword_list.extend(self._fallback_keywords(text, top_k - len(keyword_list)))
+                results.append(keyword_list[:top_k])
+            
+            return results
+            
+        except Exception as e:
+            logger.warning(f"KeyBERT batch keyword extraction failed: {e}")
+            return [self._fallback_keywords(text, top_k) for text in texts]
+    
     def _fallback_keywords(self, text: str, top_k: int) -> List[str]:
         """Fallback keyword extraction using simple frequency-based approach"""
         if not text:
@@ -0,0 +1,172 @@
+import math
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from .metrics import EVENTS, QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+class AdmissionRejected(Exception):
+    """Raised when a request would queue longer than its latency SLO allows"""
+
+    def __init__(self, priority: str, predicted_wait: float, retry_after: int):
+        super().__init__(f"Predicted wait {predicted_wait:.1f}s exceeds the {priority} limit")
+        self.priority = priority
+        self.predicted_wait = predicted_wait
+        self.retry_after = retry_after
+
+class AdmissionTicket:
+    """Admitted work; leave the with-block when the inference is done"""
+
+    def __init__(self, controller: 'AdmissionController', cost: float, degraded: bool):
+        self.controller = controller
+        self.cost = cost
+        self.degraded = degraded
+        self._start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller._release(self.cost, time.perf_counter() - self._start, exc_type is None)
+        return False
+
+class AdmissionController:
+    """Admits inference work based on the backlog and recent service time
+
+    Work is measured in items (texts through the model). The controller
+    keeps the items currently admitted in this process and an EWMA of the
+    seconds each item takes, and predicts how long a new request would wait
+    before the model gets to it: backlog * seconds_per_item / concurrency.
+    The request's own service time is not counted, so an idle process always
+    admits, however large the request or slow the last one was; and since
+    only admitted work is in the backlog, a rejection streak always ends once
+    that work drains.
+
+    Each priority class may use a share of the latency SLO; batch traffic
+    gets a smaller share than interactive traffic, so it is shed first.
+    Above ``degrade_at`` of its share a request is admitted in degraded
+    mode (the caller skips optional work such as keyword extraction);
+    above its share it is rejected with a Retry-After estimate.
+    """
+
+    def __init__(self, slo_seconds: float = 2.0, concurrency: int = 1,
+                 shares: Optional[Dict[str, float]] = None, degrade_at: float = 0.75,
+                 ewma_alpha: float = 0.2):
+        """
+        Initialize the controller
+
+        Args:
+            slo_seconds: Target latency for interactive requests
+            concurrency: Items the model processes in parallel in this process
+            shares: Fraction of the SLO each priority class may use
+            degrade_at: Fraction of a class's limit above which requests are degraded
+            ewma_alpha: Weight of the newest observation in the service time average
+        """
+        self.slo_seconds = slo_seconds
+        self.concurrency = max(1, concurrency)
+        self.shares = shares or {INTERACTIVE: 1.0, BATCH: 0.5}
+        self.degrade_at = degrade_at
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self._backlog = 0.0
+        self._seconds_per_item = None
+        self._stats = {
+            'admitted': 0,
+            'degraded': 0,
+            'rejected': 0
+        }
+
+    def predicted_wait(self) -> float:
+        """Seconds work admitted now would queue behind the backlog"""
+        with self._lock:
+            return self._predict()
+
+    def _predict(self) -> float:
+        if self._seconds_per_item is None or self._backlog <= 0:
+            return 0.0
+        return self._backlog * self._seconds_per_item / self.concurrency
+
+    def check(self, priority: str = INTERACTIVE):
+        """
+        Reject work that would not be admitted now, without admitting it
+
+        Raises:
+            AdmissionRejected: If the predicted wait exceeds the class's share of the SLO
+        """
+        with self._lock:
+            self._check(priority)
+
+    def _check(self, priority: str) -> bool:
+        """Raise AdmissionRejected if over the class limit; return whether to degrade"""
+        limit = self.slo_seconds * self.shares.get(priority, 1.0)
+        wait = self._predict()
+
+        if wait > limit:
+            self._stats['rejected'] += 1
+            EVENTS.labels(f'admission_rejected_{priority}').inc()
+            # Time until enough of the backlog has drained
+            retry_after = max(1, math.ceil(wait - limit))
+            raise AdmissionRejected(priority, wait, retry_after)
+
+        return wait > limit * self.degrade_at
+
+    def admit(self, priority: str = INTERACTIVE, cost: float = 1, force: bool = False) -> AdmissionTicket:
+        """
+        Admit work of a priority class or reject it
+
+        Args:
+            priority: 'interactive' or 'batch'
+            cost: Number of items the work puts through the model
+            force: Admit regardless of load (work already accepted, e.g. later chunks of a stream)
+
+        Returns:
+            Ticket to hold while the work runs; ticket.degraded asks for a cheaper response
+
+        Raises:
+            AdmissionRejected: If the predicted wait exceeds the class's share of the SLO
+        """
+        with self._lock:
+            degraded = False if force else self._check(priority)
+            self._backlog += cost
+            self._stats['admitted'] += 1
+            if degraded:
+                self._stats['degraded'] += 1
+            QUEUE_DEPTH.labels('admission_backlog').set(self._backlog)
+
+        if degraded:
+            EVENTS.labels(f'admission_degraded_{priority}').inc()
+
+        return AdmissionTicket(self, cost, degraded)
+
+    def _release(self, cost: float, seconds: float, succeeded: bool):
+        with self._lock:
+            self._backlog = max(0.0, self._backlog - cost)
+            QUEUE_DEPTH.labels('admission_backlog').set(self._backlog)
+
+            # Failed work says little about how long the model takes
+            if succeeded and cost > 0:
+                # Work still in flight shared the model with this one
+                observed = seconds * self.concurrency / (cost + self._backlog)
+                if self._seconds_per_item is None:
+                    self._seconds_per_item = observed
+                else:
+                    self._seconds_per_item += self.ewma_alpha * (observed - self._seconds_per_item)
+
+    def get_stats(self) -> Dict:
+        """Get admission counters and the current estimate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'backlog': self._backlog,
+                'seconds_per_item': self._seconds_per_item,
+                'predicted_wait': self._predict(),
+                'slo_seconds': self.slo_seconds
+            })
+        return stats
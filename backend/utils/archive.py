@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .database import Database, normalize_timestamp
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('request_id', pa.string()),
+    ('input_text', pa.string()),
+    ('predicted_label', pa.string()),
+    ('confidence', pa.float64()),
+    ('processing_time', pa.float64()),
+    ('timestamp', pa.timestamp('s')),
+    ('model_version', pa.string()),
+    ('date', pa.string())
+])
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+class PredictionArchiver:
+    """Move aged prediction rows out of SQLite into date-partitioned Parquet files
+
+    Files are laid out as ``<archive_dir>/predictions/date=YYYY-MM-DD/`` and
+    named after the rowid range they hold, so re-running a batch that was
+    interrupted between writing and deleting overwrites the same files
+    instead of duplicating rows.
+    """
+
+    def __init__(self, database: Database, archive_dir: str, compression: str = 'zstd',
+                 batch_size: int = 5000):
+        """
+        Initialize the archiver
+
+        Args:
+            database: Database to archive from
+            archive_dir: Root directory of the Parquet archive
+            compression: Parquet compression codec
+            batch_size: Rows moved per batch
+        """
+        self.database = database
+        self.archive_dir = archive_dir
+        self.predictions_dir = os.path.join(archive_dir, 'predictions')
+        self.compression = compression
+        self.batch_size = batch_size
+
+        os.makedirs(self.predictions_dir, exist_ok=True)
+
+    def archive_older_than(self, days: int, pause: float = 0.05) -> int:
+        """
+        Archive and delete predictions older than the given number of days
+
+        Args:
+            days: Predictions older than this many days are archived
+            pause: Seconds to sleep between batches
+
+        Returns:
+            Number of predictions archived
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        archived = 0
+        last_id = 0
+
+        while True:
+            rows = self._read_batch(last_id, cutoff)
+            if not rows:
+                break
+
+            first_id, last_id = rows[0]['id'], rows[-1]['id']
+            self._write_batch(rows, first_id, last_id)
+
+            # Only delete once the batch is safely on disk
+            with self.database._connection() as conn:
+                conn.execute('''
+                    DELETE FROM predictions
+                    WHERE id >= ? AND id <= ? AND timestamp < ?
+                ''', (first_id, last_id, cutoff))
+
+            archived += len(rows)
+            logger.info(f"Archived predictions {first_id}-{last_id} ({archived} so far)")
+
+            if pause:
+                time.sleep(pause)
+
+        if archived:
+            self.database.delete_orphan_texts(pause=pause)
+            self.database.incremental_vacuum(pause=pause)
+
+        return archived
+
+    def _read_batch(self, after_id: int, cutoff: str) -> List[Dict]:
+        """Read the next batch of aged predictions with their texts"""
+        with self.database._connection() as conn:
+            rows = conn.execute('''
+                SELECT p.id, p.request_id, t.content, t.compressed, p.predicted_label,
+                       p.confidence, p.processing_time, p.timestamp, p.model_version
+                FROM predictions p
+                JOIN texts t ON t.id = p.text_id
+                WHERE p.id > ? AND p.timestamp < ?
+                ORDER BY p.id
+                LIMIT ?
+            ''', (after_id, cutoff, self.batch_size)).fetchall()
+
+        batch = []
+        for row in rows:
+            timestamp = datetime.strptime(row[7], '%Y-%m-%d %H:%M:%S')
+            batch.append({
+                'id': row[0],
+                'request_id': row[1],
+                'input_text': Database._unpack_text(row[2], row[3]),
+                'predicted_label': row[4],
+                'confidence': row[5],
+                'processing_time': row[6],
+                'timestamp': timestamp,
+                'model_version': row[8],
+                'date': timestamp.strftime('%Y-%m-%d')
+            })
+        return batch
+
+    def _write_batch(self, rows: List[Dict], first_id: int, last_id: int):
+        """Write one batch into the date partitions"""
+        table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+        file_format = ds.ParquetFileFormat()
+
+        ds.write_dataset(
+            table,
+            self.predictions_dir,
+            format=file_format,
+            partitioning=PARTITIONING,
+            basename_template=f'part-{first_id}-{last_id}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=file_format.make_write_options(compression=self.compression)
+        )
+
+    def dataset(self) -> ds.Dataset:
+        """Open the archive as a pyarrow dataset"""
+        # Explicit schema: files written before a column was added read it as null
+        return ds.dataset(self.predictions_dir, format='parquet', partitioning=PARTITIONING,
+                          schema=ARCHIVE_SCHEMA)
+
+    def query(self, columns: Optional[List[str]] = None, start: str = None, end: str = None,
+              label: str = None, min_confidence: float = None,
+              filter: ds.Expression = None) -> pa.Table:
+        """
+        Scan the archive with predicate and column pushdown
+
+        Time bounds prune whole date partitions before any file is opened;
+        the remaining predicates are pushed into the Parquet reader.
+
+        Args:
+            columns: Columns to read (all if omitted)
+            start: Only rows at or after this time (ISO 8601)
+            end: Only rows before this time (ISO 8601)
+            label: Only rows with this predicted label
+            min_confidence: Only rows with at least this confidence
+            filter: Additional pyarrow dataset expression
+
+        Returns:
+            Matching rows as a pyarrow Table
+        """
+        if not any(os.scandir(self.predictions_dir)):
+            schema = ARCHIVE_SCHEMA if columns is None else pa.schema(
+                [ARCHIVE_SCHEMA.field(name) for name in columns]
+            )
+            return schema.empty_table()
+
+        expression = None
+
+        def add(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        if start:
+            start_ts = datetime.strptime(normalize_timestamp(start), '%Y-%m-%d %H:%M:%S')
+            add(ds.field('date') >= start_ts.strftime('%Y-%m-%d'))
+            add(ds.field('timestamp') >= pa.scalar(start_ts, type=pa.timestamp('s')))
+        if end:
+            end_ts = datetime.strptime(normalize_timestamp(end), '%Y-%m-%d %H:%M:%S')
+            add(ds.field('date') <= end_ts.strftime('%Y-%m-%d'))
+            add(ds.field('timestamp') < pa.scalar(end_ts, type=pa.timestamp('s')))
+        if label:
+            add(ds.field('predicted_label') == label)
+        if min_confidence is not None:
+            add(ds.field('confidence') >= min_confidence)
+        if filter is not None:
+            add(filter)
+
+        return self.dataset().to_table(columns=columns, filter=expression)
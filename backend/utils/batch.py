@@ -0,0 +1,92 @@
+from typing import Dict, List
+
+import pandas as pd
+
+from .metrics import stage, BATCH_SIZE
+
+def predict_texts(processed_texts: List[str], hoax_detector, text_processor,
+                  top_k: int = 3) -> List[Dict]:
+    """
+    Classify and extract keywords from cleaned texts in batches
+    
+    Args:
+        processed_texts: Texts already passed through clean_text
+        hoax_detector: HoaxDetector used for predict_batch
+        text_processor: TextProcessor used for keywords
+        top_k: Keywords per text (0 skips keyword extraction)
+        
+    Returns:
+        One {"prediction", "keywords"} dictionary per text, in order
+    """
+    predictions = hoax_detector.predict_batch(processed_texts)
+    if top_k > 0:
+        with stage('keywords'):
+            keywords = text_processor.extract_keywords_batch(processed_texts, top_k=top_k)
+    else:
+        keywords = [[] for _ in processed_texts]
+    
+    return [{'prediction': prediction, 'keywords': row_keywords}
+            for prediction, row_keywords in zip(predictions, keywords)]
+
+def predict_chunk(chunk: pd.DataFrame, hoax_detector, text_processor) -> List[Dict]:
+    """
+    Predict one chunk of a batch CSV with a "text" column
+    
+    Valid rows are cleaned, classified and keyworded as one batch; rows
+    that are too short or too long become error rows.
+    
+    Args:
+        chunk: DataFrame chunk; its index gives the (0-based) row numbers
+        hoax_detector: HoaxDetector used for predict_batch
+        text_processor: TextProcessor used for cleaning and keywords
+        
+    Returns:
+        One result (or error) per row, in row order
+    """
+    BATCH_SIZE.labels('batch_chunk').observe(len(chunk))
+    results = [None] * len(chunk)
+    valid = []
+    
+    for pos, (idx, raw_text) in enumerate(zip(chunk.index, chunk['text'])):
+        text = str(raw_text).strip()
+        if len(text) < 10 or len(text) > 4096:
+            results[pos] = {
+                'row': idx + 1,
+                'text': text[:100] + '...' if len(text) > 100 else text,
+                'error': 'Text length invalid (10-4096 characters)'
+            }
+        else:
+            valid.append((pos, idx, text))
+    
+    if not valid:
+        return results
+    
+    try:
+        with stage('clean_text'):
+            processed_texts = [text_processor.clean_text(text) for _, _, text in valid]
+        analyses = predict_texts(processed_texts, hoax_detector, text_processor, top_k=3)
+        
+        for (pos, idx, text), analysis in zip(valid, analyses):
+            results[pos] = {
+                'row': idx + 1,
+                'text': text[:100] + '...' if len(text) > 100 else text,
+                'prediction': {
+                    'label': analysis['prediction']['label'],
+                    'confidence': analysis['prediction']['confidence']
+                },
+                'keywords': analysis['keywords']
+            }
+            
+    except Exception as e:
+        for pos, idx, text in valid:
+            results[pos] = {
+                'row': idx + 1,
+                'text': text[:100] + '...',
+                'error': str(e)
+            }
+    
+    return results
+
+def result_record(result: Dict) -> Dict:
+    """Tag a batch row result as an NDJSON "result" or "error" record"""
+    return dict(type='error' if 'error' in result else 'result', **result)
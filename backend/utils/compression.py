@@ -0,0 +1,117 @@
+import gzip
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+from .metrics import stage
+
+# Content types worth compressing; everything else (images, Parquet, already
+# compressed exports) is sent as is
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+# Fast settings: these responses are compressed once, on the request path
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Preferred content coding an Accept-Encoding header allows
+
+    Returns:
+        'br' (when brotli is installed), 'gzip', or None if neither is acceptable
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    # An explicit quality wins over the "*" wildcard; ties go to brotli
+    best = max(candidates, key=lambda name: qualities.get(name, qualities.get('*', 0.0)))
+    return best if qualities.get(best, qualities.get('*', 0.0)) > 0 else None
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a response body with 'br' or 'gzip'"""
+    with stage('compress'):
+        if encoding == 'br':
+            return brotli.compress(data, quality=BROTLI_QUALITY)
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses by Accept-Encoding
+
+    Only responses sent as a single body message are compressed; streamed
+    responses (NDJSON, exports) pass through untouched so every chunk still
+    reaches the client as soon as it is produced.
+    """
+
+    def __init__(self, app, min_size: int = 1024):
+        """
+        Initialize the middleware
+
+        Args:
+            app: ASGI application
+            min_size: Smallest body in bytes worth compressing (0 disables)
+        """
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.min_size:
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((value.decode('latin-1') for key, value in scope['headers']
+                       if key == b'accept-encoding'), None)
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                # Hold the headers until the body shows whether it is streamed
+                start = message
+                return
+
+            if message['type'] == 'http.response.body' and start is not None:
+                held, start = start, None
+                headers = MutableHeaders(raw=list(held['headers']))
+                body = message.get('body', b'')
+
+                if (not message.get('more_body', False) and len(body) >= self.min_size
+                        and 'content-encoding' not in headers
+                        and is_compressible(headers.get('content-type'))):
+                    body = compress(body, encoding)
+                    headers['Content-Encoding'] = encoding
+                    headers['Content-Length'] = str(len(body))
+                    headers.add_vary_header('Accept-Encoding')
+                    message = dict(message, body=body)
+
+                await send(dict(held, headers=headers.raw))
+
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
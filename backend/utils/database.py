@@ -1,21 +1,329 @@
 import sqlite3
 import logging
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import time
+import base64
+import hashlib
+import zlib
+import binascii
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Dict, Optional
 import os
+import re
+
+from .metrics import observe_stage, BATCH_SIZE, QUEUE_DEPTH, EVENTS
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; every RetentionJob runs there
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+_STOP = object()
+
+TEXTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS texts (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT UNIQUE NOT NULL,
+        content BLOB NOT NULL,
+        compressed INTEGER NOT NULL DEFAULT 0,
+        length INTEGER NOT NULL
+    )
+'''
+
+PREDICTIONS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id TEXT UNIQUE NOT NULL,
+        text_id INTEGER NOT NULL REFERENCES texts(id),
+        predicted_label TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        processing_time REAL NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        model_version TEXT
+    )
+'''
+
+FEEDBACK_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text_id INTEGER NOT NULL REFERENCES texts(id),
+        predicted_label TEXT NOT NULL,
+        user_label TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Full-text index over stored texts. It keeps its own uncompressed copy of
+# each text (texts may be zlib-compressed, which SQL cannot read), so rows
+# can be indexed and deleted without any application-defined function.
+TEXTS_FTS_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts USING fts5(
+        content,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+'''
+
+# Control characters search() callers may use as snippet markers; they are
+# replaced by spaces in the indexed copy, so a snippet never contains one
+# that did not come from the highlight
+SNIPPET_MARKER_CHARS = ('\x02', '\x03')
+_FTS_TEXT_SQL = "replace(replace({text}, char(2), ' '), char(3), ' ')"
+
+def fts_text(text: str) -> str:
+    """The copy of a text stored in the full-text index"""
+    for char in SNIPPET_MARKER_CHARS:
+        text = text.replace(char, ' ')
+    return text
+
+# Columns of full (untruncated) history exports, keyed by kind
+EXPORT_COLUMNS = {
+    'predictions': ['id', 'request_id', 'input_text', 'predicted_label', 'confidence',
+                    'processing_time', 'timestamp', 'model_version'],
+    'feedback': ['id', 'text', 'predicted_label', 'user_label', 'timestamp']
+}
+
+# Bucket start expressions for statistics rollups, keyed by granularity
+ROLLUP_BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00:00', {ts})",
+    'day': "strftime('%Y-%m-%d 00:00:00', {ts})"
+}
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text; identifies it in the texts table and doubles as a cache key"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def normalize_timestamp(value: str) -> str:
+    """
+    Convert an ISO 8601 date or datetime to SQLite's CURRENT_TIMESTAMP format (UTC)
+    
+    Raises:
+        ValueError: If the value is not a valid ISO 8601 date or datetime
+    """
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def build_match_query(query: str) -> str:
+    """
+    Turn user search input into a safe FTS5 MATCH expression
+    
+    Words are matched as quoted terms (all must appear), "double quoted"
+    parts as phrases, and a trailing * makes a word a prefix search.
+    FTS5 operators in the input are treated as plain words.
+    
+    Raises:
+        ValueError: If the query has no searchable terms
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query or ''):
+        prefix = False
+        if word:
+            prefix = word.endswith('*')
+            phrase = word.rstrip('*')
+        phrase = phrase.strip()
+        if not phrase:
+            continue
+        terms.append('"' + phrase.replace('"', '""') + '"' + ('*' if prefix else ''))
+    
+    if not terms:
+        raise ValueError("Search query is empty")
+    return ' '.join(terms)
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    """Encode a (timestamp, id) position as an opaque pagination token"""
+    raw = json.dumps([timestamp, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> tuple:
+    """
+    Decode a pagination token back into (timestamp, id)
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, row_id = json.loads(raw)
+        if not isinstance(timestamp, str) or not isinstance(row_id, int):
+            raise TypeError
+        return timestamp, row_id
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+class WriteBehindBuffer:
+    """Background writer that batches prediction and feedback inserts
+    
+    Producers only enqueue. A single writer thread flushes whatever has
+    accumulated in one transaction once ``batch_size`` records are waiting
+    or ``flush_interval`` seconds have passed since the first of them.
+    """
+    
+    def __init__(self, database: 'Database', batch_size: int = 100, flush_interval: float = 1.0,
+                 max_queue: int = 10000, put_timeout: float = 1.0):
+        """
+        Start the writer thread
+        
+        Args:
+            database: Database the records are written to
+            batch_size: Records per flushed transaction
+            flush_interval: Maximum seconds a record waits before being flushed
+            max_queue: Maximum number of buffered records
+            put_timeout: Seconds put() blocks on a full queue before giving up
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'failed': 0,
+            'rejected': 0,
+            'flushes': 0
+        }
+        
+        self._thread = threading.Thread(target=self._run, name='db-write-behind', daemon=True)
+        self._thread.start()
+    
+    def put(self, kind: str, record: Dict) -> bool:
+        """
+        Enqueue a record, blocking up to put_timeout while the queue is full
+        
+        Args:
+            kind: 'prediction' or 'feedback'
+            record: Column values for the insert
+            
+        Returns:
+            True if queued, False if the buffer is closed or stayed full
+        """
+        if self._closed:
+            return False
+        
+        try:
+            self._queue.put((kind, record), timeout=self.put_timeout)
+        except queue.Full:
+            self._count('rejected')
+            EVENTS.labels('write_buffer_rejected').inc()
+            return False
+        
+        self._count('queued')
+        QUEUE_DEPTH.labels('write_behind').set(self._queue.qsize())
+        return True
+    
+    def _run(self):
+        """Writer loop: collect a batch by size or age, then flush it"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            self._flush(batch)
+        
+        # Drain anything enqueued before close()
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        
+        for start in range(0, len(remaining), self.batch_size):
+            self._flush(remaining[start:start + self.batch_size])
+    
+    def _flush(self, batch: List):
+        """Write one batch in a single transaction"""
+        predictions = [record for kind, record in batch if kind == 'prediction']
+        feedback = [record for kind, record in batch if kind == 'feedback']
+        BATCH_SIZE.labels('db_flush').observe(len(batch))
+        QUEUE_DEPTH.labels('write_behind').set(self._queue.qsize())
+        
+        try:
+            start = time.perf_counter()
+            with self.database._connection() as conn:
+                if predictions:
+                    self.database._insert_predictions(conn, predictions)
+                if feedback:
+                    self.database._insert_feedback(conn, feedback)
+            observe_stage('db_flush', time.perf_counter() - start)
+            
+            with self._lock:
+                self._stats['written'] += len(batch)
+                self._stats['flushes'] += 1
+            
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} buffered records: {e}")
+            with self._lock:
+                self._stats['failed'] += len(batch)
+    
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+    
+    def get_stats(self) -> Dict:
+        """Get buffer counters and current depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        return stats
+    
+    def close(self, timeout: float = 10.0):
+        """Stop accepting records, flush everything queued and stop the writer"""
+        if self._closed:
+            return
+        
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        
+        if self._thread.is_alive():
+            logger.warning("Write-behind buffer did not finish flushing before timeout")
+        else:
+            logger.info("Write-behind buffer flushed and stopped")
+
 class Database:
     """Simple SQLite database for storing predictions and feedback"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = 4, busy_timeout_ms: int = 5000,
+                 cache_size_kb: int = 16384, mmap_size_mb: int = 128,
+                 compress_min_bytes: Optional[int] = 512):
         """
         Initialize database connection
         
         Args:
             db_path: Path to SQLite database file
+            pool_size: Maximum number of pooled connections per process
+            busy_timeout_ms: How long a connection waits on a locked database
+            cache_size_kb: Page cache size per connection
+            mmap_size_mb: Memory-mapped I/O size per connection
+            compress_min_bytes: zlib-compress stored texts at least this long (None disables)
         """
         if not db_path:
             db_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'hoax_detection.db')
@@ -24,41 +332,175 @@ class Database:
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_mb = mmap_size_mb
+        self.compress_min_bytes = compress_min_bytes
+        
+        self.write_buffer = None
+        self.search_enabled = False
+        
+        self._pool_lock = threading.Lock()
+        self._reset_pool()
         self._init_database()
     
+    def _reset_pool(self):
+        """Start an empty connection pool owned by the current process"""
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._pool_created = 0
+        self._pool_pid = os.getpid()
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection with WAL journaling and tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False
+        )
+        # auto_vacuum only takes effect on a new database before it switches to WAL
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size_mb) * 1024 * 1024}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        # Used by exports to read compressed texts in SQL
+        conn.create_function('unpack_text', 2, self._unpack_text, deterministic=True)
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if there is room"""
+        with self._pool_lock:
+            # Connections inherited across fork (e.g. gunicorn --preload) are not reused
+            if self._pool_pid != os.getpid():
+                self._reset_pool()
+            
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+            
+            if self._pool_created < self.pool_size:
+                self._pool_created += 1
+                pool = self._pool
+            else:
+                pool = None
+        
+        if pool is None:
+            return self._pool.get(timeout=self.busy_timeout_ms / 1000)
+        
+        try:
+            return self._open_connection()
+        except Exception:
+            with self._pool_lock:
+                if pool is self._pool:
+                    self._pool_created -= 1
+            raise
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool"""
+        if self._pool_pid != os.getpid():
+            return
+        
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    @contextmanager
+    def _connection(self):
+        """
+        Borrow a pooled connection for one transaction
+        
+        Commits when the block succeeds and rolls back when it raises.
+        """
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+    
+    def close(self):
+        """Flush buffered writes and close all idle pooled connections"""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+            self.write_buffer = None
+        
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                return
+            
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._pool_created -= 1
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Convert an existing database to auto_vacuum=INCREMENTAL with a one-time VACUUM
+        
+        New databases get incremental vacuum when they are created. Older ones
+        need this rewrite, which locks the whole database while it runs, so it
+        is run once by hand (scripts/enable_incremental_vacuum.py) with the
+        server stopped rather than on startup.
+        
+        Returns:
+            True if the conversion ran, False if it was not needed
+        """
+        conn = self._acquire()
+        try:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                return False
+            
+            # VACUUM cannot change auto_vacuum while in WAL mode
+            logger.info("Running one-time VACUUM to enable incremental vacuum")
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+            return True
+        finally:
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._release(conn)
+    
     def _init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                # Create predictions table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS predictions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        request_id TEXT UNIQUE NOT NULL,
-                        input_text TEXT NOT NULL,
-                        predicted_label TEXT NOT NULL,
-                        confidence REAL NOT NULL,
-                        processing_time REAL NOT NULL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+                # Create tables; texts are content-addressed and shared by
+                # predictions and feedback
+                cursor.execute(TEXTS_SCHEMA)
+                cursor.execute(PREDICTIONS_SCHEMA)
+                cursor.execute(FEEDBACK_SCHEMA)
                 
-                # Create feedback table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS feedback (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        text TEXT NOT NULL,
-                        predicted_label TEXT NOT NULL,
-                        user_label TEXT NOT NULL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+                # Databases created before texts were deduplicated
+                self._migrate_text_storage(conn)
+                
+                # Databases created before predictions recorded the model version
+                columns = [row[1] for row in conn.execute('PRAGMA table_info(predictions)')]
+                if 'model_version' not in columns:
+                    cursor.execute('ALTER TABLE predictions ADD COLUMN model_version TEXT')
                 
                 # Create indexes for better performance
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions(timestamp)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp)')
+                # Composite (timestamp, id) indexes serve keyset pagination and
+                # time-range filters; they replace the old timestamp-only indexes
+                cursor.execute('DROP INDEX IF EXISTS idx_predictions_timestamp')
+                cursor.execute('DROP INDEX IF EXISTS idx_feedback_timestamp')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_timestamp_id ON predictions(timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_label_timestamp_id ON predictions(predicted_label, timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_timestamp_id ON feedback(timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_text_id ON predictions(text_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_text_id ON feedback(text_id)')
+                
+                self._init_rollups(cursor)
+                self._init_search(cursor)
                 
                 conn.commit()
                 logger.info("Database initialized successfully")
@@ -67,8 +509,179 @@ class Database:
             logger.error(f"Failed to initialize database: {e}")
             raise
     
+    def _migrate_text_storage(self, conn: sqlite3.Connection):
+        """Move inline predictions.input_text / feedback.text into the texts table"""
+        for table, text_column, schema, columns in (
+            ('predictions', 'input_text', PREDICTIONS_SCHEMA,
+             'request_id, predicted_label, confidence, processing_time, timestamp'),
+            ('feedback', 'text', FEEDBACK_SCHEMA, 'predicted_label, user_label, timestamp')
+        ):
+            existing = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            if text_column not in existing:
+                continue
+            
+            logger.info(f"Migrating {table}.{text_column} to content-addressed storage")
+            
+            rows = conn.execute(f'SELECT DISTINCT {text_column} FROM {table}')
+            while True:
+                batch = rows.fetchmany(1000)
+                if not batch:
+                    break
+                conn.executemany('''
+                    INSERT OR IGNORE INTO texts (content_hash, content, compressed, length)
+                    VALUES (?, ?, ?, ?)
+                ''', [self._text_row(row[0]) for row in batch])
+            
+            conn.create_function('content_hash', 1, content_hash, deterministic=True)
+            
+            # Rebuild the table without the inline text column; its indexes and
+            # triggers go with the legacy table and are recreated afterwards
+            conn.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+            conn.execute(schema)
+            conn.execute(f'''
+                INSERT INTO {table} (id, text_id, {columns})
+                SELECT l.id, t.id, {columns}
+                FROM {table}_legacy l
+                JOIN texts t ON t.content_hash = content_hash(l.{text_column})
+            ''')
+            conn.execute(f'DROP TABLE {table}_legacy')
+    
+    def _init_rollups(self, cursor: sqlite3.Cursor):
+        """
+        Create hourly/daily statistics rollups maintained by insert triggers
+        
+        Rollups record every prediction and feedback ever stored; deleting
+        rows (retention cleanup, archiving) does not change them.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prediction_rollups (
+                granularity TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                predicted_label TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                sum_confidence REAL NOT NULL,
+                sum_processing_time REAL NOT NULL,
+                PRIMARY KEY (granularity, bucket_start, predicted_label)
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feedback_rollups (
+                granularity TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (granularity, bucket_start)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Existing databases: build the rollups once from the raw tables
+        has_rollups = cursor.execute('SELECT 1 FROM prediction_rollups LIMIT 1').fetchone()
+        has_feedback_rollups = cursor.execute('SELECT 1 FROM feedback_rollups LIMIT 1').fetchone()
+        
+        for granularity, bucket_expr in ROLLUP_BUCKETS.items():
+            if not has_rollups:
+                cursor.execute(f'''
+                    INSERT INTO prediction_rollups
+                    SELECT '{granularity}', {bucket_expr.format(ts='timestamp')}, predicted_label,
+                           COUNT(*), SUM(confidence), SUM(processing_time)
+                    FROM predictions
+                    GROUP BY 2, 3
+                ''')
+            
+            if not has_feedback_rollups:
+                cursor.execute(f'''
+                    INSERT INTO feedback_rollups
+                    SELECT '{granularity}', {bucket_expr.format(ts='timestamp')}, COUNT(*)
+                    FROM feedback
+                    GROUP BY 2
+                ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_predictions_rollup_{granularity}
+                AFTER INSERT ON predictions
+                BEGIN
+                    INSERT INTO prediction_rollups
+                    VALUES ('{granularity}', {bucket_expr.format(ts='NEW.timestamp')}, NEW.predicted_label,
+                            1, NEW.confidence, NEW.processing_time)
+                    ON CONFLICT (granularity, bucket_start, predicted_label) DO UPDATE SET
+                        count = count + 1,
+                        sum_confidence = sum_confidence + excluded.sum_confidence,
+                        sum_processing_time = sum_processing_time + excluded.sum_processing_time;
+                END
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_feedback_rollup_{granularity}
+                AFTER INSERT ON feedback
+                BEGIN
+                    INSERT INTO feedback_rollups
+                    VALUES ('{granularity}', {bucket_expr.format(ts='NEW.timestamp')}, 1)
+                    ON CONFLICT (granularity, bucket_start) DO UPDATE SET
+                        count = count + 1;
+                END
+            ''')
+    
+    def _init_search(self, cursor: sqlite3.Cursor):
+        """Create the full-text index over texts and the triggers that keep it in sync"""
+        fts = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'texts_fts'"
+        ).fetchone()
+        
+        # Older databases index through a view that decompresses with
+        # unpack_text(), which only connections opened here define
+        if fts and 'texts_plain' in fts[0]:
+            logger.info("Replacing the external-content full-text index")
+            cursor.execute('DROP TRIGGER IF EXISTS trg_texts_fts_insert')
+            cursor.execute('DROP TRIGGER IF EXISTS trg_texts_fts_delete')
+            cursor.execute('DROP TABLE texts_fts')
+            fts = None
+        cursor.execute('DROP VIEW IF EXISTS texts_plain')
+        
+        try:
+            cursor.execute(TEXTS_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search unavailable: {e}")
+            self.search_enabled = False
+            return
+        
+        # Texts are never updated, only inserted and deleted. Compressed texts
+        # are indexed by _store_texts; both triggers run in plain SQLite too.
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_texts_fts_insert
+            AFTER INSERT ON texts
+            WHEN NEW.compressed = 0
+            BEGIN
+                INSERT INTO texts_fts (rowid, content)
+                VALUES (NEW.id, {_FTS_TEXT_SQL.format(text='NEW.content')});
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_texts_fts_delete
+            AFTER DELETE ON texts
+            BEGIN
+                DELETE FROM texts_fts WHERE rowid = OLD.id;
+            END
+        ''')
+        
+        # Existing databases: index the texts stored so far
+        if not fts:
+            logger.info("Building full-text index")
+            rows = cursor.connection.execute('SELECT id, content, compressed FROM texts')
+            while True:
+                batch = rows.fetchmany(1000)
+                if not batch:
+                    break
+                cursor.executemany(
+                    'INSERT INTO texts_fts (rowid, content) VALUES (?, ?)',
+                    [(text_id, fts_text(self._unpack_text(content, compressed)))
+                     for text_id, content, compressed in batch]
+                )
+        
+        self.search_enabled = True
+    
     def store_prediction(self, request_id: str, input_text: str, predicted_label: str, 
-                        confidence: float, processing_time: float) -> bool:
+                        confidence: float, processing_time: float,
+                        model_version: Optional[str] = None) -> bool:
         """
         Store a prediction result
         
@@ -78,21 +691,23 @@ class Database:
             predicted_label: Predicted label
             confidence: Confidence score
             processing_time: Time taken for processing
+            model_version: Version tag of the model that made the prediction
             
         Returns:
             True if successful, False otherwise
         """
+        record = {
+            'request_id': request_id,
+            'input_text': input_text,
+            'predicted_label': predicted_label,
+            'confidence': confidence,
+            'processing_time': processing_time,
+            'model_version': model_version
+        }
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO predictions 
-                    (request_id, input_text, predicted_label, confidence, processing_time)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (request_id, input_text, predicted_label, confidence, processing_time))
-                
-                conn.commit()
+            with self._connection() as conn:
+                self._insert_predictions(conn, [record])
                 logger.info(f"Stored prediction for request {request_id}")
                 return True
                 
@@ -112,17 +727,15 @@ class Database:
         Returns:
             Feedback ID if successful, None otherwise
         """
+        record = {
+            'text': text,
+            'predicted_label': predicted_label,
+            'user_label': user_label
+        }
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO feedback (text, predicted_label, user_label)
-                    VALUES (?, ?, ?)
-                ''', (text, predicted_label, user_label))
-                
-                feedback_id = cursor.lastrowid
-                conn.commit()
+            with self._connection() as conn:
+                feedback_id = self._insert_feedback(conn, [record])
                 
                 logger.info(f"Stored feedback with ID {feedback_id}")
                 return feedback_id
@@ -131,6 +744,149 @@ class Database:
             logger.error(f"Failed to store feedback: {e}")
             return None
     
+    def _text_row(self, text: str) -> tuple:
+        """Build a texts row (hash, content, compressed, length) for a text"""
+        data = text.encode('utf-8')
+        if self.compress_min_bytes is not None and len(data) >= self.compress_min_bytes:
+            packed = zlib.compress(data)
+            if len(packed) < len(data):
+                return content_hash(text), packed, 1, len(text)
+        return content_hash(text), text, 0, len(text)
+    
+    @staticmethod
+    def _unpack_text(content, compressed: int) -> str:
+        """Inverse of _text_row for a stored content value"""
+        if compressed:
+            return zlib.decompress(content).decode('utf-8')
+        return content
+    
+    def _store_texts(self, conn: sqlite3.Connection, texts: List[str]) -> Dict[str, int]:
+        """
+        Store texts that are not stored yet
+        
+        Returns:
+            Mapping of each text to its texts.id
+        """
+        unique = {text: content_hash(text) for text in texts}
+        
+        rows = [self._text_row(text) for text in unique]
+        conn.executemany('''
+            INSERT OR IGNORE INTO texts (content_hash, content, compressed, length)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+        
+        ids = {}
+        hashes = list(set(unique.values()))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            ids.update(conn.execute(
+                f'SELECT content_hash, id FROM texts WHERE content_hash IN ({placeholders})', chunk
+            ).fetchall())
+        
+        text_ids = {text: ids[text_hash] for text, text_hash in unique.items()}
+        
+        # The insert trigger only indexes uncompressed texts
+        if self.search_enabled:
+            conn.executemany('''
+                INSERT INTO texts_fts (rowid, content)
+                SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM texts_fts WHERE rowid = ?)
+            ''', [(text_ids[text], fts_text(text), text_ids[text])
+                  for text, row in zip(unique, rows) if row[2]])
+        
+        return text_ids
+    
+    def _insert_predictions(self, conn: sqlite3.Connection, records: List[Dict]):
+        """Insert prediction records inside the caller's transaction"""
+        text_ids = self._store_texts(conn, [record['input_text'] for record in records])
+        
+        conn.executemany('''
+            INSERT OR REPLACE INTO predictions 
+            (request_id, text_id, predicted_label, confidence, processing_time, model_version)
+            VALUES (:request_id, :text_id, :predicted_label, :confidence, :processing_time, :model_version)
+        ''', [dict(record, text_id=text_ids[record['input_text']]) for record in records])
+    
+    def _insert_feedback(self, conn: sqlite3.Connection, records: List[Dict]) -> Optional[int]:
+        """
+        Insert feedback records inside the caller's transaction
+        
+        Returns:
+            ID of the last inserted row
+        """
+        text_ids = self._store_texts(conn, [record['text'] for record in records])
+        rows = [dict(record, text_id=text_ids[record['text']]) for record in records]
+        
+        sql = '''
+            INSERT INTO feedback (text_id, predicted_label, user_label)
+            VALUES (:text_id, :predicted_label, :user_label)
+        '''
+        
+        if len(rows) == 1:
+            return conn.execute(sql, rows[0]).lastrowid
+        
+        conn.executemany(sql, rows)
+        return None
+    
+    def enable_write_behind(self, batch_size: int = 100, flush_interval: float = 1.0,
+                            max_queue: int = 10000, put_timeout: float = 1.0) -> 'WriteBehindBuffer':
+        """
+        Buffer queued predictions and feedback and write them in batches
+        
+        Args:
+            batch_size: Records per flushed transaction
+            flush_interval: Maximum seconds a record waits before being flushed
+            max_queue: Maximum number of buffered records
+            put_timeout: Seconds a producer blocks on a full queue before writing synchronously
+            
+        Returns:
+            The started write buffer
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBehindBuffer(self, batch_size, flush_interval,
+                                                  max_queue, put_timeout)
+        return self.write_buffer
+    
+    def queue_prediction(self, request_id: str, input_text: str, predicted_label: str,
+                         confidence: float, processing_time: float,
+                         model_version: Optional[str] = None) -> bool:
+        """
+        Queue a prediction for a batched write, or store it directly without a buffer
+        
+        Returns:
+            True if the record was queued or stored, False otherwise
+        """
+        record = {
+            'request_id': request_id,
+            'input_text': input_text,
+            'predicted_label': predicted_label,
+            'confidence': confidence,
+            'processing_time': processing_time,
+            'model_version': model_version
+        }
+        
+        if self.write_buffer is not None and self.write_buffer.put('prediction', record):
+            return True
+        
+        return self.store_prediction(**record)
+    
+    def queue_feedback(self, text: str, predicted_label: str, user_label: str) -> bool:
+        """
+        Queue feedback for a batched write, or store it directly without a buffer
+        
+        Returns:
+            True if the record was queued or stored, False otherwise
+        """
+        record = {
+            'text': text,
+            'predicted_label': predicted_label,
+            'user_label': user_label
+        }
+        
+        if self.write_buffer is not None and self.write_buffer.put('feedback', record):
+            return True
+        
+        return self.store_feedback(**record) is not None
+    
     def get_prediction_history(self, limit: int = 50, offset: int = 0) -> List[Dict]:
         """
         Get prediction history
@@ -143,31 +899,19 @@ class Database:
             List of prediction records
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT request_id, input_text, predicted_label, confidence, 
-                           processing_time, timestamp
-                    FROM predictions
-                    ORDER BY timestamp DESC
+                    SELECT p.id, p.request_id, t.content, t.compressed, p.predicted_label,
+                           p.confidence, p.processing_time, p.timestamp, p.model_version
+                    FROM predictions p
+                    JOIN texts t ON t.id = p.text_id
+                    ORDER BY p.timestamp DESC, p.id DESC
                     LIMIT ? OFFSET ?
                 ''', (limit, offset))
                 
-                rows = cursor.fetchall()
-                
-                history = []
-                for row in rows:
-                    history.append({
-                        'request_id': row[0],
-                        'input_text': row[1][:100] + '...' if len(row[1]) > 100 else row[1],
-                        'predicted_label': row[2],
-                        'confidence': row[3],
-                        'processing_time': row[4],
-                        'timestamp': row[5]
-                    })
-                
-                return history
+                return [self._prediction_row(row) for row in cursor.fetchall()]
                 
         except Exception as e:
             logger.error(f"Failed to get prediction history: {e}")
@@ -185,119 +929,743 @@ class Database:
             List of feedback records
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT id, text, predicted_label, user_label, timestamp
-                    FROM feedback
-                    ORDER BY timestamp DESC
+                    SELECT f.id, t.content, t.compressed, f.predicted_label, f.user_label,
+                           f.timestamp
+                    FROM feedback f
+                    JOIN texts t ON t.id = f.text_id
+                    ORDER BY f.timestamp DESC, f.id DESC
                     LIMIT ? OFFSET ?
                 ''', (limit, offset))
                 
-                rows = cursor.fetchall()
-                
-                history = []
-                for row in rows:
-                    history.append({
-                        'id': row[0],
-                        'text': row[1][:100] + '...' if len(row[1]) > 100 else row[1],
-                        'predicted_label': row[2],
-                        'user_label': row[3],
-                        'timestamp': row[4]
-                    })
-                
-                return history
+                return [self._feedback_row(row) for row in cursor.fetchall()]
                 
         except Exception as e:
             logger.error(f"Failed to get feedback history: {e}")
             return []
     
-    def get_statistics(self) -> Dict:
+    def get_prediction_page(self, limit: int = 50, cursor: str = None, label: str = None,
+                            start: str = None, end: str = None) -> Dict:
+        """
+        Get one page of prediction history, newest first
+        
+        Pages are keyed on (timestamp, id), so each page costs the same no
+        matter how deep into the history it is.
+        
+        Args:
+            limit: Maximum number of records to return
+            cursor: next_cursor from the previous page
+            label: Only return predictions with this label
+            start: Only return records at or after this time (ISO 8601)
+            end: Only return records before this time (ISO 8601)
+            
+        Returns:
+            Dictionary with 'items' and 'next_cursor' (None on the last page)
+            
+        Raises:
+            ValueError: If the cursor or a time bound is malformed
+        """
+        return self._get_page(
+            '''
+                SELECT p.id, p.request_id, t.content, t.compressed, p.predicted_label,
+                       p.confidence, p.processing_time, p.timestamp, p.model_version
+                FROM predictions p
+                JOIN texts t ON t.id = p.text_id
+            ''',
+            'p', 'predicted_label', self._prediction_row, limit, cursor, label, start, end
+        )
+    
+    def get_feedback_page(self, limit: int = 50, cursor: str = None, label: str = None,
+                          start: str = None, end: str = None) -> Dict:
+        """
+        Get one page of feedback history, newest first
+        
+        Args:
+            limit: Maximum number of records to return
+            cursor: next_cursor from the previous page
+            label: Only return feedback where the user chose this label
+            start: Only return records at or after this time (ISO 8601)
+            end: Only return records before this time (ISO 8601)
+            
+        Returns:
+            Dictionary with 'items' and 'next_cursor' (None on the last page)
+            
+        Raises:
+            ValueError: If the cursor or a time bound is malformed
+        """
+        return self._get_page(
+            '''
+                SELECT f.id, t.content, t.compressed, f.predicted_label, f.user_label,
+                       f.timestamp
+                FROM feedback f
+                JOIN texts t ON t.id = f.text_id
+            ''',
+            'f', 'user_label', self._feedback_row, limit, cursor, label, start, end
+        )
+    
+    def _get_page(self, select_sql: str, alias: str, label_column: str, row_mapper, limit: int,
+                  cursor: Optional[str], label: Optional[str], start: Optional[str],
+                  end: Optional[str]) -> Dict:
+        """Run a keyset-paginated history query"""
+        # A page needs at least one row to carry the next cursor; LIMIT -1 is unbounded
+        limit = max(1, limit)
+        conditions = []
+        params = []
+        
+        if label:
+            conditions.append(f'{alias}.{label_column} = ?')
+            params.append(label)
+        if start:
+            conditions.append(f'{alias}.timestamp >= ?')
+            params.append(normalize_timestamp(start))
+        if end:
+            conditions.append(f'{alias}.timestamp < ?')
+            params.append(normalize_timestamp(end))
+        if cursor:
+            conditions.append(f'({alias}.timestamp, {alias}.id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                {select_sql}
+                {where}
+                ORDER BY {alias}.timestamp DESC, {alias}.id DESC
+                LIMIT ?
+            ''', params + [limit + 1]).fetchall()
+        
+        items = [row_mapper(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last['timestamp'], last['id'])
+        
+        return {
+            'items': items,
+            'next_cursor': next_cursor
+        }
+    
+    def _prediction_row(self, row) -> Dict:
+        """Map a predictions/texts join row to a history record"""
+        text = self._unpack_text(row[2], row[3])
+        return {
+            'id': row[0],
+            'request_id': row[1],
+            'input_text': text[:100] + '...' if len(text) > 100 else text,
+            'predicted_label': row[4],
+            'confidence': row[5],
+            'processing_time': row[6],
+            'timestamp': row[7],
+            'model_version': row[8]
+        }
+    
+    def _feedback_row(self, row) -> Dict:
+        """Map a feedback/texts join row to a history record"""
+        text = self._unpack_text(row[1], row[2])
+        return {
+            'id': row[0],
+            'text': text[:100] + '...' if len(text) > 100 else text,
+            'predicted_label': row[3],
+            'user_label': row[4],
+            'timestamp': row[5]
+        }
+    
+    def search(self, query: str, kind: str = 'predictions', label: str = None,
+               start: str = None, end: str = None, limit: int = 20, offset: int = 0,
+               highlight: tuple = ('<mark>', '</mark>')) -> List[Dict]:
+        """
+        Full-text search over prediction or feedback history, best match first
+        
+        Matching runs against the FTS5 index and is ranked with bm25; label
+        and time filters are applied to the matching rows only.
+        
+        Args:
+            query: Search input (see build_match_query)
+            kind: 'predictions' or 'feedback'
+            label: Only return records with this label (user label for feedback)
+            start: Only return records at or after this time (ISO 8601)
+            end: Only return records before this time (ISO 8601)
+            limit: Maximum number of records to return
+            offset: Number of records to skip
+            highlight: Markers placed around matched terms in the snippet
+            
+        Returns:
+            List of history records, each with 'snippet' and 'score'
+            
+        Raises:
+            ValueError: If the query, kind or a time bound is invalid
+            RuntimeError: If this SQLite build has no FTS5 support
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Full-text search is not available")
+        
+        if kind == 'predictions':
+            select_sql = '''
+                SELECT p.id, p.request_id, t.content, t.compressed, p.predicted_label,
+                       p.confidence, p.processing_time, p.timestamp, p.model_version
+            '''
+            table, alias, label_column, row_mapper = 'predictions', 'p', 'predicted_label', self._prediction_row
+        elif kind == 'feedback':
+            select_sql = '''
+                SELECT f.id, t.content, t.compressed, f.predicted_label, f.user_label,
+                       f.timestamp
+            '''
+            table, alias, label_column, row_mapper = 'feedback', 'f', 'user_label', self._feedback_row
+        else:
+            raise ValueError(f"Unknown search kind: {kind}")
+        
+        conditions = ['texts_fts MATCH ?']
+        params = [build_match_query(query)]
+        
+        if label:
+            conditions.append(f'{alias}.{label_column} = ?')
+            params.append(label)
+        if start:
+            conditions.append(f'{alias}.timestamp >= ?')
+            params.append(normalize_timestamp(start))
+        if end:
+            conditions.append(f'{alias}.timestamp < ?')
+            params.append(normalize_timestamp(end))
+        
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                {select_sql},
+                       snippet(texts_fts, 0, ?, ?, '...', 16), bm25(texts_fts) AS score
+                FROM texts_fts
+                JOIN texts t ON t.id = texts_fts.rowid
+                JOIN {table} {alias} ON {alias}.text_id = texts_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score, {alias}.id DESC
+                LIMIT ? OFFSET ?
+            ''', [highlight[0], highlight[1]] + params + [limit, offset]).fetchall()
+        
+        results = []
+        for row in rows:
+            record = row_mapper(row[:-2])
+            record['snippet'] = row[-2]
+            # bm25 is negative, lower is better; report higher-is-better
+            record['score'] = round(-row[-1], 4)
+            results.append(record)
+        return results
+    
+    def iter_export(self, kind: str = 'predictions', label: str = None, start: str = None,
+                    end: str = None, batch_size: int = 1000) -> Iterator[List[tuple]]:
         """
-        Get database statistics
+        Stream full history rows, oldest first, in batches
+        
+        Rows come straight from a cursor with fetchmany on a dedicated
+        connection (not one from the pool), so an export of any size runs in
+        constant memory without tying up a pooled connection for its whole
+        duration. Arguments are validated before the first batch is read.
         
+        Args:
+            kind: 'predictions' or 'feedback'
+            label: Only export records with this label (user label for feedback)
+            start: Only export records at or after this time (ISO 8601)
+            end: Only export records before this time (ISO 8601)
+            batch_size: Rows fetched per batch
+            
+        Returns:
+            Iterator of row batches; columns are EXPORT_COLUMNS[kind]
+            
+        Raises:
+            ValueError: If the kind or a time bound is invalid
+        """
+        if kind == 'predictions':
+            select_sql = '''
+                SELECT p.id, p.request_id, unpack_text(t.content, t.compressed), p.predicted_label,
+                       p.confidence, p.processing_time, p.timestamp, p.model_version
+                FROM predictions p
+                JOIN texts t ON t.id = p.text_id
+            '''
+            alias, label_column = 'p', 'predicted_label'
+        elif kind == 'feedback':
+            select_sql = '''
+                SELECT f.id, unpack_text(t.content, t.compressed), f.predicted_label, f.user_label,
+                       f.timestamp
+                FROM feedback f
+                JOIN texts t ON t.id = f.text_id
+            '''
+            alias, label_column = 'f', 'user_label'
+        else:
+            raise ValueError(f"Unknown export kind: {kind}")
+        
+        conditions = []
+        params = []
+        if label:
+            conditions.append(f'{alias}.{label_column} = ?')
+            params.append(label)
+        if start:
+            conditions.append(f'{alias}.timestamp >= ?')
+            params.append(normalize_timestamp(start))
+        if end:
+            conditions.append(f'{alias}.timestamp < ?')
+            params.append(normalize_timestamp(end))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f'''
+            {select_sql}
+            {where}
+            ORDER BY {alias}.timestamp, {alias}.id
+        '''
+        
+        return self._export_batches(sql, params, batch_size)
+    
+    def _export_batches(self, sql: str, params: List, batch_size: int) -> Iterator[List[tuple]]:
+        """Yield fetchmany batches of a query; the connection closes with the generator"""
+        conn = self._open_connection()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+    
+    def get_statistics(self, start: str = None, end: str = None) -> Dict:
+        """
+        Get database statistics from the rollup tables
+        
+        Without a window the daily rollups are summed; with one, hourly
+        rollups are used, so the window is widened to whole hours: start
+        is rounded down and end rounded up to the hour. Every hour that
+        overlaps the window is counted in full.
+        
+        Args:
+            start: Only count records at or after this time, rounded down to the hour (ISO 8601)
+            end: Only count records before this time, rounded up to the hour (ISO 8601)
+            
         Returns:
             Dictionary with statistics
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            granularity = 'hour' if (start or end) else 'day'
+            where, params = self._rollup_window(granularity, start, end)
+            
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get prediction counts by label
-                cursor.execute('''
-                    SELECT predicted_label, COUNT(*) as count
-                    FROM predictions
+                # Get prediction counts and sums by label
+                cursor.execute(f'''
+                    SELECT predicted_label, SUM(count), SUM(sum_confidence), SUM(sum_processing_time)
+                    FROM prediction_rollups
+                    {where}
                     GROUP BY predicted_label
-                ''')
+                ''', params)
                 
-                label_counts = dict(cursor.fetchall())
-                
-                # Get total predictions
-                cursor.execute('SELECT COUNT(*) FROM predictions')
-                total_predictions = cursor.fetchone()[0]
+                rows = cursor.fetchall()
+                label_counts = {row[0]: row[1] for row in rows}
+                total_predictions = sum(row[1] for row in rows)
+                sum_confidence = sum(row[2] for row in rows)
+                sum_processing_time = sum(row[3] for row in rows)
                 
                 # Get total feedback
-                cursor.execute('SELECT COUNT(*) FROM feedback')
+                cursor.execute(f'''
+                    SELECT COALESCE(SUM(count), 0)
+                    FROM feedback_rollups
+                    {where}
+                ''', params)
                 total_feedback = cursor.fetchone()[0]
-                
-                # Get average confidence
-                cursor.execute('SELECT AVG(confidence) FROM predictions')
-                avg_confidence = cursor.fetchone()[0] or 0
-                
-                # Get average processing time
-                cursor.execute('SELECT AVG(processing_time) FROM predictions')
-                avg_processing_time = cursor.fetchone()[0] or 0
-                
-                return {
-                    'total_predictions': total_predictions,
-                    'total_feedback': total_feedback,
-                    'label_counts': label_counts,
-                    'average_confidence': round(avg_confidence, 3),
-                    'average_processing_time': round(avg_processing_time, 3)
-                }
-                
+            
+            avg_confidence = sum_confidence / total_predictions if total_predictions else 0
+            avg_processing_time = sum_processing_time / total_predictions if total_predictions else 0
+            
+            return {
+                'total_predictions': total_predictions,
+                'total_feedback': total_feedback,
+                'label_counts': label_counts,
+                'average_confidence': round(avg_confidence, 3),
+                'average_processing_time': round(avg_processing_time, 3)
+            }
+            
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get statistics: {e}")
             return {}
     
-    def cleanup_old_records(self, days: int = 30) -> int:
+    def get_statistics_series(self, granularity: str = 'hour', start: str = None,
+                              end: str = None) -> List[Dict]:
+        """
+        Get per-bucket statistics for charting
+        
+        Args:
+            granularity: 'hour' or 'day'
+            start: Only include buckets ending after this time (ISO 8601)
+            end: Only include buckets starting before this time (ISO 8601)
+            
+        Returns:
+            List of buckets in time order
+            
+        Raises:
+            ValueError: If the granularity or a time bound is invalid
+        """
+        if granularity not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        
+        where, params = self._rollup_window(granularity, start, end)
+        
+        with self._connection() as conn:
+            predictions = conn.execute(f'''
+                SELECT bucket_start, predicted_label, count, sum_confidence
+                FROM prediction_rollups
+                {where}
+                ORDER BY bucket_start
+            ''', params).fetchall()
+            
+            feedback = dict(conn.execute(f'''
+                SELECT bucket_start, count
+                FROM feedback_rollups
+                {where}
+            ''', params).fetchall())
+        
+        buckets = {}
+        for bucket_start, label, count, sum_confidence in predictions:
+            bucket = buckets.setdefault(bucket_start, {
+                'bucket_start': bucket_start,
+                'total_predictions': 0,
+                'label_counts': {},
+                'total_feedback': feedback.get(bucket_start, 0),
+                '_sum_confidence': 0.0
+            })
+            bucket['total_predictions'] += count
+            bucket['label_counts'][label] = count
+            bucket['_sum_confidence'] += sum_confidence
+        
+        for bucket_start, count in feedback.items():
+            buckets.setdefault(bucket_start, {
+                'bucket_start': bucket_start,
+                'total_predictions': 0,
+                'label_counts': {},
+                'total_feedback': count,
+                '_sum_confidence': 0.0
+            })
+        
+        series = []
+        for bucket_start in sorted(buckets):
+            bucket = buckets[bucket_start]
+            sum_confidence = bucket.pop('_sum_confidence')
+            total = bucket['total_predictions']
+            bucket['average_confidence'] = round(sum_confidence / total, 3) if total else 0
+            series.append(bucket)
+        
+        return series
+    
+    @staticmethod
+    def _rollup_window(granularity: str, start: Optional[str], end: Optional[str]):
+        """Build the WHERE clause selecting rollup buckets that overlap a time window"""
+        conditions = ['granularity = ?']
+        params = [granularity]
+        
+        if start:
+            conditions.append(f"bucket_start >= {ROLLUP_BUCKETS[granularity].format(ts='?')}")
+            params.append(normalize_timestamp(start))
+        if end:
+            conditions.append('bucket_start < ?')
+            params.append(normalize_timestamp(end))
+        
+        return f"WHERE {' AND '.join(conditions)}", params
+    
+    def cleanup_old_records(self, days: int = 30, batch_size: int = 1000, pause: float = 0.05,
+                            progress_callback: Callable[[Dict], None] = None,
+                            tables: tuple = ('predictions', 'feedback')) -> int:
         """
-        Clean up old records
+        Clean up old records in small batches
+        
+        Rows are deleted by rowid range, one short transaction per batch with
+        a pause in between, so live writes are never blocked for long. Texts
+        left unreferenced are dropped and the freed pages are returned to the
+        filesystem with incremental vacuum.
         
         Args:
             days: Number of days to keep records for
+            batch_size: Rowid range covered by each delete transaction
+            pause: Seconds to sleep between batches
+            progress_callback: Called with a progress dict after every batch
+            tables: Tables to clean up ('predictions' and/or 'feedback')
             
         Returns:
             Number of records deleted
         """
+        cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        progress = {
+            'phase': None,
+            'deleted': 0,
+            'position': None,
+            'end': None
+        }
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Delete old predictions
-                cursor.execute('''
-                    DELETE FROM predictions 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                
-                deleted_predictions = cursor.rowcount
-                
-                # Delete old feedback
-                cursor.execute('''
-                    DELETE FROM feedback 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                
-                deleted_feedback = cursor.rowcount
-                
-                conn.commit()
-                
-                total_deleted = deleted_predictions + deleted_feedback
-                logger.info(f"Cleaned up {total_deleted} old records")
-                
-                return total_deleted
-                
+            total_deleted = 0
+            for table in tables:
+                total_deleted += self._delete_in_batches(
+                    table, 'timestamp < ?', [cutoff],
+                    batch_size, pause, progress, progress_callback,
+                    range_sql=f'SELECT MIN(id), MAX(id) FROM {table} WHERE timestamp < ?'
+                )
+            
+            self.delete_orphan_texts(batch_size, pause, progress, progress_callback)
+            self.incremental_vacuum(pause=pause)
+            
+            logger.info(f"Cleaned up {total_deleted} old records")
+            return total_deleted
+            
         except Exception as e:
             logger.error(f"Failed to cleanup old records: {e}")
-            return 0 
\ No newline at end of file
+            return 0
+    
+    def delete_orphan_texts(self, batch_size: int = 1000, pause: float = 0.05,
+                            progress: Dict = None,
+                            progress_callback: Callable[[Dict], None] = None) -> int:
+        """
+        Drop texts no longer referenced by any prediction or feedback row
+        
+        Returns:
+            Number of texts deleted
+        """
+        return self._delete_in_batches(
+            'texts',
+            '''NOT EXISTS (SELECT 1 FROM predictions WHERE text_id = texts.id)
+               AND NOT EXISTS (SELECT 1 FROM feedback WHERE text_id = texts.id)''',
+            [], batch_size, pause, progress, progress_callback
+        )
+    
+    def _delete_in_batches(self, table: str, where_sql: str, params: List, batch_size: int,
+                           pause: float, progress: Dict = None,
+                           progress_callback: Callable[[Dict], None] = None,
+                           range_sql: str = None) -> int:
+        """
+        Delete matching rows one rowid range at a time
+        
+        Args:
+            table: Table to delete from
+            where_sql: Condition rows must match to be deleted
+            params: Parameters for where_sql (and range_sql)
+            batch_size: Rowid range covered by each transaction
+            pause: Seconds to sleep between batches
+            progress: Progress dict updated in place
+            progress_callback: Called with the progress dict after every batch
+            range_sql: Query for the (min, max) rowid to scan; defaults to the whole table
+            
+        Returns:
+            Number of rows deleted
+        """
+        progress = progress if progress is not None else {}
+        
+        with self._connection() as conn:
+            if range_sql:
+                low, high = conn.execute(range_sql, params).fetchone()
+            else:
+                low, high = conn.execute(f'SELECT MIN(id), MAX(id) FROM {table}').fetchone()
+        
+        if low is None:
+            return 0
+        
+        deleted = 0
+        position = low
+        while position <= high:
+            with self._connection() as conn:
+                cursor = conn.execute(f'''
+                    DELETE FROM {table}
+                    WHERE id >= ? AND id < ? AND {where_sql}
+                ''', [position, position + batch_size] + list(params))
+                deleted += cursor.rowcount
+            
+            position += batch_size
+            progress.update({
+                'phase': table,
+                'deleted': progress.get('deleted', 0) + cursor.rowcount,
+                'position': min(position, high),
+                'end': high
+            })
+            if progress_callback:
+                progress_callback(dict(progress))
+            
+            if pause and position <= high:
+                time.sleep(pause)
+        
+        return deleted
+    
+    def incremental_vacuum(self, pages_per_step: int = 1000, pause: float = 0.05) -> int:
+        """
+        Return free pages to the filesystem a few at a time
+        
+        Args:
+            pages_per_step: Pages released per step
+            pause: Seconds to sleep between steps
+            
+        Returns:
+            Number of pages released
+        """
+        released = 0
+        conn = self._acquire()
+        try:
+            while True:
+                free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if not free_pages:
+                    break
+                
+                conn.execute(f'PRAGMA incremental_vacuum({min(free_pages, pages_per_step)})').fetchall()
+                remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if remaining >= free_pages:
+                    # auto_vacuum is not INCREMENTAL on this database
+                    logger.info("Free pages are not returned to the filesystem; run "
+                                "scripts/enable_incremental_vacuum.py once to convert the database")
+                    break
+                
+                released += free_pages - remaining
+                if remaining and pause:
+                    time.sleep(pause)
+        finally:
+            self._release(conn)
+        
+        return released
+
+class RetentionJob:
+    """Background thread that periodically applies the retention policy
+    
+    With a lock_path, only the process holding an exclusive lock on that file
+    runs the cleanup, so gunicorn workers sharing a database do not each run
+    it. The lock is kept until the process exits; another process takes over
+    on its next interval.
+    """
+    
+    def __init__(self, database: Database, days: Optional[int], interval_seconds: float = 3600,
+                 batch_size: int = 1000, pause: float = 0.05, archiver=None,
+                 lock_path: str = None, job_queue=None, job_days: float = 7):
+        """
+        Start the retention job
+        
+        Args:
+            database: Database to clean up
+            days: Number of days to keep records for (None keeps them)
+            interval_seconds: Seconds between cleanup runs
+            batch_size: Rowid range covered by each delete transaction
+            pause: Seconds to sleep between batches
+            archiver: Optional PredictionArchiver that moves aged predictions
+                to Parquet before they would be deleted
+            lock_path: File locked by the one process that runs the cleanup
+            job_queue: Optional JobQueue whose finished jobs are deleted
+            job_days: Number of days to keep finished jobs and their files for
+        """
+        self.database = database
+        self.archiver = archiver
+        self.job_queue = job_queue
+        self.job_days = job_days
+        self.lock_path = lock_path
+        self._lock_file = None
+        self.days = days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause = pause
+        
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._status = {
+            'running': False,
+            'last_run': None,
+            'last_deleted': None,
+            'last_archived': None,
+            'last_jobs_deleted': None,
+            'progress': None,
+            'leader': lock_path is None
+        }
+        
+        self._thread = threading.Thread(target=self._run, name='db-retention', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            if self._take_lock():
+                self.run_once()
+    
+    def _take_lock(self) -> bool:
+        """Whether this process runs the cleanup, taking the lock file if it is free"""
+        if self.lock_path is None or fcntl is None or self._lock_file is not None:
+            return True
+        
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another process runs the cleanup
+            lock_file.close()
+            return False
+        
+        self._lock_file = lock_file
+        with self._lock:
+            self._status['leader'] = True
+        logger.info(f"Retention job runs in this process (pid {os.getpid()})")
+        return True
+    
+    def run_once(self) -> int:
+        """Run one cleanup pass now"""
+        with self._lock:
+            self._status['running'] = True
+        
+        if self.job_queue is not None:
+            try:
+                jobs_deleted = self.job_queue.cleanup_finished(self.job_days)
+                with self._lock:
+                    self._status['last_jobs_deleted'] = jobs_deleted
+            except Exception as e:
+                logger.error(f"Deleting old batch jobs failed: {e}")
+        
+        if self.days is None:
+            with self._lock:
+                self._status.update({
+                    'running': False,
+                    'last_run': datetime.utcnow().isoformat()
+                })
+            return 0
+        
+        tables = ('predictions', 'feedback')
+        if self.archiver is not None:
+            try:
+                archived = self.archiver.archive_older_than(self.days, pause=self.pause)
+                with self._lock:
+                    self._status['last_archived'] = archived
+            except Exception as e:
+                # Aged predictions that were not archived must not be deleted;
+                # they are retried on the next run
+                logger.error(f"Archiving old predictions failed, keeping them until the next run: {e}")
+                tables = ('feedback',)
+        
+        deleted = self.database.cleanup_old_records(
+            days=self.days,
+            batch_size=self.batch_size,
+            pause=self.pause,
+            progress_callback=self._on_progress,
+            tables=tables
+        )
+        
+        with self._lock:
+            self._status.update({
+                'running': False,
+                'last_run': datetime.utcnow().isoformat(),
+                'last_deleted': deleted
+            })
+        return deleted
+    
+    def _on_progress(self, progress: Dict):
+        with self._lock:
+            self._status['progress'] = progress
+        logger.debug(f"Retention progress: {progress}")
+    
+    def get_status(self) -> Dict:
+        """Get the state of the current or last cleanup run"""
+        with self._lock:
+            return dict(self._status)
+    
+    def stop(self):
+        """Stop scheduling further runs and hand the lock to another process"""
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
@@ -0,0 +1,67 @@
+import io
+import csv
+import zlib
+from typing import Iterable, Iterator, List
+
+from .json_provider import dumps
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def format_ndjson(batches: Iterable[List[tuple]], columns: List[str]) -> Iterator[bytes]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch"""
+    for rows in batches:
+        yield ''.join(
+            dumps(dict(zip(columns, row))) + '\n' for row in rows
+        ).encode('utf-8')
+
+def format_csv(batches: Iterable[List[tuple]], columns: List[str]) -> Iterator[bytes]:
+    """Encode row batches as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+    
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(batches: Iterable[List[tuple]], columns: List[str], fmt: str = 'ndjson',
+                  compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode an export as a stream of byte chunks
+    
+    Args:
+        batches: Row batches, e.g. from Database.iter_export
+        columns: Column names matching the row tuples
+        fmt: 'ndjson' or 'csv'
+        compress: Gzip the output
+        
+    Returns:
+        Iterator of encoded chunks
+        
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == 'ndjson':
+        chunks = format_ndjson(batches, columns)
+    elif fmt == 'csv':
+        chunks = format_csv(batches, columns)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,255 @@
+import sys
+import queue
+import logging
+import threading
+import multiprocessing
+from typing import Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows; workers are recycled by task count only
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+class ExtractionError(Exception):
+    """Raised when an extraction task fails inside a worker"""
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when an extraction task exceeds its time budget"""
+
+class ExtractionQueueFull(ExtractionError):
+    """Raised when the pool has no room for another task"""
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak RSS of the current process in KB, None where it cannot be read"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def _worker_main(conn, func: Callable[[bytes], Optional[str]]):
+    """Worker loop: receive HTML bytes, send back (text, error, peak RSS in KB or None)"""
+    while True:
+        try:
+            payload = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if payload is None:
+            break
+
+        result, error = None, None
+        try:
+            result = func(payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        rss_kb = peak_rss_kb()
+
+        try:
+            conn.send((result, error, rss_kb))
+        except (EOFError, OSError):
+            break
+
+class _Worker:
+    """Handle for a single extraction process"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks_done = 0
+        self.rss_kb = 0
+
+class ExtractionPool:
+    """Pool of worker processes that turn raw HTML into cleaned article text
+
+    HTML parsing is pure-Python, GIL-bound work. Running it in separate
+    processes keeps a pathological page from stalling request threads or
+    the model thread; a task that overruns its timeout gets its worker
+    killed and replaced.
+    """
+
+    def __init__(self, func: Callable[[bytes], Optional[str]], workers: int = 2,
+                 max_queue: int = 16, task_timeout: float = 5.0,
+                 queue_timeout: float = 10.0, max_tasks_per_worker: int = 200,
+                 max_rss_mb: int = 512, start_method: str = 'spawn'):
+        """
+        Initialize the extraction pool
+
+        Args:
+            func: Module-level function mapping HTML bytes to text
+            workers: Number of worker processes
+            max_queue: Maximum number of tasks waiting for a free worker
+            task_timeout: Seconds a single task may run before its worker is killed
+            queue_timeout: Seconds a task may wait for a free worker
+            max_tasks_per_worker: Recycle a worker after this many tasks
+            max_rss_mb: Recycle a worker once its peak RSS exceeds this
+            start_method: multiprocessing start method for workers
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.func = func
+        self.workers = workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.queue_timeout = queue_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_kb = max_rss_mb * 1024
+
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'tasks': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'recycled': 0
+        }
+
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+        logger.info(f"Extraction pool started with {workers} workers")
+
+    def extract(self, html: bytes, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Extract text from HTML in a worker process
+
+        Args:
+            html: Raw HTML bytes
+            timeout: Per-task timeout overriding the pool default
+
+        Returns:
+            Extracted text or None if nothing useful was found
+        """
+        if self._closed:
+            raise ExtractionError("Extraction pool is shut down")
+
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise ExtractionQueueFull("Extraction queue is full")
+
+        try:
+            try:
+                worker = self._idle.get(timeout=self.queue_timeout)
+            except queue.Empty:
+                self._count('timeouts')
+                raise ExtractionTimeout("Timed out waiting for an extraction worker")
+
+            return self._run(worker, html, timeout or self.task_timeout)
+        finally:
+            self._slots.release()
+
+    def _run(self, worker: _Worker, html: bytes, timeout: float) -> Optional[str]:
+        """Run one task on a checked-out worker and return the worker to the pool"""
+        healthy = False
+        try:
+            worker.conn.send(html)
+
+            if not worker.conn.poll(timeout):
+                self._count('timeouts')
+                raise ExtractionTimeout(f"Extraction exceeded {timeout}s")
+
+            result, error, rss_kb = worker.conn.recv()
+            worker.tasks_done += 1
+            worker.rss_kb = rss_kb
+            healthy = True
+
+        except (EOFError, OSError) as e:
+            self._count('errors')
+            raise ExtractionError(f"Extraction worker died: {e}")
+
+        finally:
+            self._release(worker, healthy)
+
+        self._count('tasks')
+
+        if error:
+            self._count('errors')
+            raise ExtractionError(error)
+
+        return result
+
+    def _release(self, worker: _Worker, healthy: bool):
+        """Put a worker back, or replace it if it is broken or due for recycling"""
+        if self._closed:
+            self._retire(worker, kill=not healthy)
+            return
+
+        if not healthy:
+            self._retire(worker, kill=True)
+            self._idle.put(self._spawn())
+            return
+
+        if (worker.tasks_done >= self.max_tasks_per_worker
+                or (worker.rss_kb is not None and worker.rss_kb > self.max_rss_kb)):
+            logger.info(f"Recycling extraction worker {worker.process.pid} "
+                        f"after {worker.tasks_done} tasks ({worker.rss_kb} KB peak RSS)")
+            self._count('recycled')
+            self._retire(worker)
+            self._idle.put(self._spawn())
+            return
+
+        self._idle.put(worker)
+
+    def _spawn(self) -> _Worker:
+        """Start a new worker process"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.func),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        """Stop a worker process"""
+        try:
+            if not kill:
+                worker.conn.send(None)
+                worker.process.join(1.0)
+        except (EOFError, OSError):
+            pass
+
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+
+        worker.conn.close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> Dict:
+        """Get pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats.update({
+            'workers': self.workers,
+            'idle_workers': self._idle.qsize(),
+            'max_queue': self.max_queue
+        })
+        return stats
+
+    def shutdown(self):
+        """Stop all idle workers; busy workers stop when their task finishes"""
+        self._closed = True
+
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(worker)
+
+        logger.info("Extraction pool shut down")
@@ -0,0 +1,212 @@
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from .metrics import CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Value of each state in the hoax_circuit_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised when a host's circuit is open and requests should fail fast"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Host {host} is unavailable, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+class HostHealth:
+    """Observed health of a single host"""
+
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.ewma_latency = None
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def p95_latency(self) -> Optional[float]:
+        """95th percentile of recent successful request latencies"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+class HostHealthTracker:
+    """Per-host latency tracking and circuit breaking for outbound fetches
+
+    Each host gets a latency EWMA, a window of recent latencies and a
+    consecutive-failure count. After ``failure_threshold`` failures in a row
+    the circuit opens and requests fail immediately; once ``open_seconds``
+    have passed a single probe request is let through (half-open) and its
+    outcome closes or re-opens the circuit. Request timeouts follow each
+    host's observed p95 latency.
+    """
+
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 30.0,
+                 ewma_alpha: float = 0.2, window: int = 50, min_samples: int = 5,
+                 timeout_multiplier: float = 2.0, min_timeout: float = 2.0,
+                 max_timeout: float = 10.0, max_hosts: int = 1000):
+        """
+        Initialize the tracker
+
+        Args:
+            failure_threshold: Consecutive failures that open a host's circuit
+            open_seconds: Seconds a circuit stays open before a probe is allowed
+            ewma_alpha: Smoothing factor for the latency EWMA
+            window: Number of recent latencies kept per host for p95
+            min_samples: Latency samples needed before timeouts adapt
+            timeout_multiplier: Timeout as a multiple of the host's p95 latency
+            min_timeout: Lower bound for adaptive timeouts in seconds
+            max_timeout: Upper bound (and default) for timeouts in seconds
+            max_hosts: Number of hosts tracked before the least recent is dropped
+        """
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.ewma_alpha = ewma_alpha
+        self.window = window
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_hosts = max_hosts
+
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, host: str) -> HostHealth:
+        """Get (or create) the health record for a host; caller holds the lock"""
+        health = self._hosts.get(host)
+        if health is None:
+            health = HostHealth(self.window)
+            self._hosts[host] = health
+            if len(self._hosts) > self.max_hosts:
+                dropped, _ = self._hosts.popitem(last=False)
+                try:
+                    CIRCUIT_STATE.remove(dropped)
+                except KeyError:
+                    pass
+        else:
+            self._hosts.move_to_end(host)
+        return health
+
+    @staticmethod
+    def _set_state(host: str, health: HostHealth, state: str):
+        """Move a host to a circuit state; caller holds the lock"""
+        health.state = state
+        CIRCUIT_STATE.labels(host).set(STATE_VALUES[state])
+
+    def _timeout_for(self, health: HostHealth) -> float:
+        if len(health.latencies) < self.min_samples:
+            return self.max_timeout
+        timeout = health.p95_latency() * self.timeout_multiplier
+        return max(self.min_timeout, min(self.max_timeout, timeout))
+
+    def before_request(self, host: str) -> float:
+        """
+        Check a host before fetching from it
+
+        Args:
+            host: Host name (URL netloc)
+
+        Returns:
+            Timeout in seconds to use for the request
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+        """
+        with self._lock:
+            health = self._get(host)
+
+            if health.state == OPEN:
+                elapsed = time.monotonic() - health.opened_at
+                if elapsed < self.open_seconds:
+                    raise CircuitOpenError(host, self.open_seconds - elapsed)
+                self._set_state(host, health, HALF_OPEN)
+                logger.info(f"Circuit for {host} is half-open, sending probe")
+
+            if health.state == HALF_OPEN:
+                if health.probe_in_flight:
+                    raise CircuitOpenError(host, self.open_seconds)
+                health.probe_in_flight = True
+
+            health.total_requests += 1
+            return self._timeout_for(health)
+
+    def record_success(self, host: str, latency: float):
+        """Record a request that reached the host"""
+        with self._lock:
+            health = self._get(host)
+            health.latencies.append(latency)
+            if health.ewma_latency is None:
+                health.ewma_latency = latency
+            else:
+                health.ewma_latency += self.ewma_alpha * (latency - health.ewma_latency)
+
+            health.consecutive_failures = 0
+            health.probe_in_flight = False
+            if health.state != CLOSED:
+                logger.info(f"Circuit for {host} closed")
+                self._set_state(host, health, CLOSED)
+
+    def record_failure(self, host: str):
+        """Record a request that timed out, failed to connect or got a 5xx"""
+        with self._lock:
+            health = self._get(host)
+            health.consecutive_failures += 1
+            health.total_failures += 1
+
+            if (health.state == HALF_OPEN
+                    or health.consecutive_failures >= self.failure_threshold):
+                if health.state != OPEN:
+                    logger.warning(f"Circuit for {host} opened after "
+                                   f"{health.consecutive_failures} consecutive failures")
+                self._set_state(host, health, OPEN)
+                health.opened_at = time.monotonic()
+
+            health.probe_in_flight = False
+
+    def record_aborted(self, host: str):
+        """
+        Record a request that ended without an answer from the host (cancelled
+        or failed locally); it counts neither way, but a half-open probe is
+        released so the next request can probe again
+        """
+        with self._lock:
+            health = self._hosts.get(host)
+            if health is not None:
+                health.probe_in_flight = False
+
+    def get_state(self, host: str) -> str:
+        """Get the circuit state of a host"""
+        with self._lock:
+            health = self._hosts.get(host)
+            return health.state if health else CLOSED
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get a snapshot of every tracked host"""
+        with self._lock:
+            stats = {}
+            for host, health in self._hosts.items():
+                p95 = health.p95_latency()
+                stats[host] = {
+                    'state': health.state,
+                    'ewma_latency': round(health.ewma_latency, 3) if health.ewma_latency is not None else None,
+                    'p95_latency': round(p95, 3) if p95 is not None else None,
+                    'timeout': round(self._timeout_for(health), 3),
+                    'consecutive_failures': health.consecutive_failures,
+                    'total_requests': health.total_requests,
+                    'total_failures': health.total_failures
+                }
+            return stats
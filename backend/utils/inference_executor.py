@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .metrics import EVENTS, QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+class InferenceQueueFull(Exception):
+    """Raised when too many inference tasks are already waiting"""
+
+class InferenceExecutor:
+    """Bounded executor that runs model inference off the event loop
+
+    Inference is CPU/GPU bound and the models are not safe to call from many
+    threads at once, so tasks run on a small dedicated thread pool (one
+    thread by default). At most ``max_pending`` tasks may be queued or
+    running; beyond that callers are rejected immediately instead of piling
+    up behind the model.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 64):
+        """
+        Initialize the executor
+
+        Args:
+            workers: Number of inference threads
+            max_pending: Maximum number of queued plus running tasks
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            'tasks': 0,
+            'errors': 0,
+            'rejected': 0
+        }
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) on an inference thread and await its result
+
+        Raises:
+            InferenceQueueFull: If max_pending tasks are already queued or running
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            EVENTS.labels('inference_rejected').inc()
+            raise InferenceQueueFull("Inference queue is full")
+
+        with self._lock:
+            self._pending += 1
+            QUEUE_DEPTH.labels('inference').set(self._pending)
+
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except RuntimeError:
+            self._done(None)
+            raise
+
+        # The slot is held until the task really finishes, even if the
+        # awaiting request is cancelled in the meantime
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            QUEUE_DEPTH.labels('inference').set(self._pending)
+            self._stats['tasks'] += 1
+            if future is not None and not future.cancelled() and future.exception() is not None:
+                self._stats['errors'] += 1
+        self._slots.release()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> Dict:
+        """Get executor counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+
+        stats.update({
+            'workers': self.workers,
+            'max_pending': self.max_pending
+        })
+        return stats
+
+    def shutdown(self):
+        """Stop accepting work and wait for running tasks"""
+        self._executor.shutdown(wait=True)
+        logger.info("Inference executor shut down")
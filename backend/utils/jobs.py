@@ -0,0 +1,420 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from .database import Database
+from .batch import result_record
+from .json_provider import dumps
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+JOBS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        filename TEXT,
+        total_rows INTEGER,
+        processed_rows INTEGER NOT NULL DEFAULT 0,
+        error_rows INTEGER NOT NULL DEFAULT 0,
+        result_bytes INTEGER NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker_id TEXT,
+        error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME,
+        heartbeat_at DATETIME,
+        finished_at DATETIME
+    )
+'''
+
+def _now() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled"""
+
+class JobQueue:
+    """Durable batch job queue stored in the application database
+
+    Each job owns a directory with the uploaded CSV (``input.csv``) and the
+    NDJSON results written so far (``results.ndjson``). Progress is
+    committed per chunk as (processed_rows, result_bytes): the results file
+    is fsynced before the row is updated, so a job taken over after a
+    worker crash truncates the file back to result_bytes and continues from
+    processed_rows instead of starting over.
+    """
+
+    def __init__(self, database: Database, storage_dir: str, stale_seconds: float = 120,
+                 max_attempts: int = 3):
+        """
+        Initialize the job queue
+
+        Args:
+            database: Database holding the jobs table
+            storage_dir: Directory for job inputs and results
+            stale_seconds: A running job without a heartbeat for this long is taken over
+            max_attempts: Number of times a job may be started before it is failed
+        """
+        self.database = database
+        self.storage_dir = storage_dir
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(storage_dir, exist_ok=True)
+
+        with self.database._connection() as conn:
+            conn.execute(JOBS_SCHEMA)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.storage_dir, job_id)
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'input.csv')
+
+    def results_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'results.ndjson')
+
+    def submit(self, stream, filename: str = None) -> str:
+        """
+        Store an uploaded CSV and queue a job for it
+
+        Args:
+            stream: Readable binary file object with the CSV
+            filename: Original file name, kept for display
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+
+        with open(self.input_path(job_id), 'wb') as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+
+        with self.database._connection() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, filename) VALUES (?, ?, ?)',
+                (job_id, QUEUED, filename)
+            )
+
+        logger.info(f"Queued batch job {job_id} ({filename})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a job's status and progress"""
+        with self.database._connection() as conn:
+            row = conn.execute('''
+                SELECT id, status, filename, total_rows, processed_rows, error_rows, result_bytes,
+                       attempts, error, created_at, started_at, heartbeat_at, finished_at
+                FROM jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(zip(
+            ['id', 'status', 'filename', 'total_rows', 'processed_rows', 'error_rows',
+             'result_bytes', 'attempts', 'error', 'created_at', 'started_at',
+             'heartbeat_at', 'finished_at'],
+            row
+        ))
+        job['progress'] = (round(job['processed_rows'] / job['total_rows'], 4)
+                           if job['total_rows'] else None)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job; a running job stops after its current chunk
+
+        Returns:
+            True if the job was cancelled
+        """
+        with self.database._connection() as conn:
+            cursor = conn.execute('''
+                UPDATE jobs SET status = ?, finished_at = ?
+                WHERE id = ? AND status IN (?, ?)
+            ''', (CANCELLED, _now(), job_id, QUEUED, RUNNING))
+            return cursor.rowcount > 0
+
+    def delete(self, job_id: str) -> bool:
+        """
+        Delete a completed, failed or cancelled job with its input and results
+
+        Returns:
+            True if the job was deleted
+        """
+        with self.database._connection() as conn:
+            cursor = conn.execute('''
+                DELETE FROM jobs WHERE id = ? AND status IN (?, ?, ?)
+            ''', (job_id, *FINISHED))
+            deleted = cursor.rowcount > 0
+
+        if deleted:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return deleted
+
+    def cleanup_finished(self, days: float) -> int:
+        """
+        Delete completed, failed and cancelled jobs that finished more than `days` ago
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+        with self.database._connection() as conn:
+            job_ids = [row[0] for row in conn.execute('''
+                SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?
+            ''', (*FINISHED, cutoff))]
+
+        deleted = sum(1 for job_id in job_ids if self.delete(job_id))
+        if deleted:
+            logger.info(f"Deleted {deleted} batch jobs finished before {cutoff}")
+        return deleted
+
+    def iter_results(self, job_id: str, result_bytes: Optional[int] = None,
+                     block_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Stream the committed part of a job's results file
+
+        Args:
+            job_id: Job ID
+            result_bytes: Committed size to read up to (looked up when None)
+            block_size: Bytes per yielded block
+        """
+        if result_bytes is None:
+            job = self.get(job_id)
+            result_bytes = job['result_bytes'] if job else 0
+
+        remaining = result_bytes
+        if not remaining:
+            return
+
+        with open(self.results_path(job_id), 'rb') as f:
+            while remaining > 0:
+                data = f.read(min(block_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        Take the oldest queued job, or a running job whose worker stopped heartbeating
+
+        Returns:
+            The claimed job, or None if there is nothing to do
+        """
+        stale_before = (datetime.utcnow() - timedelta(seconds=self.stale_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+        with self.database._connection() as conn:
+            # Take the write lock first so two workers cannot claim the same job
+            conn.execute('BEGIN IMMEDIATE')
+            while True:
+                row = conn.execute('''
+                    SELECT id, attempts FROM jobs
+                    WHERE status = ? OR (status = ? AND heartbeat_at < ?)
+                    ORDER BY created_at, rowid
+                    LIMIT 1
+                ''', (QUEUED, RUNNING, stale_before)).fetchone()
+
+                if row is None:
+                    return None
+
+                job_id, attempts = row
+                if attempts < self.max_attempts:
+                    break
+
+                # Keeps crashing its workers; stop retrying it
+                conn.execute('''
+                    UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?
+                ''', (FAILED, f'Gave up after {attempts} attempts', _now(), job_id))
+                logger.error(f"Batch job {job_id} failed after {attempts} attempts")
+
+            now = _now()
+            conn.execute('''
+                UPDATE jobs
+                SET status = ?, worker_id = ?, attempts = attempts + 1,
+                    started_at = COALESCE(started_at, ?), heartbeat_at = ?
+                WHERE id = ?
+            ''', (RUNNING, worker_id, now, now, job_id))
+
+        return self.get(job_id)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        Record that a worker is still processing a job
+
+        Returns:
+            False if the job was cancelled or taken over by another worker
+        """
+        with self.database._connection() as conn:
+            cursor = conn.execute('''
+                UPDATE jobs SET heartbeat_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+            ''', (_now(), job_id, worker_id, RUNNING))
+            return cursor.rowcount > 0
+
+    def _commit_progress(self, job_id: str, worker_id: str, processed_rows: int,
+                         error_rows: int, result_bytes: int) -> bool:
+        with self.database._connection() as conn:
+            cursor = conn.execute('''
+                UPDATE jobs
+                SET processed_rows = ?, error_rows = ?, result_bytes = ?, heartbeat_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+            ''', (processed_rows, error_rows, result_bytes, _now(), job_id, worker_id, RUNNING))
+            return cursor.rowcount > 0
+
+    def _finish(self, job_id: str, worker_id: str, status: str, error: str = None):
+        with self.database._connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, finished_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+            ''', (status, error, _now(), job_id, worker_id, RUNNING))
+
+    def _set_total_rows(self, job_id: str, total_rows: int):
+        with self.database._connection() as conn:
+            conn.execute('UPDATE jobs SET total_rows = ? WHERE id = ?', (total_rows, job_id))
+
+    def run_job(self, job: Dict, worker_id: str,
+                process_chunk: Callable[[pd.DataFrame], List[Dict]],
+                chunk_size: int = 256):
+        """
+        Process a claimed job, resuming from its last committed chunk
+
+        Args:
+            job: Job returned by claim()
+            worker_id: ID the job was claimed with
+            process_chunk: Maps a DataFrame chunk to one result dict per row
+            chunk_size: Rows per chunk (and per progress commit)
+        """
+        job_id = job['id']
+        input_path = self.input_path(job_id)
+        processed_rows = job['processed_rows']
+        error_rows = job['error_rows']
+
+        try:
+            if job['total_rows'] is None:
+                total_rows = sum(len(chunk) for chunk in pd.read_csv(input_path, usecols=['text'],
+                                                                     chunksize=10000))
+                self._set_total_rows(job_id, total_rows)
+
+            if processed_rows:
+                logger.info(f"Resuming batch job {job_id} at row {processed_rows}")
+
+            with open(self.results_path(job_id), 'ab') as results:
+                # Drop anything written after the last committed chunk
+                results.truncate(job['result_bytes'])
+                results.seek(job['result_bytes'])
+
+                # Row numbers restart at 0 after skiprows; shift them back
+                offset = processed_rows
+                reader = pd.read_csv(input_path, chunksize=chunk_size,
+                                     skiprows=range(1, offset + 1))
+                for chunk in reader:
+                    chunk.index = chunk.index + offset
+
+                    records = [result_record(result) for result in process_chunk(chunk)]
+                    results.write(''.join(
+                        dumps(record) + '\n' for record in records
+                    ).encode('utf-8'))
+                    results.flush()
+                    os.fsync(results.fileno())
+
+                    processed_rows += len(chunk)
+                    error_rows += sum(1 for record in records if record['type'] == 'error')
+
+                    if not self._commit_progress(job_id, worker_id, processed_rows, error_rows,
+                                                 results.tell()):
+                        raise JobCancelled(job_id)
+
+            self._finish(job_id, worker_id, COMPLETED)
+            logger.info(f"Batch job {job_id} completed ({processed_rows} rows)")
+
+        except JobCancelled:
+            logger.info(f"Batch job {job_id} was cancelled or taken over, stopping")
+
+        except Exception as e:
+            logger.error(f"Batch job {job_id} failed: {e}")
+            self._finish(job_id, worker_id, FAILED, str(e))
+
+class JobWorker:
+    """Loop that claims and runs batch jobs, heartbeating while it works"""
+
+    def __init__(self, queue: JobQueue, process_chunk: Callable[[pd.DataFrame], List[Dict]],
+                 chunk_size: int = 256, poll_interval: float = 1.0,
+                 heartbeat_interval: float = 10.0):
+        """
+        Initialize the worker
+
+        Args:
+            queue: Job queue to take work from
+            process_chunk: Maps a DataFrame chunk to one result dict per row
+            chunk_size: Rows per chunk
+            poll_interval: Seconds to wait when no job is queued
+            heartbeat_interval: Seconds between heartbeats while a job runs
+        """
+        self.queue = queue
+        self.process_chunk = process_chunk
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._stop = threading.Event()
+
+    def run_once(self) -> bool:
+        """
+        Claim and run one job
+
+        Returns:
+            True if a job was run
+        """
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat_interval):
+                self.queue.heartbeat(job['id'], self.worker_id)
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            self.queue.run_job(job, self.worker_id, self.process_chunk, self.chunk_size)
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def run(self):
+        """Process jobs until stop() is called"""
+        logger.info(f"Batch worker {self.worker_id} started")
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Batch worker error: {e}")
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Batch worker {self.worker_id} stopped")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,95 @@
+import json
+import logging
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the standard library encoder is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _default(o: Any) -> Any:
+    """Encode values JSON has no type for: NumPy scalars/arrays, then Flask's extras"""
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    # Dates as HTTP dates, decimals, UUIDs and dataclasses, as Flask does
+    return DefaultJSONProvider.default(o)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                       | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+def encode(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON, with orjson when it is installed
+
+    NumPy scalars and arrays are encoded natively, so handlers can return
+    model outputs without converting them to Python floats first.
+    """
+    if orjson is not None:
+        options = (_ORJSON_OPTIONS | orjson.OPT_SORT_KEYS) if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=options)
+
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'),
+                      sort_keys=sort_keys).encode('utf-8')
+
+def dumps(obj: Any) -> str:
+    """encode() as a string, e.g. for NDJSON lines"""
+    return encode(obj).decode('utf-8')
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson
+
+    Responses are encoded straight to bytes without an intermediate str.
+    Keys keep their insertion order unless sort_keys is set.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return encode(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs) -> Any:
+        # orjson.JSONDecodeError subclasses ValueError, as Flask expects
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode(obj, self.sort_keys) + b'\n',
+                                         mimetype='application/json')
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Flask's standard library JSON provider, extended to NumPy values"""
+
+    sort_keys = False
+    default = staticmethod(_default)
+
+JSON_PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': NumpyJSONProvider
+}
+
+def get_json_provider(name: str = 'orjson') -> type:
+    """
+    Provider class for app.json, by name
+
+    Falls back to the standard library provider when orjson is requested
+    but not installed.
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON provider {name!r}, expected one of {', '.join(JSON_PROVIDERS)}")
+
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson is not installed, using the standard library JSON provider")
+        return NumpyJSONProvider
+
+    return JSON_PROVIDERS[name]
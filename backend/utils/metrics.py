@@ -0,0 +1,126 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+# Metrics live in their own registry. With PROMETHEUS_MULTIPROC_DIR set
+# (see gunicorn.conf.py) every process writes its values to files in that
+# directory and /metrics merges them, so any worker can serve the totals.
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+STAGE_SECONDS = Histogram(
+    'hoax_stage_duration_seconds',
+    'Time spent in each processing stage',
+    ['stage'],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY
+)
+
+REQUEST_SECONDS = Histogram(
+    'hoax_http_request_duration_seconds',
+    'HTTP request latency until the response is returned',
+    ['method', 'endpoint', 'status'],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY
+)
+
+BATCH_SIZE = Histogram(
+    'hoax_batch_size',
+    'Number of items per batch',
+    ['kind'],
+    buckets=SIZE_BUCKETS,
+    registry=REGISTRY
+)
+
+QUEUE_DEPTH = Gauge(
+    'hoax_queue_depth',
+    'Items waiting in an in-process queue',
+    ['queue'],
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+FALLBACK_PREDICTIONS = Counter(
+    'hoax_fallback_predictions',
+    'Predictions served by the rule-based fallback instead of the model',
+    registry=REGISTRY
+)
+
+EVENTS = Counter(
+    'hoax_events',
+    'Counted events such as circuit-breaker rejections and queue overflows',
+    ['event'],
+    registry=REGISTRY
+)
+
+COALESCED_REQUESTS = Counter(
+    'hoax_coalesced_requests',
+    'Single-flight outcomes: leader ran the work, shared/error/timeout are collapsed waiters',
+    ['kind', 'outcome'],
+    registry=REGISTRY
+)
+
+MODEL_RELOADS = Counter(
+    'hoax_model_reloads',
+    'Model loads by outcome (success, failed)',
+    ['outcome'],
+    registry=REGISTRY
+)
+
+CIRCUIT_STATE = Gauge(
+    'hoax_circuit_state',
+    'Circuit breaker state of each scraped host (0 closed, 1 half-open, 2 open)',
+    ['host'],
+    multiprocess_mode='livemax',
+    registry=REGISTRY
+)
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('timings', default=None)
+
+def start_timings() -> Dict[str, float]:
+    """Start collecting a per-stage breakdown for the current request"""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+def get_timings() -> Optional[Dict[str, float]]:
+    """Per-stage seconds recorded since start_timings(), rounded for responses"""
+    timings = _timings.get()
+    if timings is None:
+        return None
+    return {name: round(seconds, 4) for name, seconds in timings.items()}
+
+def stop_timings():
+    _timings.set(None)
+
+def observe_stage(name: str, seconds: float):
+    """Record a stage duration in the histogram and the request breakdown"""
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one processing stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of all metrics, merged across processes when enabled"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
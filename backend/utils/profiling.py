@@ -0,0 +1,181 @@
+import os
+import hmac
+import time
+import random
+import logging
+import cProfile
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'torch')
+
+class RequestProfiler:
+    """Opt-in profiling of individual requests
+
+    A request is profiled when it carries ``X-Profile: cprofile|torch``
+    together with a valid ``X-Admin-Token``, or when it is picked by the
+    sampling rate. cProfile traces are written as ``.prof`` files (open
+    with pstats or snakeviz); torch.profiler traces as a Chrome trace
+    (``.json``) plus a per-operator timing table (``.txt``). Only the newest
+    ``max_files`` files are kept.
+
+    The app registers the request hooks only when a profiler is configured,
+    so requests pay nothing while profiling is disabled.
+    """
+
+    def __init__(self, output_dir: str, admin_token: Optional[str] = None,
+                 sample_rate: float = 0.0, sample_mode: str = 'cprofile', max_files: int = 100):
+        """
+        Initialize the profiler
+
+        Args:
+            output_dir: Directory the traces are written to
+            admin_token: Token required for header-triggered profiles (None disables them)
+            sample_rate: Fraction of requests profiled without a header
+            sample_mode: Profiler used for sampled requests ('cprofile' or 'torch')
+            max_files: Number of trace files kept in output_dir
+        """
+        if sample_mode not in PROFILE_MODES:
+            raise ValueError(f"sample_mode must be one of {PROFILE_MODES}")
+
+        self.output_dir = output_dir
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.sample_mode = sample_mode
+        self.max_files = max_files
+
+        # torch.profiler is process-wide, so only one torch profile runs at a time;
+        # so is cProfile on Python 3.12+ (a second enable() raises ValueError)
+        self._torch_lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._rotate_lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['RequestProfiler']:
+        """Build a profiler from PROFILE_* settings; None when PROFILE_DIR is not set"""
+        output_dir = os.getenv('PROFILE_DIR')
+        if not output_dir:
+            return None
+
+        return cls(
+            output_dir,
+            admin_token=os.getenv('PROFILE_ADMIN_TOKEN') or None,
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+            sample_mode=os.getenv('PROFILE_MODE', 'cprofile'),
+            max_files=int(os.getenv('PROFILE_MAX_FILES', 100))
+        )
+
+    def select_mode(self, headers) -> Optional[str]:
+        """
+        Decide whether and how to profile a request
+
+        Returns:
+            'cprofile', 'torch' or None
+        """
+        mode = headers.get('X-Profile')
+        if mode:
+            token = headers.get('X-Admin-Token', '')
+            if (mode in PROFILE_MODES and self.admin_token
+                    and hmac.compare_digest(token, self.admin_token)):
+                return mode
+            return None
+
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.sample_mode
+        return None
+
+    def start(self, mode: str, name: str) -> Optional[Dict]:
+        """
+        Start profiling the current request
+
+        Args:
+            mode: 'cprofile' or 'torch'
+            name: Label used in the trace file name (e.g. endpoint and request id)
+
+        Returns:
+            Handle for stop(), or None if a profile of this mode is already running
+        """
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{name}"
+
+        if mode == 'cprofile':
+            if not self._cprofile_lock.acquire(blocking=False):
+                return None
+
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            except Exception:
+                self._cprofile_lock.release()
+                raise
+
+            return {'mode': mode, 'id': profile_id, 'profiler': profiler}
+
+        if not self._torch_lock.acquire(blocking=False):
+            return None
+
+        try:
+            import torch
+            from torch.profiler import ProfilerActivity, profile
+
+            activities = [ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(ProfilerActivity.CUDA)
+
+            profiler = profile(activities=activities, record_shapes=True)
+            profiler.__enter__()
+        except Exception:
+            self._torch_lock.release()
+            raise
+
+        return {'mode': mode, 'id': profile_id, 'profiler': profiler}
+
+    def stop(self, handle: Dict):
+        """Stop a profile started with start() and write its trace files"""
+        profiler = handle['profiler']
+        base_path = os.path.join(self.output_dir, handle['id'])
+
+        try:
+            if handle['mode'] == 'cprofile':
+                try:
+                    profiler.disable()
+                finally:
+                    self._cprofile_lock.release()
+
+                profiler.dump_stats(base_path + '.prof')
+            else:
+                try:
+                    profiler.__exit__(None, None, None)
+                finally:
+                    self._torch_lock.release()
+
+                profiler.export_chrome_trace(base_path + '.json')
+                with open(base_path + '.txt', 'w', encoding='utf-8') as f:
+                    f.write(profiler.key_averages().table(sort_by='self_cpu_time_total', row_limit=50))
+
+            logger.info(f"Wrote {handle['mode']} profile {handle['id']}")
+
+        except Exception as e:
+            logger.error(f"Failed to write profile {handle['id']}: {e}")
+
+        self._rotate()
+
+    def _rotate(self):
+        """Delete the oldest trace files beyond max_files"""
+        with self._rotate_lock:
+            try:
+                entries = sorted(
+                    (entry for entry in os.scandir(self.output_dir) if entry.is_file()),
+                    key=lambda entry: entry.stat().st_mtime
+                )
+            except OSError:
+                return
+
+            for entry in entries[:max(0, len(entries) - self.max_files)]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
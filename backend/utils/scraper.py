@@ -1,17 +1,149 @@
+import re
+import time
+import asyncio
 import logging
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from readability import Document
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from typing import Optional
 
+from .host_health import HostHealthTracker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
+def parse_article_html(content: bytes) -> Optional[str]:
+    """
+    Extract cleaned article text from raw HTML
+    
+    Kept at module level so it can run inside extraction worker processes.
+    
+    Args:
+        content: Raw HTML bytes
+        
+    Returns:
+        Extracted text or None if nothing useful was found
+    """
+    # Try readability-lxml first
+    try:
+        doc = Document(content)
+        text = doc.summary()
+        
+        # Clean HTML tags
+        soup_text = BeautifulSoup(text, 'html.parser')
+        clean_text = soup_text.get_text(separator=' ', strip=True)
+        
+        if len(clean_text) > 100:  # Ensure we got meaningful content
+            logger.info(f"Successfully extracted {len(clean_text)} characters using readability")
+            return _clean_extracted_text(clean_text)
+            
+    except Exception as e:
+        logger.warning(f"Readability extraction failed: {e}")
+    
+    # Fallback to manual extraction
+    return _manual_extraction(BeautifulSoup(content, 'html.parser'))
+
+def _manual_extraction(soup: BeautifulSoup) -> Optional[str]:
+    """Manual extraction when readability fails"""
+    try:
+        # Remove script and style elements
+        for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
+            script.decompose()
+        
+        # Try to find main content area
+        content_selectors = [
+            'article',
+            '[role="main"]',
+            '.content',
+            '.article-content',
+            '.post-content',
+            '.entry-content',
+            'main',
+            '.main-content'
+        ]
+        
+        content = None
+        for selector in content_selectors:
+            content = soup.select_one(selector)
+            if content:
+                break
+        
+        if not content:
+            # Fallback to body
+            content = soup.body
+        
+        if content:
+            text = content.get_text(separator=' ', strip=True)
+            return _clean_extracted_text(text)
+        
+        return None
+        
+    except Exception as e:
+        logger.error(f"Manual extraction failed: {e}")
+        return None
+
+def _clean_extracted_text(text: str) -> str:
+    """Clean and format extracted text"""
+    if not text:
+        return ""
+    
+    # Remove excessive whitespace
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Remove common web artifacts
+    text = re.sub(r'Share|Tweet|Like|Comment|Follow|Subscribe', '', text, flags=re.IGNORECASE)
+    
+    # Remove very short lines (likely navigation/menu items)
+    lines = text.split('\n')
+    lines = [line.strip() for line in lines if len(line.strip()) > 20]
+    
+    # Join lines back
+    clean_text = ' '.join(lines)
+    
+    # Final cleanup
+    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+    
+    return clean_text
+
+# Query parameters that only track where a link was shared
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'igshid', 'mc_cid', 'mc_eid')
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL, used to recognise the same article
+    
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the remaining query parameters.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    
+    port = parsed.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, urlencode(query), ''))
+
 class ArticleScraper:
     """Article scraper for extracting text content from URLs"""
     
-    def __init__(self):
-        """Initialize the article scraper"""
+    def __init__(self, extraction_pool=None, host_health: HostHealthTracker = None):
+        """
+        Initialize the article scraper
+        
+        Args:
+            extraction_pool: Optional ExtractionPool used to parse HTML out of process
+            host_health: Per-host circuit breaker; a default tracker is created if omitted
+        """
+        self.extraction_pool = extraction_pool
+        self.host_health = host_health or HostHealthTracker()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -33,6 +165,9 @@ class ArticleScraper:
             
         Returns:
             Extracted text or None if failed
+            
+        Raises:
+            CircuitOpenError: If the URL's host is failing and its circuit is open
         """
         try:
             logger.info(f"Extracting text from: {url}")
@@ -42,40 +177,62 @@ class ArticleScraper:
                 raise ValueError("Invalid URL format")
             
             # Fetch content
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            response = self._fetch(url)
             
             # Check content type
             content_type = response.headers.get('content-type', '')
             if 'text/html' not in content_type:
                 raise ValueError(f"Unsupported content type: {content_type}")
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Parse HTML, isolated in worker processes when a pool is configured
+            if self.extraction_pool is not None:
+                return self.extraction_pool.extract(response.content)
             
-            # Try readability-lxml first
-            try:
-                doc = Document(response.content)
-                text = doc.summary()
-                
-                # Clean HTML tags
-                soup_text = BeautifulSoup(text, 'html.parser')
-                clean_text = soup_text.get_text(separator=' ', strip=True)
-                
-                if len(clean_text) > 100:  # Ensure we got meaningful content
-                    logger.info(f"Successfully extracted {len(clean_text)} characters using readability")
-                    return self._clean_extracted_text(clean_text)
-                    
-            except Exception as e:
-                logger.warning(f"Readability extraction failed: {e}")
-            
-            # Fallback to manual extraction
-            return self._manual_extraction(soup)
+            return parse_article_html(response.content)
             
+        except CircuitOpenError:
+            logger.warning(f"Skipping {url}: circuit open for host")
+            raise
         except Exception as e:
             logger.error(f"Failed to extract text from {url}: {e}")
             return None
     
+    def _fetch(self, url: str) -> requests.Response:
+        """
+        Fetch a URL with a host-adaptive timeout, recording the outcome
+        
+        Args:
+            url: URL to fetch
+            
+        Returns:
+            Successful response
+            
+        Raises:
+            CircuitOpenError: If the host is failing and its circuit is open
+        """
+        host = urlparse(url).netloc.lower()
+        timeout = self.host_health.before_request(host)
+        
+        start_time = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=timeout)
+        except requests.RequestException:
+            self.host_health.record_failure(host)
+            raise
+        except BaseException:
+            # Cancelled or failed before the host answered; frees a half-open probe
+            self.host_health.record_aborted(host)
+            raise
+        
+        # 4xx means the host answered; only server errors count against it
+        if response.status_code >= 500:
+            self.host_health.record_failure(host)
+        else:
+            self.host_health.record_success(host, time.monotonic() - start_time)
+        
+        response.raise_for_status()
+        return response
+    
     def _is_valid_url(self, url: str) -> bool:
         """Check if URL is valid"""
         try:
@@ -86,66 +243,11 @@ class ArticleScraper:
     
     def _manual_extraction(self, soup: BeautifulSoup) -> Optional[str]:
         """Manual extraction when readability fails"""
-        try:
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
-                script.decompose()
-            
-            # Try to find main content area
-            content_selectors = [
-                'article',
-                '[role="main"]',
-                '.content',
-                '.article-content',
-                '.post-content',
-                '.entry-content',
-                'main',
-                '.main-content'
-            ]
-            
-            content = None
-            for selector in content_selectors:
-                content = soup.select_one(selector)
-                if content:
-                    break
-            
-            if not content:
-                # Fallback to body
-                content = soup.body
-            
-            if content:
-                text = content.get_text(separator=' ', strip=True)
-                return self._clean_extracted_text(text)
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Manual extraction failed: {e}")
-            return None
+        return _manual_extraction(soup)
     
     def _clean_extracted_text(self, text: str) -> str:
         """Clean and format extracted text"""
-        if not text:
-            return ""
-        
-        # Remove excessive whitespace
-        import re
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove common web artifacts
-        text = re.sub(r'Share|Tweet|Like|Comment|Follow|Subscribe', '', text, flags=re.IGNORECASE)
-        
-        # Remove very short lines (likely navigation/menu items)
-        lines = text.split('\n')
-        lines = [line.strip() for line in lines if len(line.strip()) > 20]
-        
-        # Join lines back
-        clean_text = ' '.join(lines)
-        
-        # Final cleanup
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        
-        return clean_text
+        return _clean_extracted_text(text)
     
     def get_article_info(self, url: str) -> dict:
         """
@@ -158,8 +260,7 @@ class ArticleScraper:
             Dictionary with article info
         """
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            response = self._fetch(url)
             
             soup = BeautifulSoup(response.content, 'html.parser')
             
@@ -215,4 +316,105 @@ class ArticleScraper:
             domain = urlparse(url).netloc.lower()
             return any(news_domain in domain for news_domain in self.news_domains)
         except:
-            return False 
\ No newline at end of file
+            return False
+
+class AsyncArticleScraper:
+    """Article scraper for the ASGI server
+    
+    Fetches pages with a shared httpx.AsyncClient, so thousands of URL checks
+    can wait on the network concurrently without a thread each. Shares the
+    host circuit breakers and extraction pool with ArticleScraper; HTML
+    parsing runs off the event loop.
+    """
+    
+    def __init__(self, extraction_pool=None, host_health: HostHealthTracker = None,
+                 max_connections: int = 1000, max_keepalive_connections: int = 100):
+        """
+        Initialize the async article scraper
+        
+        Args:
+            extraction_pool: Optional ExtractionPool used to parse HTML out of process
+            host_health: Per-host circuit breaker; a default tracker is created if omitted
+            max_connections: Maximum concurrent outbound connections
+            max_keepalive_connections: Idle connections kept open for reuse
+        """
+        self.extraction_pool = extraction_pool
+        self.host_health = host_health or HostHealthTracker()
+        self.client = httpx.AsyncClient(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            },
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            )
+        )
+    
+    async def extract_text(self, url: str) -> Optional[str]:
+        """
+        Extract main text content from a URL
+        
+        Args:
+            url: URL to extract text from
+            
+        Returns:
+            Extracted text or None if failed
+            
+        Raises:
+            CircuitOpenError: If the URL's host is failing and its circuit is open
+        """
+        try:
+            logger.info(f"Extracting text from: {url}")
+            
+            parsed = urlparse(url)
+            if not (parsed.scheme and parsed.netloc):
+                raise ValueError("Invalid URL format")
+            
+            response = await self._fetch(url)
+            
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' not in content_type:
+                raise ValueError(f"Unsupported content type: {content_type}")
+            
+            loop = asyncio.get_running_loop()
+            if self.extraction_pool is not None:
+                return await loop.run_in_executor(None, self.extraction_pool.extract, response.content)
+            
+            return await loop.run_in_executor(None, parse_article_html, response.content)
+            
+        except CircuitOpenError:
+            logger.warning(f"Skipping {url}: circuit open for host")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to extract text from {url}: {e}")
+            return None
+    
+    async def _fetch(self, url: str):
+        """Fetch a URL with a host-adaptive timeout, recording the outcome"""
+        host = urlparse(url).netloc.lower()
+        timeout = self.host_health.before_request(host)
+        
+        start_time = time.monotonic()
+        try:
+            response = await self.client.get(url, timeout=timeout)
+        except httpx.HTTPError:
+            self.host_health.record_failure(host)
+            raise
+        except BaseException:
+            # Cancelled or failed before the host answered; frees a half-open probe
+            self.host_health.record_aborted(host)
+            raise
+        
+        # 4xx means the host answered; only server errors count against it
+        if response.status_code >= 500:
+            self.host_health.record_failure(host)
+        else:
+            self.host_health.record_success(host, time.monotonic() - start_time)
+        
+        response.raise_for_status()
+        return response
+    
+    async def close(self):
+        """Close the HTTP client"""
+        await self.client.aclose()
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+from .metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class SingleFlightTimeout(Exception):
+    """Raised when waiting on an identical in-flight computation takes too long"""
+
+def text_key(text: str) -> str:
+    """
+    Coalescing key of an input text
+
+    The model only sees lowercased text with whitespace collapsed (see
+    TextProcessor.clean_text), so texts differing only in case or spacing
+    share a key.
+    """
+    return hashlib.sha256(' '.join(text.lower().split()).encode('utf-8')).hexdigest()
+
+class _Call:
+    """One in-flight computation and the outcome its waiters receive"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapse concurrent identical computations into one (thread version)
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for its result, or get its exception re-raised. Nothing is
+    cached: once the computation finishes the next caller starts a new one.
+    """
+
+    def __init__(self, kind: str, timeout: float = 30.0):
+        """
+        Initialize the group
+
+        Args:
+            kind: Label for the coalescing metrics (e.g. 'scrape', 'predict')
+            timeout: Seconds a waiter waits for the shared result
+        """
+        self.kind = kind
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func() once for all concurrent callers with the same key
+
+        Raises:
+            SingleFlightTimeout: If this caller waited longer than timeout
+            Exception: Whatever the shared computation raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            COALESCED_REQUESTS.labels(self.kind, 'leader').inc()
+            try:
+                call.result = func()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            COALESCED_REQUESTS.labels(self.kind, 'timeout').inc()
+            raise SingleFlightTimeout(f"Identical {self.kind} request still running after {self.timeout}s")
+
+        if call.error is not None:
+            COALESCED_REQUESTS.labels(self.kind, 'error').inc()
+            raise call.error
+
+        COALESCED_REQUESTS.labels(self.kind, 'shared').inc()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Number of computations currently running"""
+        with self._lock:
+            return len(self._calls)
+
+class AsyncSingleFlight:
+    """Collapse concurrent identical computations into one (asyncio version)
+
+    The shared computation runs as a task, so a waiter that is cancelled
+    (e.g. its client disconnected) does not cancel it for the others.
+    """
+
+    def __init__(self, kind: str, timeout: float = 30.0):
+        """
+        Initialize the group
+
+        Args:
+            kind: Label for the coalescing metrics (e.g. 'scrape', 'predict')
+            timeout: Seconds a waiter waits for the shared result
+        """
+        self.kind = kind
+        self.timeout = timeout
+
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func() once for all concurrent callers with the same key
+
+        Raises:
+            SingleFlightTimeout: If this caller waited longer than timeout
+            Exception: Whatever the shared computation raised
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            COALESCED_REQUESTS.labels(self.kind, 'leader').inc()
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda finished: self._finished(key, finished))
+            return await asyncio.shield(task)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            COALESCED_REQUESTS.labels(self.kind, 'timeout').inc()
+            raise SingleFlightTimeout(f"Identical {self.kind} request still running after {self.timeout}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            COALESCED_REQUESTS.labels(self.kind, 'error').inc()
+            raise
+
+        COALESCED_REQUESTS.labels(self.kind, 'shared').inc()
+        return result
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of computations currently running"""
+        return len(self._tasks)
@@ -0,0 +1,255 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+# Label ids match HoaxDetector.labels ['hoax', 'faktual']
+LABEL_IDS = {
+    'hoax': 0,
+    'hoaks': 0,
+    'faktual': 1,
+    'factual': 1,
+    'fakta': 1
+}
+
+LABEL_NAMES = ['hoax', 'faktual']
+
+TRAINING_SCHEMA = pa.schema([
+    ('content_hash', pa.string()),
+    ('text', pa.string()),
+    ('label', pa.int8()),
+    ('label_name', pa.string()),
+    ('source', pa.string()),
+    ('source_id', pa.string()),
+    ('added_at', pa.timestamp('s'))
+])
+
+STATE_FILE = '_state.json'
+
+def normalize_label(label) -> Optional[int]:
+    """
+    Map a label variant ('hoaks', 'Hoax ', 'faktual', ...) to its class id
+
+    Returns:
+        0 for hoax, 1 for faktual, None for anything else (e.g. 'tidak_pasti')
+    """
+    if not isinstance(label, str):
+        return None
+    return LABEL_IDS.get(label.strip().lower())
+
+def training_hash(text: str) -> str:
+    """Dedup key of a training text: SHA-256 of the text with whitespace collapsed"""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+class TrainingSetBuilder:
+    """Incrementally build a deduplicated training set as a Parquet dataset
+
+    Every update streams new labelled rows (feedback rows past the last one
+    seen, CSV files that changed) into one new Parquet file in the dataset
+    directory, skipping texts whose hash is already in the dataset with the
+    same label. A feedback row that relabels a known text is written anyway
+    and supersedes the earlier row: load() keeps the latest row per hash.
+    CSV rows never relabel a known text; they are counted as conflicts.
+    Progress is kept in ``_state.json`` next to the data, which pyarrow
+    ignores when reading the dataset.
+    """
+
+    def __init__(self, dataset_dir: str, batch_size: int = 1000):
+        """
+        Initialize the builder
+
+        Args:
+            dataset_dir: Directory holding the training set
+            batch_size: Rows read and written per batch
+        """
+        self.dataset_dir = dataset_dir
+        self.batch_size = batch_size
+        self.state_path = os.path.join(dataset_dir, STATE_FILE)
+
+        os.makedirs(dataset_dir, exist_ok=True)
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'feedback_last_id': 0, 'csv_files': {}}
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def dataset(self) -> ds.Dataset:
+        """Open all rows of the training set as a pyarrow dataset, oldest file first"""
+        # Part file names start with their write time, so name order is age order
+        paths = sorted(
+            os.path.join(self.dataset_dir, name) for name in os.listdir(self.dataset_dir)
+            if name.endswith('.parquet')
+        )
+        return ds.dataset(paths, format='parquet', schema=TRAINING_SCHEMA)
+
+    def load(self, columns: Optional[List[str]] = None) -> pa.Table:
+        """Read the training set (or some of its columns) into memory, latest row per text"""
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(['content_hash', *columns]))
+
+        table = self.dataset().to_table(columns=read_columns)
+
+        # Later rows supersede earlier ones with the same text
+        latest = {text_hash: idx for idx, text_hash
+                  in enumerate(table.column('content_hash').to_pylist())}
+        if len(latest) < table.num_rows:
+            table = table.take(sorted(latest.values()))
+
+        return table.select(columns) if columns is not None else table
+
+    def _known_labels(self) -> Dict[str, int]:
+        """Current label of each text in the dataset; only two columns are read"""
+        table = self.load(columns=['content_hash', 'label'])
+        return dict(zip(table.column('content_hash').to_pylist(), table.column('label').to_pylist()))
+
+    def update(self, database: Optional[Database] = None,
+               csv_paths: Iterable[str] = ()) -> Dict:
+        """
+        Append new labelled rows from feedback and CSV files
+
+        Args:
+            database: Database whose feedback table is read (skipped if None)
+            csv_paths: CSV files with article_text and label columns
+
+        Returns:
+            Counters: added (including relabelled), duplicates, relabelled (feedback
+            that changed a known text's label), conflicts (CSV rows disagreeing with
+            a known label, not written), skipped (unknown label or empty text)
+        """
+        stats = {'added': 0, 'duplicates': 0, 'relabelled': 0, 'conflicts': 0, 'skipped': 0}
+        known = self._known_labels()
+
+        file_name = f"part-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.parquet"
+        file_path = os.path.join(self.dataset_dir, file_name)
+        writer = None
+
+        sources = []
+        feedback_last_id = self.state['feedback_last_id']
+        if database is not None:
+            sources.append(self._feedback_rows(database, feedback_last_id))
+
+        csv_updates = {}
+        for path in csv_paths:
+            stat = os.stat(path)
+            signature = {'size': stat.st_size, 'mtime': stat.st_mtime}
+            key = os.path.abspath(path)
+            if self.state['csv_files'].get(key) == signature:
+                continue
+            csv_updates[key] = signature
+            sources.append(self._csv_rows(path))
+
+        try:
+            for source in sources:
+                for rows in self._batched(source):
+                    batch = []
+                    for row in rows:
+                        if row['source'] == 'feedback':
+                            feedback_last_id = max(feedback_last_id, row['source_id'])
+
+                        label = normalize_label(row['label'])
+                        text = row['text'].strip() if isinstance(row['text'], str) else ''
+                        if label is None or not text:
+                            stats['skipped'] += 1
+                            continue
+
+                        text_hash = training_hash(text)
+                        known_label = known.get(text_hash)
+                        if known_label == label:
+                            stats['duplicates'] += 1
+                            continue
+                        if known_label is not None:
+                            # Only feedback relabels a known text: the user's later
+                            # correction wins over the earlier label
+                            if row['source'] != 'feedback':
+                                stats['conflicts'] += 1
+                                continue
+                            stats['relabelled'] += 1
+                        known[text_hash] = label
+
+                        batch.append({
+                            'content_hash': text_hash,
+                            'text': text,
+                            'label': label,
+                            'label_name': LABEL_NAMES[label],
+                            'source': row['source'],
+                            'source_id': str(row['source_id']),
+                            'added_at': datetime.utcnow().replace(microsecond=0)
+                        })
+
+                    if batch:
+                        if writer is None:
+                            writer = pq.ParquetWriter(file_path, TRAINING_SCHEMA, compression='zstd')
+                        writer.write_table(pa.Table.from_pylist(batch, schema=TRAINING_SCHEMA))
+                        stats['added'] += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        # Record progress only once the new rows are on disk; a crash before
+        # this point is repaired by deduplication on the next run
+        self.state['feedback_last_id'] = feedback_last_id
+        self.state['csv_files'].update(csv_updates)
+        self._save_state()
+
+        logger.info(f"Training set updated: {stats}")
+        return stats
+
+    def _batched(self, rows: Iterator[Dict]) -> Iterator[List[Dict]]:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _feedback_rows(self, database: Database, after_id: int) -> Iterator[Dict]:
+        """Stream feedback rows newer than after_id, labelled with the user's label"""
+        conn = database._open_connection()
+        try:
+            cursor = conn.execute('''
+                SELECT f.id, unpack_text(t.content, t.compressed), f.user_label
+                FROM feedback f
+                JOIN texts t ON t.id = f.text_id
+                WHERE f.id > ?
+                ORDER BY f.id
+            ''', (after_id,))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for feedback_id, text, user_label in rows:
+                    yield {'text': text, 'label': user_label, 'source': 'feedback',
+                           'source_id': feedback_id}
+        finally:
+            conn.close()
+
+    def _csv_rows(self, path: str, text_column: str = 'article_text',
+                  label_column: str = 'label') -> Iterator[Dict]:
+        """Stream rows of a labelled CSV file in chunks"""
+        source = os.path.splitext(os.path.basename(path))[0]
+        for chunk in pd.read_csv(path, chunksize=self.batch_size):
+            ids = chunk['id'] if 'id' in chunk.columns else chunk.index
+            for row_id, text, label in zip(ids, chunk[text_column], chunk[label_column]):
+                yield {'text': text, 'label': label, 'source': source, 'source_id': row_id}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Batch job worker
+
+Run with `python worker.py --processes 2` from the backend directory. Each
+process loads its own model and text processor, claims jobs submitted via
+POST /api/jobs from the shared SQLite database and writes their results
+next to the uploaded file. A job whose worker dies is picked up again by
+another worker once its heartbeat goes stale and continues from the last
+committed chunk.
+"""
+
+import os
+import signal
+import logging
+import argparse
+import multiprocessing
+
+from dotenv import load_dotenv
+
+from models.hoax_detector import HoaxDetector
+from models.text_processor import TextProcessor
+from utils.batch import predict_chunk
+from utils.database import Database
+from utils.jobs import JobQueue, JobWorker
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+JOB_STORAGE_DIR = os.getenv('JOB_STORAGE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'jobs'))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 120))
+JOB_CHUNK_SIZE = int(os.getenv('JOB_CHUNK_SIZE', 256))
+
+def run_worker(chunk_size: int, poll_interval: float):
+    """Load the model and process jobs until SIGTERM/SIGINT"""
+    text_processor = TextProcessor()
+    hoax_detector = HoaxDetector(os.getenv('MODEL_PATH', 'models/hoax_model'))
+    database = Database()
+
+    queue = JobQueue(database, JOB_STORAGE_DIR, stale_seconds=JOB_STALE_SECONDS)
+    worker = JobWorker(
+        queue,
+        lambda chunk: predict_chunk(chunk, hoax_detector, text_processor),
+        chunk_size=chunk_size,
+        poll_interval=poll_interval,
+        # Heartbeat well inside the stale window so a slow chunk is not taken over
+        heartbeat_interval=max(1.0, JOB_STALE_SECONDS / 4)
+    )
+
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+    try:
+        worker.run()
+    finally:
+        database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Process queued batch prediction jobs')
+    parser.add_argument('--processes', type=int, default=int(os.getenv('JOB_WORKERS', 1)),
+                        help='Number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=JOB_CHUNK_SIZE,
+                        help='Rows per inference batch and progress commit')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds between queue polls when idle')
+
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.chunk_size, args.poll_interval)
+        return
+
+    # Spawn so every process loads its own copy of the model
+    ctx = multiprocessing.get_context('spawn')
+    processes = [
+        ctx.Process(target=run_worker, args=(args.chunk_size, args.poll_interval),
+                    name=f'job-worker-{i}')
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(*_):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for process in processes:
+        process.join()
+
+if __name__ == '__main__':
+    main()
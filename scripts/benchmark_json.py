@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark of JSON serialization and compression for large responses
+
+Builds an /api/batch response of N rows (row, text, prediction, keywords,
+with NumPy confidences as the model produces them) and times turning it
+into a Flask response with Flask's standard library provider (the previous
+default, after converting values to Python floats), the NumPy-aware
+standard library provider and the orjson provider. Then times gzip and
+brotli (if installed) on the encoded body.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from utils.compression import brotli, compress
+from utils.json_provider import NumpyJSONProvider, OrjsonProvider, orjson
+
+TEXT = ('Beredar pesan berantai yang menyebutkan bahwa pemerintah akan membagikan '
+        'kuota internet gratis kepada seluruh pelajar mulai bulan depan.')
+
+def build_payload(rows: int) -> dict:
+    """An /api/batch response body with NumPy confidences"""
+    rng = np.random.default_rng(0)
+    confidences = rng.random(rows, dtype=np.float32)
+    return {
+        'message': f'Processed {rows} rows',
+        'results': [
+            {
+                'row': i + 1,
+                'text': TEXT[:100] + '...',
+                'prediction': {'label': 'hoax' if confidence > 0.5 else 'faktual',
+                               'confidence': confidence},
+                'keywords': ['kuota internet', 'pelajar', 'pemerintah']
+            }
+            for i, confidence in enumerate(confidences)
+        ]
+    }
+
+def to_python(payload: dict) -> dict:
+    """What the handlers had to do before: float() every NumPy value"""
+    return {
+        'message': payload['message'],
+        'results': [dict(result, prediction=dict(result['prediction'],
+                                                 confidence=float(result['prediction']['confidence'])))
+                    for result in payload['results']]
+    }
+
+def time_it(func, repeats: int):
+    """(mean ms, min ms, result of the last call)"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings), min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization and compression')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows in the batch response')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed runs per variant')
+
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = build_payload(args.rows)
+
+    variants = [('stdlib (float + sorted keys)', DefaultJSONProvider(app), lambda: to_python(payload)),
+                ('stdlib + numpy', NumpyJSONProvider(app), lambda: payload)]
+    if orjson is not None:
+        variants.append(('orjson', OrjsonProvider(app), lambda: payload))
+    else:
+        print("orjson is not installed; skipping the orjson provider\n")
+
+    print(f"Serializing a {args.rows}-row /api/batch response ({args.repeats} runs)")
+    print(f"{'provider':<30} {'mean ms':>10} {'min ms':>10} {'bytes':>12}")
+    body = None
+    with app.app_context():
+        for name, provider, prepare in variants:
+            mean, best, response = time_it(lambda: provider.response(prepare()), args.repeats)
+            body = response.get_data()
+            print(f"{name:<30} {mean:>10.1f} {best:>10.1f} {len(body):>12}")
+
+    print(f"\nCompressing the {len(body)}-byte body")
+    print(f"{'encoding':<30} {'mean ms':>10} {'min ms':>10} {'bytes':>12}")
+    for encoding in ['gzip'] + (['br'] if brotli is not None else []):
+        mean, best, compressed = time_it(lambda: compress(body, encoding), args.repeats)
+        print(f"{encoding:<30} {mean:>10.1f} {best:>10.1f} {len(compressed):>12}")
+    if brotli is None:
+        print("(brotli is not installed; install it to enable br)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the rate limiter storage backends
+
+Measures the per-hit cost of flask-limiter's fixed-window check against the
+in-memory storage and the shared SQLite storage, then has several processes
+hit one limit at the same time to check that the SQLite counters stay exact
+across processes (exactly `limit` hits allowed, however many processes).
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from utils.limiter_storage import SQLiteStorage  # registers sqlite://
+
+def time_hits(uri: str, hits: int, clients: int):
+    """Per-hit latencies (microseconds) for `hits` hits spread over `clients` keys"""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse('1000000 per minute')
+
+    latencies = []
+    for i in range(hits):
+        start = time.perf_counter()
+        limiter.hit(item, '/api/predict', f'10.0.{i % clients // 256}.{i % 256}')
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+def contend(uri: str, limit: int, hits: int, ready, start, results):
+    """Worker process: hit one shared limit `hits` times and report (allowed, seconds)"""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse(f'{limit} per hour')
+
+    ready.release()
+    start.wait()
+
+    begin = time.perf_counter()
+    allowed = sum(limiter.hit(item, '/api/predict', '10.0.0.1') for _ in range(hits))
+    results.put((allowed, time.perf_counter() - begin))
+
+def run_contention(uri: str, processes: int, limit: int, hits: int):
+    """Run `processes` workers against one limit; returns (allowed, seconds of the slowest)"""
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Semaphore(0)
+    start = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=contend, args=(uri, limit, hits, ready, start, results))
+               for _ in range(processes)]
+
+    # Start timing once every process has imported and connected
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+    start.set()
+
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return sum(allowed for allowed, _ in outcomes), max(seconds for _, seconds in outcomes)
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rate limiter storage backends')
+    parser.add_argument('--hits', type=int, default=20000, help='Hits per latency run')
+    parser.add_argument('--clients', type=int, default=1000, help='Distinct client keys')
+    parser.add_argument('--processes', type=int, nargs='*', default=[1, 2, 4, 8],
+                        help='Process counts for the contention run')
+    parser.add_argument('--limit', type=int, default=1000, help='Shared limit in the contention run')
+    parser.add_argument('--db', type=str, default=None, help='SQLite file (default: temporary)')
+
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'ratelimits.db')
+    sqlite_uri = f'sqlite:///{os.path.abspath(db_path)}'
+
+    print(f"Per-hit cost ({args.hits} hits over {args.clients} clients)")
+    print(f"{'storage':<10} {'mean us':>10} {'p50 us':>10} {'p99 us':>10}")
+    for name, uri in (('memory', 'memory://'), ('sqlite', sqlite_uri)):
+        latencies = time_hits(uri, args.hits, args.clients)
+        print(f"{name:<10} {statistics.mean(latencies):>10.1f} {percentile(latencies, 50):>10.1f} "
+              f"{percentile(latencies, 99):>10.1f}")
+
+    print(f"\nShared limit of {args.limit}, each process sending {args.limit} hits (sqlite)")
+    print(f"{'processes':<10} {'allowed':>10} {'hits/s':>10}")
+    for processes in args.processes:
+        storage_from_string(sqlite_uri).reset()
+        allowed, seconds = run_contention(sqlite_uri, processes, args.limit, args.limit)
+        status = 'ok' if allowed == args.limit else 'MISMATCH'
+        print(f"{processes:<10} {allowed:>10} {processes * args.limit / seconds:>10.0f}  {status}")
+
+if __name__ == '__main__':
+    main()
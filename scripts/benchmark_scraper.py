@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for ArticleScraper and AsyncArticleScraper
+
+Serves saved news pages from a local HTTP server (with optional injected
+latency and page padding) and drives ArticleScraper (threads) and
+AsyncArticleScraper (one event loop) at several concurrency levels. Reports pages/sec, latency percentiles, peak RSS and how closely
+the extracted text matches the stored expected text.
+"""
+
+import argparse
+import asyncio
+import difflib
+import json
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from utils.scraper import ArticleScraper, AsyncArticleScraper, parse_article_html
+from utils.extraction_pool import ExtractionPool
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'news_pages'
+
+PADDING_BLOCK = (
+    '<div class="related"><a href="/tag">Tag terkait</a> '
+    '<span>Iklan</span> <a href="/promo">Promo menarik hari ini</a></div>\n'
+)
+
+def load_corpus(fixtures_dir: Path, pad_kb: int):
+    """Load saved pages and their expected text"""
+    corpus = {}
+    padding = ''
+    if pad_kb > 0:
+        padding = PADDING_BLOCK * (pad_kb * 1024 // len(PADDING_BLOCK) + 1)
+
+    for html_path in sorted(fixtures_dir.glob('*.html')):
+        html = html_path.read_text(encoding='utf-8')
+        if padding:
+            html = html.replace('</body>', padding + '</body>')
+
+        expected_path = html_path.with_suffix('.txt')
+        expected = expected_path.read_text(encoding='utf-8').strip() if expected_path.exists() else None
+
+        corpus[html_path.stem] = {
+            'html': html.encode('utf-8'),
+            'expected': expected,
+            'expected_path': expected_path
+        }
+
+    return corpus
+
+def make_handler(corpus, latency_ms: float, jitter_ms: float):
+    """Build a request handler serving the corpus at /<page name>"""
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.strip('/').split('?')[0]
+            page = corpus.get(name)
+
+            delay = latency_ms + random.uniform(0, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            if page is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page['html'])))
+            self.end_headers()
+            self.wfile.write(page['html'])
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+def start_server(corpus, latency_ms: float, jitter_ms: float):
+    """Start the fixture server on a free local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(corpus, latency_ms, jitter_ms))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process and its (reaped) children in MB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round((own + children) / scale, 1)
+
+def similarity(expected, actual) -> float:
+    """Similarity ratio between expected and extracted text"""
+    if expected is None:
+        return None
+    return round(difflib.SequenceMatcher(None, expected, actual or '').ratio(), 4)
+
+def run_level(scraper, urls, names, corpus, concurrency: int, requests_total: int):
+    """Run one concurrency level and collect latency/quality numbers"""
+    latencies = []
+    quality = {}
+    failures = 0
+    lock = threading.Lock()
+
+    def task(i):
+        nonlocal failures
+        name = names[i % len(names)]
+        start = time.perf_counter()
+        text = scraper.extract_text(urls[name])
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            latencies.append(elapsed)
+            if text is None:
+                failures += 1
+            if name not in quality:
+                quality[name] = similarity(corpus[name]['expected'], text)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(task, range(requests_total)))
+    wall = time.perf_counter() - start
+
+    return {
+        'variant': 'extract_text',
+        'concurrency': concurrency,
+        'requests': requests_total,
+        'failures': failures,
+        'pages_per_sec': round(requests_total / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'quality': quality
+    }
+
+def run_async_level(scraper, urls, names, corpus, concurrency: int, requests_total: int):
+    """Run one concurrency level through AsyncArticleScraper on a fresh event loop"""
+    latencies = []
+    quality = {}
+    failures = 0
+
+    async def run_all():
+        nonlocal failures
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def task(i):
+            nonlocal failures
+            name = names[i % len(names)]
+            async with semaphore:
+                start = time.perf_counter()
+                text = await scraper.extract_text(urls[name])
+                elapsed = time.perf_counter() - start
+
+            latencies.append(elapsed)
+            if text is None:
+                failures += 1
+            if name not in quality:
+                quality[name] = similarity(corpus[name]['expected'], text)
+
+        # Warm up the connection pool before timing anything
+        for name in names:
+            await scraper.extract_text(urls[name])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(task(i) for i in range(requests_total)))
+        return time.perf_counter() - start
+
+    wall = asyncio.run(run_all())
+
+    return {
+        'variant': 'async',
+        'concurrency': concurrency,
+        'requests': requests_total,
+        'failures': failures,
+        'pages_per_sec': round(requests_total / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'quality': quality
+    }
+
+def update_expected(corpus):
+    """Regenerate expected text files from the current extractor"""
+    for name, page in corpus.items():
+        text = parse_article_html(page['html']) or ''
+        page['expected_path'].write_text(text + '\n', encoding='utf-8')
+        print(f"Wrote {page['expected_path']}")
+
+def print_result(result):
+    scores = [score for score in result['quality'].values() if score is not None]
+    mean_quality = round(sum(scores) / len(scores), 4) if scores else None
+    print(f"{result['variant']:<13} c={result['concurrency']:<4} "
+          f"{result['pages_per_sec']:>8} pages/s  "
+          f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms  "
+          f"rss={result['peak_rss_mb']}MB  failures={result['failures']}  "
+          f"quality={mean_quality}")
+
+    for name, score in sorted(result['quality'].items()):
+        if score is not None and score < 0.99:
+            print(f"    quality diff on {name}: similarity {score}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline ArticleScraper/AsyncArticleScraper benchmark')
+    parser.add_argument('--fixtures', type=str, default=str(FIXTURES_DIR),
+                        help='Directory with <name>.html pages and <name>.txt expected text')
+    parser.add_argument('--concurrency', type=str, default='1,4,16',
+                        help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per concurrency level')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='Latency injected by the fixture server')
+    parser.add_argument('--jitter-ms', type=float, default=0,
+                        help='Random extra latency added on top of --latency-ms')
+    parser.add_argument('--pad-kb', type=int, default=0,
+                        help='Inflate every page with this many KB of boilerplate markup')
+    parser.add_argument('--pool-workers', type=int, default=0,
+                        help='Parse HTML in an ExtractionPool with this many workers (0 = inline)')
+    parser.add_argument('--no-async', action='store_true',
+                        help='Only benchmark the threaded ArticleScraper')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    parser.add_argument('--update-expected', action='store_true',
+                        help='Regenerate expected text from the current extractor and exit')
+
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.fixtures), args.pad_kb)
+    if not corpus:
+        print(f"Error: no fixture pages found in {args.fixtures}")
+        sys.exit(1)
+
+    if args.update_expected:
+        update_expected(corpus)
+        return
+
+    server = start_server(corpus, args.latency_ms, args.jitter_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = {name: f"{base_url}/{name}" for name in corpus}
+    names = sorted(corpus)
+
+    pool = None
+    if args.pool_workers > 0:
+        pool = ExtractionPool(parse_article_html, workers=args.pool_workers)
+
+    scraper = ArticleScraper(extraction_pool=pool)
+    page_kb = sum(len(page['html']) for page in corpus.values()) / len(corpus) / 1024
+
+    print(f"Corpus: {len(corpus)} pages, avg {page_kb:.1f} KB, "
+          f"latency {args.latency_ms}ms (+{args.jitter_ms}ms jitter), "
+          f"extraction {'pool x' + str(args.pool_workers) if pool else 'inline'}")
+
+    results = []
+    try:
+        # Warm up connections and extraction workers before timing anything
+        for name in names:
+            scraper.extract_text(urls[name])
+
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            result = run_level(scraper, urls, names, corpus, concurrency, args.requests)
+            print_result(result)
+            results.append(result)
+
+            if not args.no_async:
+                # The httpx client is bound to the loop it is used on; one per level
+                async_scraper = AsyncArticleScraper(extraction_pool=pool)
+                try:
+                    result = run_async_level(async_scraper, urls, names, corpus,
+                                             concurrency, args.requests)
+                finally:
+                    asyncio.run(async_scraper.close())
+                print_result(result)
+                results.append(result)
+    finally:
+        server.shutdown()
+        if pool:
+            pool.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'config': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
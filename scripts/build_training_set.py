@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Build or extend the training set from user feedback and labelled CSV files
+
+Only feedback added since the previous run and CSV files that changed are
+read; texts already in the training set are skipped. Train on the result
+with `python scripts/train_model.py --training-set <output>`.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from utils.database import Database
+from utils.training_data import TrainingSetBuilder
+
+ROOT_DIR = Path(__file__).parent.parent
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the training set from feedback and CSV files')
+    parser.add_argument('--db', type=str, default=str(ROOT_DIR / 'backend' / 'data' / 'hoax_detection.db'),
+                        help='SQLite database with the feedback table')
+    parser.add_argument('--csv', type=str, nargs='*', default=[str(ROOT_DIR / 'data' / 'sample_news.csv')],
+                        help='Labelled CSV files (article_text, label)')
+    parser.add_argument('--output', type=str, default=str(ROOT_DIR / 'data' / 'training_set'),
+                        help='Training set directory')
+    parser.add_argument('--no-feedback', action='store_true', help='Do not read user feedback')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per batch')
+    
+    args = parser.parse_args()
+    
+    database = None
+    if not args.no_feedback:
+        if not Path(args.db).exists():
+            print(f"Error: database not found: {args.db}")
+            sys.exit(1)
+        database = Database(args.db)
+    
+    builder = TrainingSetBuilder(args.output, batch_size=args.batch_size)
+    
+    try:
+        stats = builder.update(database=database, csv_paths=args.csv)
+    finally:
+        if database:
+            database.close()
+    
+    print(f"Added {stats['added']} rows "
+          f"({stats['relabelled']} relabelled by feedback, {stats['duplicates']} duplicates, "
+          f"{stats['conflicts']} conflicting labels, {stats['skipped']} without a usable label)")
+    
+    table = builder.load(columns=['label_name', 'source'])
+    print(f"Training set: {table.num_rows} rows in {args.output}")
+    print(table.to_pandas().value_counts().to_string())
+
+if __name__ == "__main__":
+    main()
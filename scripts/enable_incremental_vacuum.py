@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Convert an existing database to incremental vacuum
+
+Databases created before incremental vacuum was introduced keep freed pages
+after retention cleanups. This rewrites the file once with VACUUM, which
+locks the whole database while it runs: stop the server and the job
+workers first. Databases that are already converted are left untouched.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from utils.database import Database
+
+ROOT_DIR = Path(__file__).parent.parent
+
+def main():
+    parser = argparse.ArgumentParser(description='Enable incremental vacuum on an existing database')
+    parser.add_argument('--db', type=str, default=str(ROOT_DIR / 'backend' / 'data' / 'hoax_detection.db'),
+                        help='SQLite database to convert')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Error: database not found: {args.db}")
+        sys.exit(1)
+
+    database = Database(args.db)
+    try:
+        converted = database.enable_incremental_vacuum()
+    finally:
+        database.close()
+
+    if converted:
+        print(f"Incremental vacuum enabled on {args.db}")
+    else:
+        print(f"{args.db} already uses incremental vacuum")
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,9 @@ Menggunakan dataset real dari sample_news.csv
 """
 
 import os
+import sys
 import json
+import argparse
 import torch
 import numpy as np
 import pandas as pd
@@ -21,6 +23,11 @@ from transformers import (
 from datasets import Dataset
 import matplotlib.pyplot as plt
 
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from utils.training_data import TrainingSetBuilder, normalize_label
+
 # Set random seed untuk reproducibility
 torch.manual_seed(42)
 np.random.seed(42)
@@ -62,6 +69,19 @@ def load_real_dataset():
         print(f"Tried to load from: {csv_path}")
         return None
 
+def load_training_set(dataset_dir):
+    """Load training set hasil scripts/build_training_set.py (feedback + CSV, sudah dedup)"""
+    print(f"Loading training set from {dataset_dir}...")
+    
+    table = TrainingSetBuilder(dataset_dir).load(columns=['text', 'label_name', 'source'])
+    df = table.to_pandas().rename(columns={'text': 'article_text', 'label_name': 'label'})
+    
+    print(f"Total samples: {len(df)}")
+    print(f"Samples per source:")
+    print(df['source'].value_counts())
+    
+    return df
+
 def clean_text(text):
     """Fungsi untuk membersihkan teks"""
     if not isinstance(text, str):
@@ -95,11 +115,10 @@ def preprocess_data(df):
     # Filter teks yang terlalu pendek
     df = df[df['article_text'].str.len() > 20]
     
-    # Map labels
-    df['label'] = df['label'].map({
-        'hoaks': 0,      # Hoax/Fake
-        'faktual': 1     # Factual/True
-    })
+    # Map labels (hoaks/hoax -> 0, faktual -> 1); label lain dibuang
+    df['label'] = df['label'].map(normalize_label)
+    df = df.dropna(subset=['label'])
+    df['label'] = df['label'].astype(int)
     
     print(f"After preprocessing:")
     print(f"Total samples: {len(df)}")
@@ -337,6 +356,12 @@ def test_inference(model_path, tokenizer):
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Train the hoax detection model')
+    parser.add_argument('--training-set', type=str,
+                        help='Training set directory from scripts/build_training_set.py '
+                             '(default: data/sample_news.csv)')
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("FAKE NEWS DETECTION MODEL TRAINING WITH REAL DATASET")
     print("=" * 80)
@@ -349,7 +374,7 @@ def main():
     
     try:
         # 1. Load dataset real
-        df = load_real_dataset()
+        df = load_training_set(args.training_set) if args.training_set else load_real_dataset()
         if df is None:
             print("Failed to load dataset. Exiting.")
             return
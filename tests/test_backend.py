@@ -1,23 +1,60 @@
 import pytest
 import json
-from unittest.mock import Mock, patch
-from backend.app import app
+from unittest.mock import AsyncMock, Mock, patch
+from backend.app import app, limiter
 from backend.models.hoax_detector import HoaxDetector
+from backend.models.model_manager import ModelManager, model_version
 from backend.models.text_processor import TextProcessor
-from backend.utils.scraper import ArticleScraper
+from backend.utils.scraper import ArticleScraper, AsyncArticleScraper, canonicalize_url, parse_article_html
+from backend.utils.extraction_pool import ExtractionPool, ExtractionTimeout, peak_rss_kb
+from backend.utils.host_health import HostHealthTracker, CircuitOpenError
+from backend.utils.metrics import REGISTRY
+from backend.utils.database import Database, RetentionJob, content_hash, build_match_query
+from backend.utils.archive import PredictionArchiver
+from backend.utils.export import stream_export
+from backend.utils.training_data import TrainingSetBuilder, normalize_label
+from backend.utils.jobs import JobQueue, JobWorker
+from backend.utils.profiling import RequestProfiler
+from backend.utils.admission import AdmissionController, AdmissionRejected
+from backend.utils.limiter_storage import SQLiteStorage
+from backend.utils.singleflight import SingleFlight, AsyncSingleFlight, SingleFlightTimeout, text_key
+from backend.utils.json_provider import NumpyJSONProvider, OrjsonProvider, get_json_provider
+from backend.utils.compression import choose_encoding
 import io
+import csv
+import gzip
+import time
+import sqlite3
+import threading
+import numpy as np
+
+SAMPLE_ARTICLE_HTML = (
+    b'<html><body><nav>Menu</nav><article><p>'
+    + b'Pemerintah mengumumkan kebijakan baru tentang subsidi energi hari ini. ' * 10
+    + b'</p></article></body></html>'
+)
+
+def _slow_extract(html):
+    """Extraction function that never finishes in time"""
+    time.sleep(10)
 
 @pytest.fixture
 def client():
     """Create a test client for the Flask app"""
     app.config['TESTING'] = True
+    # Every test starts with fresh rate limit counters
+    limiter.reset()
     with app.test_client() as client:
         yield client
 
 @pytest.fixture
 def mock_components():
     """Mock the components to avoid loading actual models"""
-    with patch('backend.app.hoax_detector') as mock_detector, \
+    mock_detector = Mock()
+    manager = ModelManager('test-model', loader=lambda path: mock_detector, warmup_texts=[])
+    manager.load()
+    
+    with patch('backend.app.model_manager', manager), \
          patch('backend.app.text_processor') as mock_processor, \
          patch('backend.app.article_scraper') as mock_scraper, \
          patch('backend.app.database') as mock_database:
@@ -37,12 +74,16 @@ def mock_components():
         # Mock text processor
         mock_processor.clean_text.return_value = 'teks yang sudah dibersihkan'
         mock_processor.extract_keywords.return_value = ['kata', 'kunci', 'penting']
+        mock_detector.predict_batch.side_effect = lambda texts: [mock_detector.predict.return_value] * len(texts)
+        mock_processor.extract_keywords_batch.side_effect = lambda texts, top_k=5: [['kata', 'kunci']] * len(texts)
+        mock_detector.count_tokens.side_effect = lambda texts: [len(text.split()) + 2 for text in texts]
         
         # Mock article scraper
         mock_scraper.extract_text.return_value = 'teks artikel yang diekstrak'
         
         # Mock database
         mock_database.store_prediction.return_value = True
+        mock_database.queue_prediction.return_value = True
         mock_database.store_feedback.return_value = 1
         
         yield {
@@ -80,11 +121,14 @@ class TestPredictEndpoint:
         assert data['prediction']['confidence'] == 0.85
         assert 'keywords' in data
         assert 'processing_time' in data
+        assert data['model_version'] == 'test-model'
         
         # Verify components were called
         mock_components['processor'].clean_text.assert_called_once()
         mock_components['detector'].predict.assert_called_once()
         mock_components['processor'].extract_keywords.assert_called_once()
+        mock_components['database'].queue_prediction.assert_called_once()
+        assert mock_components['database'].queue_prediction.call_args.kwargs['model_version'] == 'test-model'
     
     def test_predict_url_success(self, client, mock_components):
         """Test successful URL prediction"""
@@ -125,6 +169,207 @@ class TestPredictEndpoint:
         data = json.loads(response.data)
         assert 'error' in data
         assert 'too long' in data['error']
+    
+    def test_predict_selected_fields_only(self, client, mock_components):
+        """Test a field selection skips keyword extraction and omits unselected outputs"""
+        response = client.post('/api/predict', json={'text': 'Ini adalah teks berita untuk dianalisis',
+                                                     'fields': ['label']})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['prediction'] == {'label': 'hoax'}
+        assert not {'keywords', 'rationale', 'input_text', 'processed_text'} & data.keys()
+        mock_components['processor'].extract_keywords.assert_not_called()
+        mock_components['database'].queue_prediction.assert_called_once()
+        
+        response = client.post('/api/predict?fields=probabilities,keywords',
+                               json={'text': 'Ini adalah teks berita untuk dianalisis'})
+        data = json.loads(response.data)
+        assert set(data['prediction']) == {'label', 'probabilities'}
+        assert data['keywords'] == ['kata', 'kunci', 'penting']
+        mock_components['processor'].extract_keywords.assert_called_once()
+        
+        response = client.post('/api/predict', json={'text': 'Ini adalah teks berita untuk dianalisis',
+                                                     'fields': 'label,skor'})
+        assert response.status_code == 400
+        assert 'skor' in json.loads(response.data)['error']
+
+class TestMultiPredictEndpoint:
+    """Test JSON multi-text prediction"""
+    
+    def test_mixed_items_batched_in_order(self, client, mock_components):
+        """Test texts and URLs are predicted in one batch with per-item errors"""
+        from backend.app import CircuitOpenError as AppCircuitOpenError
+        
+        mock_components['processor'].clean_text.side_effect = lambda text: text.lower()
+        mock_components['scraper'].extract_text.side_effect = [
+            'Teks artikel yang diekstrak dari situs berita',
+            AppCircuitOpenError('berita.example', 4.2)
+        ]
+        
+        response = client.post('/api/predict/batch', json={'items': [
+            {'id': 'a', 'text': 'Berita pertama yang cukup panjang'},
+            {'id': 'b', 'text': 'pendek'},
+            {'id': 'c', 'url': 'https://berita.example/1'},
+            {'id': 'd', 'url': 'https://berita.example/2'},
+            'Berita tanpa id yang cukup panjang'
+        ]})
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [item['id'] for item in data['results']] == ['a', 'b', 'c', 'd', '4']
+        assert [('error' in item) for item in data['results']] == [False, True, False, True, False]
+        assert data['results'][3]['retry_after'] == 5
+        assert data['processed'] == 3 and data['errors'] == 2
+        assert data['total_tokens'] == sum(item.get('tokens', 0) for item in data['results'])
+        
+        mock_components['detector'].predict_batch.assert_called_once()
+        assert len(mock_components['detector'].predict_batch.call_args[0][0]) == 3
+        assert mock_components['database'].queue_prediction.call_count == 3
+    
+    def test_token_budget_enforced_before_fetching(self, client, mock_components):
+        """Test a request over the token budget is rejected without running the model"""
+        mock_components['processor'].clean_text.side_effect = lambda text: text.lower()
+        items = [{'id': str(i), 'text': 'kata ' * 40} for i in range(3)] + [{'url': 'https://berita.example/1'}]
+        
+        with patch('backend.app.MULTI_PREDICT_MAX_TOKENS', 100):
+            response = client.post('/api/predict/batch', json={'items': items})
+        
+        assert response.status_code == 413
+        assert json.loads(response.data)['total_tokens'] == 126
+        mock_components['scraper'].extract_text.assert_not_called()
+        mock_components['detector'].predict_batch.assert_not_called()
+    
+    def test_invalid_items(self, client, mock_components):
+        """Test malformed item lists are rejected"""
+        assert client.post('/api/predict/batch', json={'items': []}).status_code == 400
+        assert client.post('/api/predict/batch', json={'items': [1]}).status_code == 400
+        response = client.post('/api/predict/batch', json={'items': [
+            {'id': 'x', 'text': 'Berita pertama yang cukup panjang'},
+            {'id': 'x', 'text': 'Berita kedua yang cukup panjang'}
+        ]})
+        assert response.status_code == 400
+    
+    def test_selected_fields_skip_keywords(self, client, mock_components):
+        """Test a label/confidence selection runs no keyword extraction"""
+        response = client.post('/api/predict/batch', json={
+            'items': ['Berita pertama yang cukup panjang', 'Berita kedua yang cukup panjang'],
+            'fields': ['label', 'confidence']
+        })
+        
+        assert response.status_code == 200
+        results = json.loads(response.data)['results']
+        assert [set(result) for result in results] == [{'id', 'prediction', 'tokens'}] * 2
+        assert results[0]['prediction'] == {'label': 'hoax', 'confidence': 0.85}
+        mock_components['processor'].extract_keywords_batch.assert_not_called()
+        assert mock_components['database'].queue_prediction.call_args.kwargs['confidence'] == 0.85
+
+class TestMetricsEndpoint:
+    """Test stage instrumentation and the Prometheus endpoint"""
+    
+    def test_predict_timings_and_metrics(self, client, mock_components):
+        """Test a prediction reports its stage breakdown and shows up in /metrics"""
+        response = client.post('/api/predict?timings=1', json={'text': 'Berita yang cukup panjang untuk diuji'})
+        assert response.status_code == 200
+        timings = json.loads(response.data)['timings']
+        assert {'clean_text', 'keywords', 'db_write'} <= set(timings)
+        
+        # Without the flag there is no breakdown
+        response = client.post('/api/predict', json={'text': 'Berita yang cukup panjang untuk diuji'})
+        assert 'timings' not in json.loads(response.data)
+        
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        body = response.data.decode()
+        assert 'hoax_stage_duration_seconds_count{stage="clean_text"}' in body
+        assert 'hoax_http_request_duration_seconds_count{endpoint="/api/predict",method="POST",status="200"}' in body
+
+class TestAdmissionControl:
+    """Test latency-based admission control"""
+    
+    @staticmethod
+    def _loaded(seconds_per_item, backlog=0, controller_class=AdmissionController):
+        controller = controller_class(slo_seconds=2.0)
+        controller._seconds_per_item = seconds_per_item
+        controller._backlog = backlog
+        return controller
+    
+    def test_batch_shed_before_interactive(self):
+        """Test batch traffic is rejected at a lower predicted wait than interactive traffic"""
+        controller = self._loaded(0.5, backlog=4)
+        
+        with pytest.raises(AdmissionRejected) as excinfo:
+            controller.admit('batch', cost=1)
+        assert excinfo.value.retry_after == 1
+        
+        with controller.admit('interactive') as ticket:
+            assert ticket.degraded
+            assert controller.get_stats()['backlog'] == 5
+        assert controller.get_stats()['backlog'] == 4
+        
+        with pytest.raises(AdmissionRejected):
+            self._loaded(0.5, backlog=5).admit('interactive')
+        
+        # Accepted streams are never cut off
+        with self._loaded(0.5, backlog=4).admit('batch', cost=64, force=True) as ticket:
+            assert not ticket.degraded
+    
+    def test_service_time_learned_from_completed_work(self):
+        """Test the per-item estimate follows observed latency"""
+        controller = AdmissionController(slo_seconds=2.0)
+        assert controller.predicted_wait() == 0.0
+        
+        with controller.admit('interactive'):
+            time.sleep(0.05)
+        assert 0.04 < controller.get_stats()['seconds_per_item'] < 0.5
+        # Nothing is queued, so nothing waits
+        assert controller.predicted_wait() == 0.0
+        
+        with pytest.raises(ValueError):
+            with controller.admit('interactive'):
+                raise ValueError()
+        assert controller.get_stats()['backlog'] == 0
+    
+    def test_idle_process_always_admits(self):
+        """Test one slow request or a large batch cannot lock out an idle process"""
+        controller = AdmissionController(slo_seconds=0.2)
+        controller._release(1, 0.3, True)
+        assert controller.get_stats()['seconds_per_item'] == pytest.approx(0.3)
+        
+        for _ in range(5):
+            with controller.admit('interactive') as ticket:
+                assert not ticket.degraded
+        
+        # A batch whose own service time is far above the batch share
+        with controller.admit('batch', cost=50) as ticket:
+            assert not ticket.degraded
+            # ...but it does delay work queued behind it
+            with pytest.raises(AdmissionRejected):
+                controller.admit('interactive')
+        assert controller.get_stats()['rejected'] == 1
+        
+        with controller.admit('interactive'):
+            pass
+    
+    def test_predict_shed_and_degraded(self, client, mock_components):
+        """Test /api/predict returns 503 with Retry-After when overloaded and skips keywords when degraded"""
+        from backend.app import AdmissionController as AppAdmissionController
+        
+        payload = {'text': 'Berita yang cukup panjang untuk diuji'}
+        
+        with patch('backend.app.admission', self._loaded(0.5, 7, AppAdmissionController)):
+            response = client.post('/api/predict', json=payload)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '2'
+        mock_components['detector'].predict.assert_not_called()
+        
+        with patch('backend.app.admission', self._loaded(0.5, 4, AppAdmissionController)):
+            response = client.post('/api/predict', json=payload)
+        data = json.loads(response.data)
+        assert response.status_code == 200
+        assert data['degraded'] is True
+        assert data['keywords'] == []
+        mock_components['processor'].extract_keywords.assert_not_called()
 
 class TestFeedbackEndpoint:
     """Test feedback endpoint"""
@@ -174,6 +419,63 @@ class TestBatchEndpoint:
         assert 'results' in data
         assert len(data['results']) == 2
     
+    def test_batch_ndjson_stream(self, client, mock_components):
+        """Test NDJSON output interleaves results, errors and progress per chunk"""
+        rows = ['Berita nomor %d yang cukup panjang' % i for i in range(5)] + ['pendek']
+        csv_content = 'text\n' + '\n'.join(rows)
+        
+        with patch('backend.app.BATCH_CHUNK_SIZE', 2):
+            response = client.post('/api/batch?format=ndjson',
+                                   data={'file': (io.BytesIO(csv_content.encode()), 'test.csv')},
+                                   content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [line['type'] for line in lines] == [
+            'result', 'result', 'progress',
+            'result', 'result', 'progress',
+            'result', 'error', 'progress',
+            'summary'
+        ]
+        assert [line['row'] for line in lines if line['type'] in ('result', 'error')] == [1, 2, 3, 4, 5, 6]
+        assert lines[-1]['processed'] == 6
+        assert lines[-1]['errors'] == 1
+        assert mock_components['detector'].predict_batch.call_count == 3
+    
+    @pytest.mark.parametrize('ndjson', [True, False])
+    def test_batch_malformed_later_chunk(self, client, mock_components, ndjson):
+        """Test a parse error after the first chunk ends the batch with an error row, not a 500"""
+        rows = ['"Berita nomor %d yang cukup panjang"' % i for i in range(3)] + ['"rusak","kolom","lebih"']
+        csv_content = 'text\n' + '\n'.join(rows) + '\n'
+        
+        with patch('backend.app.BATCH_CHUNK_SIZE', 2):
+            response = client.post('/api/batch' + ('?format=ndjson' if ndjson else ''),
+                                   data={'file': (io.BytesIO(csv_content.encode()), 'test.csv')},
+                                   content_type='multipart/form-data')
+        assert response.status_code == 200
+        
+        if ndjson:
+            lines = [json.loads(line) for line in response.data.decode().splitlines()]
+            assert [line['type'] for line in lines] == ['result', 'result', 'progress', 'error', 'summary']
+            assert lines[3]['row'] == 3
+            assert 'Malformed CSV' in lines[3]['error']
+            assert lines[-1]['processed'] == 2
+            assert lines[-1]['errors'] == 1
+        else:
+            data = json.loads(response.data)
+            assert data['message'] == 'Processed 2 rows'
+            assert [result['row'] for result in data['results']] == [1, 2, 3]
+            assert 'Malformed CSV' in data['results'][-1]['error']
+    
+    def test_batch_missing_text_column(self, client, mock_components):
+        """Test a CSV without a text column is rejected before streaming"""
+        response = client.post('/api/batch?format=ndjson',
+                               data={'file': (io.BytesIO(b'judul\nBerita'), 'test.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+    
     def test_batch_no_file(self, client):
         """Test batch endpoint with no file"""
         response = client.post('/api/batch')
@@ -188,24 +490,388 @@ class TestHistoryEndpoint:
     def test_history_success(self, client, mock_components):
         """Test successful history retrieval"""
         # Mock database response
-        mock_components['database'].get_prediction_history.return_value = [
+        mock_components['database'].get_prediction_page.return_value = {
+            'items': [
+                {
+                    'id': 1,
+                    'request_id': '123',
+                    'input_text': 'Teks berita',
+                    'predicted_label': 'hoax',
+                    'confidence': 0.85,
+                    'processing_time': 1.2,
+                    'timestamp': '2024-01-01 12:00:00'
+                }
+            ],
+            'next_cursor': 'abc'
+        }
+        
+        response = client.get('/api/history?label=hoax&cursor=xyz')
+        assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert 'history' in data
+        assert 'total' in data
+        assert len(data['history']) == 1
+        assert data['next_cursor'] == 'abc'
+        
+        kwargs = mock_components['database'].get_prediction_page.call_args.kwargs
+        assert kwargs['label'] == 'hoax'
+        assert kwargs['cursor'] == 'xyz'
+    
+    def test_history_invalid_cursor(self, client, mock_components):
+        """Test a malformed cursor is rejected"""
+        mock_components['database'].get_prediction_page.side_effect = ValueError('Invalid cursor')
+        
+        response = client.get('/api/history?cursor=rusak')
+        assert response.status_code == 400
+    
+    @pytest.mark.parametrize('limit, expected', [('0', 1), ('-5', 1), ('1000', 100)])
+    def test_history_limit_clamped(self, client, mock_components, limit, expected):
+        """Test the page size is kept between 1 and 100"""
+        mock_components['database'].get_prediction_page.return_value = {'items': [], 'next_cursor': None}
+        
+        response = client.get(f'/api/history?limit={limit}')
+        assert response.status_code == 200
+        assert mock_components['database'].get_prediction_page.call_args.kwargs['limit'] == expected
+
+class TestResponseCompression:
+    """Test Accept-Encoding based compression of large responses"""
+    
+    def _history(self, mock_components, rows):
+        mock_components['database'].get_prediction_page.return_value = {
+            'items': [{'id': i, 'input_text': 'Teks berita yang cukup panjang untuk dikompresi',
+                       'predicted_label': 'hoax', 'confidence': 0.85} for i in range(rows)],
+            'next_cursor': None
+        }
+    
+    def test_large_response_compressed(self, client, mock_components):
+        """Test large JSON is gzipped for clients that accept it and plain otherwise"""
+        self._history(mock_components, 100)
+        
+        response = client.get('/api/history', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert len(json.loads(gzip.decompress(response.data))['history']) == 100
+        
+        response = client.get('/api/history')
+        assert 'Content-Encoding' not in response.headers
+        assert len(json.loads(response.data)['history']) == 100
+    
+    def test_small_and_streamed_responses_not_compressed(self, client, mock_components):
+        """Test small bodies and streamed NDJSON are sent as is"""
+        self._history(mock_components, 1)
+        response = client.get('/api/history', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        
+        csv_content = 'text\n' + 'Berita yang cukup panjang untuk diuji\n' * 50
+        response = client.post('/api/batch?format=ndjson', headers={'Accept-Encoding': 'gzip'},
+                               data={'file': (io.BytesIO(csv_content.encode()), 'test.csv')},
+                               content_type='multipart/form-data')
+        assert 'Content-Encoding' not in response.headers
+        assert len(response.data.decode().splitlines()) == 52
+    
+    def test_choose_encoding(self):
+        """Test q-values and wildcards of Accept-Encoding are honored"""
+        assert choose_encoding('gzip, deflate') == 'gzip'
+        assert choose_encoding('*') in ('br', 'gzip')
+        assert choose_encoding('gzip;q=0, identity') is None
+        assert choose_encoding('*;q=0.5, gzip;q=0') in ('br', None)
+        assert choose_encoding(None) is None
+
+class TestExportEndpoint:
+    """Test export endpoint"""
+    
+    def test_export_ndjson_gzip(self, client, mock_components):
+        """Test a gzipped NDJSON export streams every row in full"""
+        long_text = 'Teks berita yang sangat panjang ' * 20
+        mock_components['database'].iter_export.return_value = iter([
+            [(1, '123', long_text, 'hoax', 0.85, 1.2, '2024-01-01 12:00:00')],
+            [(2, '124', 'Teks kedua', 'faktual', 0.7, 0.9, '2024-01-01 12:00:01')]
+        ])
+        
+        response = client.get('/api/export?format=ndjson&compress=gzip&start=2024-01-01')
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        
+        lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+        records = [json.loads(line) for line in lines]
+        assert [record['id'] for record in records] == [1, 2]
+        assert records[0]['input_text'] == long_text
+        assert mock_components['database'].iter_export.call_args.kwargs['start'] == '2024-01-01'
+    
+    def test_export_rejects_unknown_format(self, client, mock_components):
+        """Test unsupported formats are rejected before streaming"""
+        response = client.get('/api/export?format=xml')
+        assert response.status_code == 400
+
+class TestSearchEndpoint:
+    """Test search endpoint"""
+    
+    def test_search_escapes_and_highlights_snippet(self, client, mock_components):
+        """Test snippets are HTML-escaped with matched terms wrapped in <mark>"""
+        mock_components['database'].search.return_value = [
             {
+                'id': 1,
                 'request_id': '123',
-                'input_text': 'Teks berita',
+                'input_text': '<b>Kuota</b> internet gratis',
                 'predicted_label': 'hoax',
                 'confidence': 0.85,
                 'processing_time': 1.2,
-                'timestamp': '2024-01-01 12:00:00'
+                'timestamp': '2024-01-01 12:00:00',
+                'snippet': '<b>\x02Kuota\x03</b> internet gratis',
+                'score': 1.5
             }
         ]
         
-        response = client.get('/api/history')
+        response = client.get('/api/search?q=kuota&label=hoax')
         assert response.status_code == 200
         
         data = json.loads(response.data)
-        assert 'history' in data
-        assert 'total' in data
-        assert len(data['history']) == 1
+        assert data['total'] == 1
+        assert data['results'][0]['snippet'] == '&lt;b&gt;<mark>Kuota</mark>&lt;/b&gt; internet gratis'
+        assert mock_components['database'].search.call_args.kwargs['label'] == 'hoax'
+    
+    def test_search_requires_query(self, client, mock_components):
+        """Test an empty query is rejected"""
+        response = client.get('/api/search?q=')
+        assert response.status_code == 400
+
+class TestJobsEndpoint:
+    """Test the asynchronous batch job API"""
+    
+    def test_submit_poll_and_download(self, client, mock_components, tmp_path):
+        """Test a submitted job is queued, run by a worker and its results downloaded"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'))
+        csv_content = 'text\nBerita pertama yang cukup panjang\nBerita kedua yang cukup panjang'
+        
+        with patch('backend.app.job_queue', queue):
+            response = client.post('/api/jobs',
+                                   data={'file': (io.BytesIO(csv_content.encode()), 'test.csv')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 202
+            job_id = json.loads(response.data)['job_id']
+            
+            assert json.loads(client.get(f'/api/jobs/{job_id}').data)['status'] == 'queued'
+            
+            worker = JobWorker(queue, lambda chunk: [{'row': idx + 1, 'text': text} for idx, text in
+                                                     zip(chunk.index, chunk['text'])])
+            assert worker.run_once()
+            
+            job = json.loads(client.get(f'/api/jobs/{job_id}').data)
+            assert job['status'] == 'completed'
+            assert job['processed_rows'] == job['total_rows'] == 2
+            assert job['progress'] == 1.0
+            
+            response = client.get(f'/api/jobs/{job_id}/results')
+            lines = [json.loads(line) for line in response.data.decode().splitlines()]
+            assert [line['row'] for line in lines] == [1, 2]
+            
+            response = client.delete(f'/api/jobs/{job_id}')
+            assert json.loads(response.data)['status'] == 'deleted'
+            assert not (tmp_path / 'jobs' / job_id).exists()
+            assert client.get(f'/api/jobs/{job_id}').status_code == 404
+            assert client.get('/api/jobs/missing').status_code == 404
+        database.close()
+    
+    def test_submit_rejects_oversized_upload(self, client, mock_components, tmp_path):
+        """Test uploads over MAX_CONTENT_LENGTH are refused before anything is stored"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'))
+        csv_content = 'text\n' + 'Berita yang cukup panjang\n' * 100
+        
+        with patch('backend.app.job_queue', queue), \
+             patch.dict(app.config, {'MAX_CONTENT_LENGTH': 1024}):
+            response = client.post('/api/jobs',
+                                   data={'file': (io.BytesIO(csv_content.encode()), 'test.csv')},
+                                   content_type='multipart/form-data')
+        assert response.status_code == 413
+        assert list((tmp_path / 'jobs').iterdir()) == []
+        database.close()
+    
+    def test_submit_rejects_missing_text_column(self, client, mock_components, tmp_path):
+        """Test a CSV without a text column is rejected before it is queued"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'))
+        
+        with patch('backend.app.job_queue', queue):
+            response = client.post('/api/jobs',
+                                   data={'file': (io.BytesIO(b'judul\nBerita'), 'test.csv')},
+                                   content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert list((tmp_path / 'jobs').iterdir()) == []
+        database.close()
+
+class TestModelReloadEndpoint:
+    """Test the admin-triggered model reload"""
+    
+    def test_reload_requires_token(self, client, mock_components):
+        """Test reloads are refused without the configured admin token"""
+        with patch('backend.app.MODEL_ADMIN_TOKEN', None):
+            assert client.post('/api/admin/model/reload',
+                               headers={'X-Admin-Token': ''}).status_code == 403
+        
+        with patch('backend.app.MODEL_ADMIN_TOKEN', 'rahasia'):
+            assert client.post('/api/admin/model/reload',
+                               headers={'X-Admin-Token': 'salah'}).status_code == 403
+    
+    def test_reload_swaps_model_in_background(self, client, tmp_path):
+        """Test a reload serves the new version and reports it in health"""
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-1')
+        detectors = []
+        
+        def load(path):
+            detectors.append(Mock())
+            return detectors[-1]
+        
+        manager = ModelManager(str(tmp_path), loader=load, warmup_texts=['teks pemanasan'])
+        manager.load()
+        first_version = manager.version
+        
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-2')
+        with patch('backend.app.model_manager', manager), \
+             patch('backend.app.MODEL_ADMIN_TOKEN', 'rahasia'):
+            response = client.post('/api/admin/model/reload', headers={'X-Admin-Token': 'rahasia'})
+            assert response.status_code == 202
+            manager._reload_thread.join(5)
+            
+            model = json.loads(client.get('/api/health').data)['model']
+        
+        assert model['version'] == manager.version == model_version(str(tmp_path))
+        assert model['version'] != first_version
+        assert model['last_error'] is None
+        detectors[1].predict_batch.assert_called_once_with(['teks pemanasan'])
+
+class TestAsgiApp:
+    """Test the ASGI serving mode keeps the Flask contracts"""
+    
+    @pytest.fixture
+    def asgi_client(self):
+        from starlette.testclient import TestClient
+        from backend import asgi
+        
+        mock_detector = Mock()
+        manager = ModelManager('test-model', loader=lambda path: mock_detector, warmup_texts=[])
+        manager.load()
+        
+        with patch.object(asgi.wsgi, 'model_manager', manager), \
+             patch.object(asgi.wsgi, 'text_processor') as mock_processor, \
+             patch.object(asgi.wsgi, 'database') as mock_database, \
+             patch.object(asgi, 'AsyncArticleScraper') as mock_scraper_class:
+            
+            mock_detector.predict.return_value = {
+                'label': 'hoax',
+                'confidence': 0.85,
+                'probabilities': {'hoax': 0.85, 'faktual': 0.15},
+                'rationale': 'Teks ini diklasifikasikan sebagai berita hoax.'
+            }
+            mock_processor.clean_text.return_value = 'teks yang sudah dibersihkan'
+            mock_processor.extract_keywords.return_value = ['kata', 'kunci']
+            mock_detector.predict_batch.side_effect = lambda texts: [mock_detector.predict.return_value] * len(texts)
+            mock_processor.extract_keywords_batch.side_effect = lambda texts, top_k=5: [['kata', 'kunci']] * len(texts)
+            mock_database.store_feedback.return_value = 7
+            
+            mock_scraper = mock_scraper_class.return_value
+            mock_scraper.extract_text = AsyncMock(
+                return_value='Teks artikel yang diekstrak dari halaman berita'
+            )
+            mock_scraper.close = AsyncMock()
+            
+            asgi.rate_limiter.storage.reset()
+            with TestClient(asgi.app) as client:
+                yield client, asgi, mock_database
+    
+    def test_predict_text_and_url(self, asgi_client):
+        """Test text and URL predictions return the Flask response shape"""
+        client, asgi, mock_database = asgi_client
+        
+        response = client.post('/api/predict', json={'text': 'Ini adalah berita hoax tentang vaksin'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['prediction']['label'] == 'hoax'
+        assert data['keywords'] == ['kata', 'kunci']
+        assert mock_database.queue_prediction.called
+        
+        response = client.post('/api/predict', json={'url': 'https://example.com/berita'})
+        assert response.status_code == 200
+        assert response.json()['input_text'].startswith('Teks artikel')
+        
+        assert client.post('/api/predict', json={}).status_code == 400
+        assert client.post('/api/predict', json={'text': 'pendek'}).status_code == 400
+    
+    def test_predict_rejected_when_inference_queue_full(self, asgi_client):
+        """Test a full inference executor answers 503 with Retry-After"""
+        client, asgi, _ = asgi_client
+        
+        with patch.object(asgi.inference_executor, '_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            response = client.post('/api/predict', json={'text': 'Ini adalah berita hoax tentang vaksin'})
+        
+        assert response.status_code == 503
+        assert 'Retry-After' in response.headers
+    
+    def test_feedback_batch_and_history(self, asgi_client):
+        """Test feedback, batch and history contracts"""
+        client, asgi, mock_database = asgi_client
+        
+        response = client.post('/api/feedback', json={
+            'text': 'Teks berita', 'predicted_label': 'hoax', 'user_label': 'faktual'
+        })
+        assert response.json() == {'message': 'Feedback submitted successfully', 'feedback_id': 7}
+        
+        csv_content = 'text\nIni adalah berita hoax tentang vaksin\nPendek\n'
+        response = client.post('/api/batch', files={'file': ('test.csv', csv_content, 'text/csv')})
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert results[0]['prediction']['label'] == 'hoax'
+        assert 'error' in results[1]
+        
+        response = client.post('/api/batch', params={'format': 'ndjson'},
+                               files={'file': ('test.csv', csv_content, 'text/csv')})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line['type'] for line in lines] == ['result', 'error', 'progress', 'summary']
+        
+        # A chunk that fails to parse ends the stream with an error record and the summary
+        broken = 'text\n' + 'Ini adalah berita hoax tentang vaksin\n' * 3 + '"rusak","kolom","lebih"\n'
+        with patch.object(asgi.wsgi, 'BATCH_CHUNK_SIZE', 2):
+            response = client.post('/api/batch', params={'format': 'ndjson'},
+                                   files={'file': ('test.csv', broken, 'text/csv')})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line['type'] for line in lines] == ['result', 'result', 'progress', 'error', 'summary']
+        assert lines[3]['row'] == 3
+        
+        # ...and one in the first chunk is rejected before anything runs
+        response = client.post('/api/batch', files={'file': ('test.csv', broken, 'text/csv')})
+        assert response.status_code == 400
+        
+        mock_database.get_prediction_page.return_value = {'items': [], 'next_cursor': None}
+        response = client.get('/api/history?label=hoax')
+        assert response.json() == {'history': [], 'total': 0, 'next_cursor': None}
+        assert client.get('/api/history?type=lainnya').status_code == 400
+    
+    def test_large_responses_compressed(self, asgi_client):
+        """Test complete responses are compressed and streamed ones are not"""
+        client, asgi, mock_database = asgi_client
+        
+        mock_database.get_prediction_page.return_value = {
+            'items': [{'id': i, 'input_text': 'Teks berita yang cukup panjang untuk dikompresi'}
+                      for i in range(100)],
+            'next_cursor': None
+        }
+        response = client.get('/api/history', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.json()['total'] == 100
+        
+        response = client.get('/api/history', headers={'Accept-Encoding': 'identity'})
+        assert 'content-encoding' not in response.headers
+        
+        csv_content = 'text\n' + 'Ini adalah berita hoax tentang vaksin\n' * 50
+        response = client.post('/api/batch', params={'format': 'ndjson'},
+                               headers={'Accept-Encoding': 'gzip'},
+                               files={'file': ('test.csv', csv_content, 'text/csv')})
+        assert 'content-encoding' not in response.headers
+        assert len(response.text.splitlines()) == 52
 
 class TestTextProcessor:
     """Test text processor functionality"""
@@ -245,5 +911,1166 @@ class TestArticleScraper:
         assert scraper._is_valid_url('invalid-url') == False
         assert scraper._is_valid_url('') == False
 
+class TestHostHealthTracker:
+    """Test per-host circuit breaking and adaptive timeouts"""
+    
+    def test_circuit_opens_after_consecutive_failures(self):
+        """Test a failing host fails fast once its circuit opens"""
+        tracker = HostHealthTracker(failure_threshold=3, open_seconds=60)
+        
+        for _ in range(3):
+            tracker.before_request('lambat.example.com')
+            tracker.record_failure('lambat.example.com')
+        
+        assert tracker.get_state('lambat.example.com') == 'open'
+        with pytest.raises(CircuitOpenError):
+            tracker.before_request('lambat.example.com')
+        
+        # Other hosts are unaffected
+        tracker.before_request('cepat.example.com')
+    
+    def test_half_open_probe_closes_circuit(self):
+        """Test a successful probe after the open period closes the circuit"""
+        tracker = HostHealthTracker(failure_threshold=1, open_seconds=0)
+        tracker.before_request('example.com')
+        tracker.record_failure('example.com')
+        
+        tracker.before_request('example.com')
+        assert tracker.get_state('example.com') == 'half_open'
+        
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            tracker.before_request('example.com')
+        
+        tracker.record_success('example.com', 0.2)
+        assert tracker.get_state('example.com') == 'closed'
+    
+    def test_timeout_adapts_to_p95(self):
+        """Test timeouts follow observed latency within bounds"""
+        tracker = HostHealthTracker(min_samples=5, timeout_multiplier=2.0,
+                                    min_timeout=1.0, max_timeout=10.0)
+        assert tracker.before_request('example.com') == 10.0
+        
+        for _ in range(10):
+            tracker.record_success('example.com', 1.5)
+        
+        assert tracker.before_request('example.com') == 3.0
+        assert tracker.get_stats()['example.com']['ewma_latency'] == 1.5
+    
+    def test_cancelled_probe_released(self):
+        """Test a probe cancelled mid-fetch does not keep the circuit half-open forever"""
+        import asyncio
+        
+        tracker = HostHealthTracker(failure_threshold=1, open_seconds=0)
+        tracker.before_request('example.com')
+        tracker.record_failure('example.com')
+        
+        async def fetch_cancelled():
+            scraper = AsyncArticleScraper(host_health=tracker)
+            try:
+                with patch.object(scraper.client, 'get', AsyncMock(side_effect=asyncio.CancelledError)):
+                    with pytest.raises(asyncio.CancelledError):
+                        await scraper._fetch('https://example.com/berita')
+            finally:
+                await scraper.close()
+        
+        asyncio.run(fetch_cancelled())
+        
+        assert tracker.get_state('example.com') == 'half_open'
+        # The next request may probe again
+        tracker.before_request('example.com')
+    
+    def test_circuit_state_exported(self):
+        """Test each host's circuit state is exported as a gauge"""
+        tracker = HostHealthTracker(failure_threshold=1, open_seconds=0)
+        tracker.before_request('gauge.example.com')
+        tracker.record_failure('gauge.example.com')
+        assert REGISTRY.get_sample_value('hoax_circuit_state', {'host': 'gauge.example.com'}) == 2
+        
+        tracker.before_request('gauge.example.com')
+        assert REGISTRY.get_sample_value('hoax_circuit_state', {'host': 'gauge.example.com'}) == 1
+        
+        tracker.record_success('gauge.example.com', 0.1)
+        assert REGISTRY.get_sample_value('hoax_circuit_state', {'host': 'gauge.example.com'}) == 0
+
+class TestDatabase:
+    """Test SQLite storage"""
+    
+    def test_connections_use_wal_and_pragmas(self, tmp_path):
+        """Test pooled connections are opened in WAL mode with tuned pragmas"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        
+        with database._connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+            assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+        
+        database.close()
+    
+    def test_concurrent_writes_share_pool(self, tmp_path):
+        """Test concurrent writers reuse a bounded set of connections"""
+        database = Database(str(tmp_path / 'hoax.db'), pool_size=2)
+        
+        def write(worker):
+            for i in range(20):
+                database.store_prediction(f'{worker}-{i}', 'Teks berita untuk diuji',
+                                          'hoax', 0.9, 0.1)
+        
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert database.get_statistics()['total_predictions'] == 80
+        assert database._pool_created <= 2
+        database.close()
+    
+    def test_model_version_recorded_and_migrated(self, tmp_path):
+        """Test predictions keep their model version and old databases gain the column"""
+        db_path = str(tmp_path / 'hoax.db')
+        database = Database(db_path)
+        database.store_prediction('req-1', 'Teks berita', 'hoax', 0.9, 0.2, model_version='a1b2c3')
+        assert database.get_prediction_history()[0]['model_version'] == 'a1b2c3'
+        
+        with database._connection() as conn:
+            conn.execute('ALTER TABLE predictions DROP COLUMN model_version')
+        database.close()
+        
+        database = Database(db_path)
+        database.store_prediction('req-2', 'Teks berita lain', 'faktual', 0.8, 0.2, model_version='d4e5f6')
+        rows = [row for batch in database.iter_export() for row in batch]
+        assert [row[-1] for row in rows] == [None, 'd4e5f6']
+        database.close()
+
+class TestHistoryPagination:
+    """Test keyset pagination of stored history"""
+    
+    def _populate(self, database):
+        with database._connection() as conn:
+            text_id = database._store_texts(conn, ['Teks berita'])['Teks berita']
+            conn.executemany(
+                '''INSERT INTO predictions
+                   (request_id, text_id, predicted_label, confidence, processing_time, timestamp)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                [(f'req-{i}', text_id, 'hoax' if i % 2 else 'faktual',
+                  0.8, 0.1, f'2024-01-01 12:00:{i % 3:02d}') for i in range(10)]
+            )
+    
+    def test_pages_cover_history_without_overlap(self, tmp_path):
+        """Test following next_cursor walks every row exactly once, newest first"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        self._populate(database)
+        
+        seen = []
+        cursor = None
+        while True:
+            page = database.get_prediction_page(limit=3, cursor=cursor)
+            seen.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert sorted(seen) == list(range(1, 11))
+        assert len(seen) == len(set(seen))
+        database.close()
+    
+    def test_non_positive_limit_returns_one_row(self, tmp_path):
+        """Test a zero or negative limit neither fails nor returns everything"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        self._populate(database)
+        
+        for limit in (0, -1):
+            page = database.get_prediction_page(limit=limit)
+            assert len(page['items']) == 1
+            assert page['next_cursor'] is not None
+        database.close()
+    
+    def test_label_and_time_filters(self, tmp_path):
+        """Test label and time range filters"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        self._populate(database)
+        
+        page = database.get_prediction_page(label='hoax', start='2024-01-01T12:00:01',
+                                            end='2024-01-01T12:00:02')
+        assert page['items']
+        assert all(item['predicted_label'] == 'hoax' for item in page['items'])
+        assert all(item['timestamp'] == '2024-01-01 12:00:01' for item in page['items'])
+        
+        with pytest.raises(ValueError):
+            database.get_prediction_page(cursor='bukan-cursor')
+        database.close()
+
+class TestHistoryExport:
+    """Test streaming history exports"""
+    
+    def test_export_batches_filters_and_csv(self, tmp_path):
+        """Test exports keep full texts, honour filters and encode to CSV"""
+        database = Database(str(tmp_path / 'hoax.db'), compress_min_bytes=16)
+        long_text = 'Teks berita yang sangat panjang, dengan koma. ' * 10
+        for i in range(5):
+            database.store_prediction(f'req-{i}', long_text + str(i), 'hoax' if i % 2 else 'faktual',
+                                      0.8, 0.1)
+        
+        batches = list(database.iter_export(batch_size=2))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert batches[0][0][2] == long_text + '0'
+        
+        hoax = [row for batch in database.iter_export(label='hoax') for row in batch]
+        assert [row[1] for row in hoax] == ['req-1', 'req-3']
+        assert list(database.iter_export(end='2000-01-01')) == []
+        
+        with pytest.raises(ValueError):
+            database.iter_export(start='kemarin')
+        
+        body = b''.join(stream_export(database.iter_export(kind='predictions'),
+                                      ['id', 'request_id', 'input_text', 'predicted_label',
+                                       'confidence', 'processing_time', 'timestamp'], 'csv'))
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+        assert rows[0][:3] == ['id', 'request_id', 'input_text']
+        assert len(rows) == 6
+        assert rows[1][2] == long_text + '0'
+        database.close()
+
+class TestFullTextSearch:
+    """Test full-text search over stored texts"""
+    
+    def _populate(self, database):
+        database.store_prediction('a', 'Pemerintah membagikan kuota internet gratis untuk pelajar',
+                                  'hoax', 0.9, 0.1)
+        database.store_prediction('b', 'Ijazah palsu pejabat terbongkar menurut warganet. ' * 30,
+                                  'hoax', 0.8, 0.1)
+        database.store_prediction('c', 'Kuota internet bantuan Kemendikbud resmi dilanjutkan',
+                                  'faktual', 0.7, 0.1)
+        database.store_feedback('Ijazah palsu pejabat', 'hoax', 'faktual')
+    
+    def test_build_match_query_quotes_terms(self):
+        """Test user input cannot inject FTS5 syntax"""
+        assert build_match_query('kuota "internet gratis" NOT ijaz*') == \
+            '"kuota" "internet gratis" "NOT" "ijaz"*'
+        with pytest.raises(ValueError):
+            build_match_query('  "" * ')
+    
+    def test_search_matches_filters_and_highlights(self, tmp_path):
+        """Test matching, label filter, prefix search and snippets, including compressed texts"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        self._populate(database)
+        
+        results = database.search('kuota internet')
+        assert sorted(r['request_id'] for r in results) == ['a', 'c']
+        assert all('<mark>' in r['snippet'] for r in results)
+        
+        assert [r['request_id'] for r in database.search('KUOTA', label='faktual')] == ['c']
+        assert [r['request_id'] for r in database.search('ijaz*')] == ['b']
+        assert [r['user_label'] for r in database.search('ijazah', kind='feedback')] == ['faktual']
+        assert database.search('kuota', start='2000-01-01', end='2000-01-02') == []
+        
+        with pytest.raises(ValueError):
+            database.search('kuota', kind='semua')
+        database.close()
+    
+    def test_index_follows_deletes_and_is_built_for_existing_databases(self, tmp_path):
+        """Test orphaned texts leave the index and a missing index is rebuilt on open"""
+        db_path = str(tmp_path / 'hoax.db')
+        database = Database(db_path)
+        self._populate(database)
+        
+        with database._connection() as conn:
+            conn.execute("DELETE FROM predictions WHERE request_id = 'a'")
+        database.delete_orphan_texts(pause=0)
+        assert [r['request_id'] for r in database.search('kuota')] == ['c']
+        
+        with database._connection() as conn:
+            conn.execute('DROP TABLE texts_fts')
+        database.close()
+        
+        database = Database(db_path)
+        assert [r['request_id'] for r in database.search('ijazah')] == ['b']
+        database.close()
+    
+    def test_plain_sqlite_can_write_texts(self, tmp_path):
+        """Test the index needs no application-defined function and strips snippet markers"""
+        db_path = str(tmp_path / 'hoax.db')
+        database = Database(db_path)
+        self._populate(database)
+        database.store_prediction('d', 'Kuota \x02palsu\x03 beredar', 'hoax', 0.6, 0.1)
+        
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("DELETE FROM predictions WHERE request_id IN ('a', 'b')")
+            conn.execute('DELETE FROM texts WHERE id NOT IN (SELECT text_id FROM predictions) '
+                         'AND id NOT IN (SELECT text_id FROM feedback)')
+            conn.execute("INSERT INTO texts (content_hash, content, compressed, length) "
+                         "VALUES ('x', 'Hoaks vaksin beredar lagi', 0, 25)")
+            text_id = conn.execute("SELECT id FROM texts WHERE content_hash = 'x'").fetchone()[0]
+            conn.execute("INSERT INTO predictions (request_id, text_id, predicted_label, confidence, "
+                         "processing_time) VALUES ('e', ?, 'hoax', 0.9, 0.1)", [text_id])
+        conn.close()
+        
+        assert sorted(r['request_id'] for r in database.search('kuota')) == ['c', 'd']
+        assert database.search('ijazah') == []
+        assert [r['request_id'] for r in database.search('vaksin')] == ['e']
+        
+        snippet = database.search('palsu', highlight=('\x02', '\x03'))[0]['snippet']
+        assert snippet.count('\x02') == 1 and snippet.count('\x03') == 1
+        database.close()
+    
+    def test_external_content_index_replaced(self, tmp_path):
+        """Test an index built on the old texts_plain view is replaced on open"""
+        db_path = str(tmp_path / 'hoax.db')
+        database = Database(db_path)
+        self._populate(database)
+        with database._connection() as conn:
+            conn.execute('DROP TRIGGER trg_texts_fts_insert')
+            conn.execute('DROP TRIGGER trg_texts_fts_delete')
+            conn.execute('DROP TABLE texts_fts')
+            conn.execute('CREATE VIEW texts_plain AS '
+                         'SELECT id, unpack_text(content, compressed) AS content FROM texts')
+            conn.execute("CREATE VIRTUAL TABLE texts_fts USING fts5(content, content='texts_plain', "
+                         "content_rowid='id')")
+            conn.execute("INSERT INTO texts_fts (texts_fts) VALUES ('rebuild')")
+        database.close()
+        
+        database = Database(db_path)
+        assert [r['request_id'] for r in database.search('ijazah')] == ['b']
+        with database._connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'texts_plain'").fetchone()[0] == 0
+        database.close()
+
+class TestTextStorage:
+    """Test content-addressed text storage"""
+    
+    def test_identical_texts_stored_once(self, tmp_path):
+        """Test repeated texts share one compressed texts row"""
+        database = Database(str(tmp_path / 'hoax.db'), compress_min_bytes=64)
+        viral = 'Pesan berantai: vaksin mengandung chip pelacak, sebarkan ke semua kontak! ' * 5
+        
+        for i in range(5):
+            database.store_prediction(f'req-{i}', viral, 'hoax', 0.9, 0.1)
+        database.store_feedback(viral, 'hoax', 'hoax')
+        
+        with database._connection() as conn:
+            rows = conn.execute('SELECT content_hash, compressed, length FROM texts').fetchall()
+        
+        assert rows == [(content_hash(viral), 1, len(viral))]
+        history = database.get_prediction_history(limit=10)
+        assert len(history) == 5
+        assert history[0]['input_text'] == viral[:100] + '...'
+        database.close()
+    
+    def test_migrates_inline_text_schema(self, tmp_path):
+        """Test databases with inline input_text/text columns are migrated"""
+        db_path = str(tmp_path / 'legacy.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript('''
+                CREATE TABLE predictions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    request_id TEXT UNIQUE NOT NULL,
+                    input_text TEXT NOT NULL,
+                    predicted_label TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    processing_time REAL NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE feedback (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    predicted_label TEXT NOT NULL,
+                    user_label TEXT NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                INSERT INTO predictions (request_id, input_text, predicted_label, confidence, processing_time)
+                VALUES ('a', 'Teks berita sama', 'hoax', 0.9, 0.1),
+                       ('b', 'Teks berita sama', 'hoax', 0.8, 0.1),
+                       ('c', 'Teks berita lain', 'faktual', 0.7, 0.1);
+                INSERT INTO feedback (text, predicted_label, user_label)
+                VALUES ('Teks berita sama', 'hoax', 'faktual');
+            ''')
+        conn.close()
+        
+        database = Database(db_path)
+        
+        with database._connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == 2
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(predictions)')]
+            assert 'input_text' not in columns
+        
+        history = database.get_prediction_history()
+        assert sorted(item['input_text'] for item in history) == [
+            'Teks berita lain', 'Teks berita sama', 'Teks berita sama'
+        ]
+        assert database.get_feedback_history()[0]['text'] == 'Teks berita sama'
+        assert database.get_statistics()['total_predictions'] == 3
+        
+        # New rows keep counting after the rebuild
+        database.store_prediction('d', 'Teks berita baru', 'hoax', 0.6, 0.1)
+        assert database.get_statistics()['total_predictions'] == 4
+        database.close()
+
+class TestStatisticsRollups:
+    """Test incrementally maintained statistics"""
+    
+    def test_statistics_follow_inserts(self, tmp_path):
+        """Test rollups are updated on every insert"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        database.store_prediction('req-1', 'Teks berita pertama', 'hoax', 0.9, 0.2)
+        database.store_prediction('req-2', 'Teks berita kedua', 'hoax', 0.7, 0.4)
+        database.store_prediction('req-3', 'Teks berita ketiga', 'faktual', 0.8, 0.3)
+        database.store_feedback('Teks berita pertama', 'hoax', 'faktual')
+        
+        stats = database.get_statistics()
+        assert stats['total_predictions'] == 3
+        assert stats['total_feedback'] == 1
+        assert stats['label_counts'] == {'hoax': 2, 'faktual': 1}
+        assert stats['average_confidence'] == 0.8
+        assert stats['average_processing_time'] == 0.3
+        database.close()
+    
+    def test_time_window_and_series(self, tmp_path):
+        """Test windowed statistics and hourly series"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        with database._connection() as conn:
+            text_id = database._store_texts(conn, ['Teks berita'])['Teks berita']
+            conn.executemany(
+                f'''INSERT INTO predictions
+                   (request_id, text_id, predicted_label, confidence, processing_time, timestamp)
+                   VALUES (?, {text_id}, ?, 0.5, 0.1, ?)''',
+                [('a', 'hoax', '2024-01-01 10:15:00'),
+                 ('b', 'faktual', '2024-01-01 10:45:00'),
+                 ('c', 'hoax', '2024-01-01 11:05:00')]
+            )
+        
+        stats = database.get_statistics(start='2024-01-01T11:00:00', end='2024-01-01T12:00:00')
+        assert stats['total_predictions'] == 1
+        
+        # Bounds widen to whole hours: start rounds down, end rounds up
+        stats = database.get_statistics(start='2024-01-01T10:30:00', end='2024-01-01T10:31:00')
+        assert stats['total_predictions'] == 2
+        
+        series = database.get_statistics_series('hour', start='2024-01-01', end='2024-01-02')
+        assert [bucket['total_predictions'] for bucket in series] == [2, 1]
+        assert series[0]['label_counts'] == {'hoax': 1, 'faktual': 1}
+        database.close()
+    
+    def test_rollups_backfilled_for_existing_database(self, tmp_path):
+        """Test rollups are built from existing rows when first created"""
+        db_path = str(tmp_path / 'hoax.db')
+        database = Database(db_path)
+        database.store_prediction('req-1', 'Teks berita', 'hoax', 0.9, 0.2)
+        with database._connection() as conn:
+            conn.execute('DROP TABLE prediction_rollups')
+        database.close()
+        
+        assert Database(db_path).get_statistics()['total_predictions'] == 1
+
+class TestRetentionCleanup:
+    """Test chunked retention cleanup"""
+    
+    def test_cleanup_deletes_old_rows_in_batches(self, tmp_path):
+        """Test old rows and orphaned texts are removed batch by batch"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        for i in range(30):
+            database.store_prediction(f'old-{i}', f'Teks berita lama nomor {i}', 'hoax', 0.9, 0.1)
+        database.store_prediction('new', 'Teks berita baru', 'faktual', 0.8, 0.1)
+        database.store_feedback('Teks berita lama nomor 1', 'hoax', 'faktual')
+        
+        with database._connection() as conn:
+            conn.execute("UPDATE predictions SET timestamp = '2020-01-01 00:00:00' WHERE request_id LIKE 'old-%'")
+            conn.execute("UPDATE feedback SET timestamp = '2020-01-01 00:00:00'")
+        
+        progress = []
+        deleted = database.cleanup_old_records(days=30, batch_size=7, pause=0,
+                                               progress_callback=progress.append)
+        
+        assert deleted == 31
+        assert len(progress) > 5
+        assert progress[-1]['phase'] == 'texts'
+        
+        with database._connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] == 1
+            assert conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == 1
+            assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+        database.close()
+    
+    def test_existing_database_converted_only_on_request(self, tmp_path):
+        """Test opening an old database does not VACUUM it; the explicit conversion does"""
+        db_path = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE legacy (id INTEGER PRIMARY KEY)')
+        conn.close()
+        
+        database = Database(db_path)
+        with database._connection() as conn:
+            assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        
+        assert database.enable_incremental_vacuum() is True
+        assert database.enable_incremental_vacuum() is False
+        with database._connection() as conn:
+            assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        database.close()
+    
+    def test_one_process_runs_retention(self, tmp_path):
+        """Test only the holder of the lock file runs the cleanup"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        lock_path = str(tmp_path / 'hoax.db.retention.lock')
+        first = RetentionJob(database, days=30, lock_path=lock_path)
+        second = RetentionJob(database, days=30, lock_path=lock_path)
+        
+        assert first._take_lock()
+        assert not second._take_lock()
+        assert first.get_status()['leader'] and not second.get_status()['leader']
+        
+        # The lock is handed over when the leader stops
+        first.stop()
+        assert second._take_lock()
+        second.stop()
+        database.close()
+
+class TestPredictionArchiver:
+    """Test archiving old predictions to Parquet"""
+    
+    def test_archive_moves_rows_and_supports_queries(self, tmp_path):
+        """Test aged rows move to date partitions and can be queried back"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        for i in range(10):
+            database.store_prediction(f'req-{i}', f'Teks berita nomor {i}',
+                                      'hoax' if i % 2 else 'faktual', 0.5 + i / 20, 0.1)
+        
+        with database._connection() as conn:
+            conn.execute("UPDATE predictions SET timestamp = '2024-01-0' || (1 + id % 3) || ' 08:00:00' WHERE id <= 8")
+        
+        archiver = PredictionArchiver(database, str(tmp_path / 'archive'), batch_size=3)
+        assert archiver.archive_older_than(days=30, pause=0) == 8
+        
+        # Hot table keeps only recent rows; rollups still count everything
+        assert len(database.get_prediction_history()) == 2
+        assert database.get_statistics()['total_predictions'] == 10
+        
+        partitions = sorted(path.name for path in (tmp_path / 'archive' / 'predictions').iterdir())
+        assert partitions == ['date=2024-01-01', 'date=2024-01-02', 'date=2024-01-03']
+        
+        assert archiver.query().num_rows == 8
+        table = archiver.query(columns=['request_id', 'input_text'], label='faktual',
+                               start='2024-01-02', end='2024-01-03')
+        assert table.column_names == ['request_id', 'input_text']
+        assert all(text.startswith('Teks berita') for text in table.column('input_text').to_pylist())
+        assert sorted(table.column('request_id').to_pylist()) == ['req-0', 'req-6']
+        
+        # Nothing left to archive
+        assert archiver.archive_older_than(days=30, pause=0) == 0
+        database.close()
+    
+    def test_failed_archive_keeps_predictions(self, tmp_path):
+        """Test retention never deletes aged predictions that were not archived"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        for i in range(6):
+            database.store_prediction(f'req-{i}', f'Teks berita nomor {i}', 'hoax', 0.9, 0.1)
+        database.store_feedback('Teks berita nomor 0', 'hoax', 'faktual')
+        with database._connection() as conn:
+            conn.execute("UPDATE predictions SET timestamp = '2024-01-01 08:00:00'")
+            conn.execute("UPDATE feedback SET timestamp = '2024-01-01 08:00:00'")
+        
+        archiver = PredictionArchiver(database, str(tmp_path / 'archive'), batch_size=3)
+        write_batch = archiver._write_batch
+        calls = []
+        
+        def fail_second_batch(rows, first_id, last_id):
+            calls.append(first_id)
+            if len(calls) > 1:
+                raise OSError('disk penuh')
+            write_batch(rows, first_id, last_id)
+        
+        job = RetentionJob(database, days=30, interval_seconds=3600, pause=0, archiver=archiver)
+        with patch.object(archiver, '_write_batch', side_effect=fail_second_batch):
+            job.run_once()
+        job.stop()
+        
+        # First batch archived, the rest kept for the next run; feedback still cleaned up
+        assert archiver.query().num_rows == 3
+        assert len(database.get_prediction_history()) == 3
+        assert database.get_feedback_history() == []
+        
+        job.run_once()
+        assert archiver.query().num_rows == 6
+        assert database.get_prediction_history() == []
+        database.close()
+
+class TestTrainingSetBuilder:
+    """Test the feedback-to-training-set pipeline"""
+    
+    def test_label_variants(self):
+        """Test label variants map to the model's class ids"""
+        assert normalize_label('hoaks') == normalize_label(' Hoax') == 0
+        assert normalize_label('faktual') == normalize_label('FAKTUAL') == 1
+        assert normalize_label('tidak_pasti') is None
+        assert normalize_label(None) is None
+    
+    def test_incremental_dedup_from_feedback_and_csv(self, tmp_path):
+        """Test rows are deduplicated by content and only new input is read again"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        database.store_feedback('Vaksin menyebabkan autisme', 'faktual', 'hoaks')
+        database.store_feedback('Vaksin  menyebabkan autisme ', 'faktual', 'hoax')
+        database.store_feedback('Berita tidak jelas', 'hoax', 'tidak_pasti')
+        
+        csv_path = tmp_path / 'news.csv'
+        csv_path.write_text(
+            'id,article_text,label\n'
+            '1,Gempa bumi terjadi di Jawa Barat,faktual\n'
+            '2,Vaksin menyebabkan autisme,hoaks\n'
+            '3,Gempa bumi terjadi di Jawa Barat,faktual\n',
+            encoding='utf-8'
+        )
+        
+        builder = TrainingSetBuilder(str(tmp_path / 'training_set'), batch_size=2)
+        assert builder.update(database, [str(csv_path)]) == \
+            {'added': 2, 'duplicates': 3, 'relabelled': 0, 'conflicts': 0, 'skipped': 1}
+        
+        table = builder.load()
+        assert sorted(zip(table.column('label_name').to_pylist(), table.column('source').to_pylist())) == \
+            [('faktual', 'news'), ('hoax', 'feedback')]
+        
+        # Nothing new: feedback is read from the last id, unchanged CSVs are skipped
+        assert builder.update(database, [str(csv_path)]) == \
+            {'added': 0, 'duplicates': 0, 'relabelled': 0, 'conflicts': 0, 'skipped': 0}
+        
+        database.store_feedback('Alien mendarat di Monas', 'faktual', 'hoaks')
+        builder = TrainingSetBuilder(str(tmp_path / 'training_set'))
+        assert builder.update(database, [str(csv_path)])['added'] == 1
+        assert builder.load().num_rows == 3
+        database.close()
+    
+    def test_feedback_relabels_known_text(self, tmp_path):
+        """Test later feedback supersedes an earlier label while CSV conflicts are only counted"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        database.store_feedback('Vaksin menyebabkan autisme', 'hoax', 'faktual')
+        
+        builder = TrainingSetBuilder(str(tmp_path / 'training_set'))
+        assert builder.update(database)['added'] == 1
+        
+        csv_path = tmp_path / 'news.csv'
+        csv_path.write_text('article_text,label\nVaksin menyebabkan autisme,faktual\n', encoding='utf-8')
+        database.store_feedback('Vaksin  menyebabkan autisme', 'faktual', 'hoaks')
+        
+        stats = builder.update(database, [str(csv_path)])
+        assert (stats['added'], stats['relabelled'], stats['conflicts']) == (1, 1, 1)
+        
+        table = builder.load(columns=['label_name', 'source'])
+        assert table.column_names == ['label_name', 'source']
+        assert table.to_pylist() == [{'label_name': 'hoax', 'source': 'feedback'}]
+        assert builder.dataset().count_rows() == 2
+        database.close()
+
+class TestJobQueue:
+    """Test the durable batch job queue"""
+    
+    @staticmethod
+    def _submit(queue, rows):
+        csv_content = 'text\n' + '\n'.join(f'Berita nomor {i}' for i in range(rows))
+        return queue.submit(io.BytesIO(csv_content.encode()), filename='test.csv')
+    
+    def test_claim_is_exclusive_and_ordered(self, tmp_path):
+        """Test each queued job is claimed by one worker, oldest first"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'))
+        first = self._submit(queue, 1)
+        second = self._submit(queue, 1)
+        
+        assert queue.claim('worker-a')['id'] == first
+        assert queue.claim('worker-b')['id'] == second
+        assert queue.claim('worker-c') is None
+        
+        assert queue.cancel(first)
+        assert queue.get(first)['status'] == 'cancelled'
+        assert not queue.heartbeat(first, 'worker-a')
+        database.close()
+    
+    def test_cleanup_finished_removes_old_jobs(self, tmp_path):
+        """Test finished jobs past retention are deleted with their files; others are kept"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'))
+        old, recent, running = (self._submit(queue, 1) for _ in range(3))
+        
+        assert queue.claim('worker-a')['id'] == old
+        assert queue.claim('worker-a')['id'] == recent
+        assert queue.claim('worker-a')['id'] == running
+        queue._finish(old, 'worker-a', 'completed')
+        queue._finish(recent, 'worker-a', 'failed', error='boom')
+        with database._connection() as conn:
+            conn.execute("UPDATE jobs SET finished_at = datetime('now', '-10 days') WHERE id = ?", (old,))
+            conn.execute("UPDATE jobs SET started_at = datetime('now', '-10 days') WHERE id = ?", (running,))
+        
+        assert not queue.delete(running)
+        
+        job = RetentionJob(database, days=None, job_queue=queue, job_days=7)
+        try:
+            assert job.run_once() == 0
+            assert job.get_status()['last_jobs_deleted'] == 1
+        finally:
+            job.stop()
+        
+        assert queue.get(old) is None
+        assert not (tmp_path / 'jobs' / old).exists()
+        assert queue.get(recent)['status'] == 'failed'
+        assert (tmp_path / 'jobs' / recent / 'input.csv').exists()
+        assert queue.get(running)['status'] == 'running'
+        database.close()
+    
+    def test_crashed_job_resumes_without_duplicates(self, tmp_path):
+        """Test a job taken over after a crash continues from its last committed chunk"""
+        class WorkerCrash(BaseException):
+            pass
+        
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'), stale_seconds=60)
+        job_id = self._submit(queue, 10)
+        calls = []
+        
+        def crashing_chunk(chunk):
+            calls.append(list(chunk.index))
+            if len(calls) == 3:
+                # Half-written output that was never committed
+                with open(queue.results_path(job_id), 'ab') as f:
+                    f.write(b'{"row": 5, "partial')
+                raise WorkerCrash()
+            return [{'row': idx + 1, 'text': text} for idx, text in zip(chunk.index, chunk['text'])]
+        
+        job = queue.claim('worker-a')
+        with pytest.raises(WorkerCrash):
+            queue.run_job(job, 'worker-a', crashing_chunk, chunk_size=2)
+        assert queue.get(job_id)['processed_rows'] == 4
+        
+        # Not taken over while the heartbeat is fresh
+        assert queue.claim('worker-b') is None
+        with database._connection() as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = '2000-01-01 00:00:00'")
+        
+        job = queue.claim('worker-b')
+        assert job['attempts'] == 2
+        queue.run_job(job, 'worker-b', crashing_chunk, chunk_size=2)
+        
+        assert calls[3] == [4, 5]
+        job = queue.get(job_id)
+        assert job['status'] == 'completed'
+        assert job['processed_rows'] == job['total_rows'] == 10
+        
+        lines = [json.loads(line) for line in b''.join(queue.iter_results(job_id)).decode().splitlines()]
+        assert [line['row'] for line in lines] == list(range(1, 11))
+        assert {line['type'] for line in lines} == {'result'}
+        
+        # The first worker's late writes are rejected
+        assert not queue.heartbeat(job_id, 'worker-a')
+        database.close()
+    
+    def test_job_failed_after_max_attempts(self, tmp_path):
+        """Test a job that keeps losing its worker is eventually failed"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        queue = JobQueue(database, str(tmp_path / 'jobs'), max_attempts=2)
+        job_id = self._submit(queue, 1)
+        
+        for worker_id in ('worker-a', 'worker-b'):
+            assert queue.claim(worker_id)['id'] == job_id
+            with database._connection() as conn:
+                conn.execute("UPDATE jobs SET heartbeat_at = '2000-01-01 00:00:00'")
+        
+        assert queue.claim('worker-c') is None
+        assert queue.get(job_id)['status'] == 'failed'
+        database.close()
+
+class TestRequestProfiler:
+    """Test opt-in request profiling"""
+    
+    def test_header_requires_admin_token(self, tmp_path):
+        """Test header-triggered profiles need the admin token and sampling is opt-in"""
+        profiler = RequestProfiler(str(tmp_path), admin_token='rahasia')
+        
+        assert profiler.select_mode({'X-Profile': 'cprofile', 'X-Admin-Token': 'rahasia'}) == 'cprofile'
+        assert profiler.select_mode({'X-Profile': 'cprofile', 'X-Admin-Token': 'salah'}) is None
+        assert profiler.select_mode({'X-Profile': 'unknown', 'X-Admin-Token': 'rahasia'}) is None
+        assert profiler.select_mode({}) is None
+        
+        assert RequestProfiler(str(tmp_path)).select_mode(
+            {'X-Profile': 'cprofile', 'X-Admin-Token': ''}) is None
+        assert RequestProfiler(str(tmp_path), sample_rate=1.0).select_mode({}) == 'cprofile'
+    
+    def test_cprofile_traces_rotated(self, tmp_path):
+        """Test cProfile traces are written and only the newest files kept"""
+        import pstats
+        
+        profiler = RequestProfiler(str(tmp_path), max_files=2)
+        for i in range(3):
+            handle = profiler.start('cprofile', f'predict-{i}')
+            sorted(range(1000))
+            profiler.stop(handle)
+            time.sleep(0.01)
+        
+        files = sorted(path.name for path in tmp_path.iterdir())
+        assert len(files) == 2
+        assert files[-1].endswith('predict-2.prof')
+        assert pstats.Stats(str(tmp_path / files[-1])).total_calls > 0
+    
+    def test_concurrent_cprofile_skipped(self, tmp_path):
+        """Test a second cProfile while one is running is skipped rather than failing"""
+        profiler = RequestProfiler(str(tmp_path))
+        
+        first = profiler.start('cprofile', 'predict-1')
+        assert profiler.start('cprofile', 'predict-2') is None
+        profiler.stop(first)
+        
+        second = profiler.start('cprofile', 'predict-3')
+        assert second is not None
+        profiler.stop(second)
+
+class TestSQLiteLimiterStorage:
+    """Test the shared SQLite rate limit storage"""
+    
+    def test_limits_shared_between_storages(self, tmp_path):
+        """Test two workers opening the same file count against one limit"""
+        from limits import parse
+        from limits.strategies import FixedWindowRateLimiter
+        
+        uri = f'sqlite:///{tmp_path}/ratelimits.db'
+        first = FixedWindowRateLimiter(SQLiteStorage(uri))
+        second = FixedWindowRateLimiter(SQLiteStorage(uri))
+        item = parse('3 per minute')
+        
+        assert [first.hit(item, 'predict', '10.0.0.1'), second.hit(item, 'predict', '10.0.0.1'),
+                first.hit(item, 'predict', '10.0.0.1'), second.hit(item, 'predict', '10.0.0.1')] == \
+            [True, True, True, False]
+        assert second.hit(item, 'predict', '10.0.0.2')
+        assert first.get_window_stats(item, 'predict', '10.0.0.1').reset_time > time.time()
+    
+    def test_expired_window_restarts(self, tmp_path):
+        """Test counters restart after their window and can be cleared"""
+        storage = SQLiteStorage(f'sqlite:///{tmp_path}/ratelimits.db', purge_every=2)
+        
+        assert storage.incr('key', expiry=0.05) == 1
+        assert storage.incr('key', expiry=0.05, amount=2) == 3
+        time.sleep(0.06)
+        assert storage.get('key') == 0
+        assert storage.incr('key', expiry=60) == 1
+        assert storage.get_expiry('key') > time.time() + 59
+        
+        storage.clear('key')
+        assert storage.get('key') == 0
+        assert storage.check()
+        assert storage._connection().execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+class TestModelManager:
+    """Test zero-downtime model swaps"""
+    
+    def _manager(self, tmp_path, loader=None):
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-1')
+        loader = loader or (lambda path: Mock(fallback=False))
+        manager = ModelManager(str(tmp_path), loader=loader, warmup_texts=[])
+        manager.load()
+        return manager
+    
+    def test_old_model_released_after_in_flight_requests(self, tmp_path):
+        """Test a swap serves new requests while the old model drains"""
+        manager = self._manager(tmp_path)
+        
+        with manager.acquire() as old:
+            (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-2')
+            manager.load()
+            
+            with manager.acquire() as new:
+                assert new.version != old.version
+            # Still usable by the request that started before the swap
+            assert old.detector is not None
+            assert manager.get_status()['draining'] == [{'version': old.version, 'in_flight': 1}]
+        
+        assert old.detector is None
+        assert manager.get_status()['draining'] == []
+        assert new.detector is not None
+    
+    def test_failed_reload_keeps_serving(self, tmp_path):
+        """Test load errors and fallback models never replace a working model"""
+        outcomes = [Mock(fallback=False), RuntimeError('adapter rusak'), Mock(fallback=True)]
+        
+        def load(path):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        manager = self._manager(tmp_path, loader=load)
+        version = manager.version
+        
+        with pytest.raises(RuntimeError, match='adapter rusak'):
+            manager.load()
+        with pytest.raises(RuntimeError):
+            manager.load()
+        
+        assert manager.version == version
+        assert manager.get_status()['last_error'] is not None
+        with manager.acquire() as model:
+            assert model.detector.fallback is False
+    
+    def test_watch_reloads_when_files_change(self, tmp_path):
+        """Test changed model files are picked up once they settle"""
+        manager = self._manager(tmp_path)
+        version = manager.version
+        manager.watch(interval=0.05)
+        
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-baru')
+        deadline = time.time() + 5
+        while manager.version == version and time.time() < deadline:
+            time.sleep(0.05)
+        manager.stop()
+        
+        assert manager.version == model_version(str(tmp_path))
+        assert manager.version != version
+    
+    def test_reload_request_reaches_other_processes(self, tmp_path):
+        """Test a reload requested from one manager is followed by every manager sharing the generation file"""
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-1')
+        generation_path = str(tmp_path / 'reload' / 'generation')
+        managers = [ModelManager(str(tmp_path), loader=lambda path: Mock(fallback=False),
+                                 warmup_texts=[], generation_path=generation_path)
+                    for _ in range(2)]
+        for manager in managers:
+            manager.load()
+        version = managers[0].version
+        # Only reload requests are followed, not file changes
+        managers[1].watch(interval=0.05, files=False)
+        
+        (tmp_path / 'adapter_model.bin').write_bytes(b'bobot-2')
+        assert managers[0].request_reload()
+        managers[0]._reload_thread.join(5)
+        deadline = time.time() + 5
+        while managers[1].version == version and time.time() < deadline:
+            time.sleep(0.05)
+        managers[1].stop()
+        
+        assert managers[0].version == managers[1].version == model_version(str(tmp_path))
+        assert managers[1].get_status()['generation'] == managers[0].get_status()['generation']
+    
+    def test_fallback_model_tagged_by_name(self, tmp_path):
+        """Test a fallback detector is not tagged with the hash of MODEL_PATH"""
+        manager = self._manager(tmp_path, loader=lambda path: Mock(fallback=True))
+        assert manager.version == 'fallback:distilbert-base-multilingual-cased'
+
+class TestJsonProvider:
+    """Test the NumPy-aware JSON providers"""
+    
+    @pytest.mark.parametrize('provider_class', [OrjsonProvider, NumpyJSONProvider])
+    def test_numpy_values_and_key_order(self, provider_class):
+        """Test NumPy scalars and arrays serialize natively and keys keep their order"""
+        provider = provider_class(app)
+        payload = {'label': 'hoax', 'confidence': np.float32(0.5), 'row': np.int64(3),
+                   'probabilities': np.array([0.25, 0.75])}
+        
+        with app.app_context():
+            response = provider.response(payload)
+        
+        assert response.mimetype == 'application/json'
+        assert list(json.loads(response.data).items()) == [
+            ('label', 'hoax'), ('confidence', 0.5), ('row', 3), ('probabilities', [0.25, 0.75])
+        ]
+        assert provider.loads(provider.dumps(payload))['row'] == 3
+    
+    def test_invalid_json_body_rejected(self, client):
+        """Test orjson decode errors are handled like the standard library's"""
+        response = client.post('/api/predict/batch', data='{rusak', content_type='application/json')
+        assert response.status_code == 400
+        assert json.loads(response.data) == {'error': 'No data provided'}
+    
+    def test_unknown_provider(self):
+        """Test unknown provider names are rejected"""
+        assert get_json_provider('stdlib') is NumpyJSONProvider
+        with pytest.raises(ValueError):
+            get_json_provider('ujson')
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight work"""
+    
+    def test_concurrent_callers_share_one_call(self):
+        """Test waiters get the leader's result or exception and nothing is cached"""
+        flight = SingleFlight('predict', timeout=5)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+        
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            if len(calls) == 2:
+                raise ValueError('model failed')
+            return {'label': 'hoax'}
+        
+        def run_group():
+            results = []
+            def call():
+                try:
+                    results.append(flight.do('key', compute))
+                except ValueError as e:
+                    results.append(e)
+            
+            threads = [threading.Thread(target=call) for _ in range(5)]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            time.sleep(0.05)
+            release.set()
+            for thread in threads:
+                thread.join()
+            started.clear()
+            release.clear()
+            return results
+        
+        results = run_group()
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        
+        errors = run_group()
+        assert len(calls) == 2
+        assert all(isinstance(error, ValueError) for error in errors)
+        assert flight.in_flight() == 0
+    
+    def test_waiter_timeout(self):
+        """Test a waiter stops waiting after the timeout while the leader continues"""
+        flight = SingleFlight('scrape', timeout=0.05)
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=('url', lambda: release.wait(5)))
+        leader.start()
+        time.sleep(0.02)
+        
+        with pytest.raises(SingleFlightTimeout):
+            flight.do('url', lambda: None)
+        release.set()
+        leader.join()
+    
+    def test_async_waiters_survive_cancelled_leader(self):
+        """Test the shared task keeps running when the first caller is cancelled"""
+        import asyncio
+        
+        async def scenario():
+            flight = AsyncSingleFlight('predict', timeout=5)
+            calls = []
+            
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return 'hoax'
+            
+            leader = asyncio.ensure_future(flight.do('key', compute))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(flight.do('key', compute)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            
+            return await asyncio.gather(*followers), calls, flight.in_flight()
+        
+        results, calls, in_flight = asyncio.run(scenario())
+        assert results == ['hoax'] * 3
+        assert len(calls) == 1
+        assert in_flight == 0
+    
+    def test_keys(self):
+        """Test equivalent texts and URLs map to the same key"""
+        assert text_key('Vaksin  Menyebabkan autisme ') == text_key('vaksin menyebabkan autisme')
+        assert text_key('vaksin') != text_key('vaksin aman')
+        assert canonicalize_url('HTTPS://Berita.Example:443/a?utm_source=wa&b=2&a=1#atas') == \
+            canonicalize_url('https://berita.example/a?a=1&b=2')
+
+class TestWriteBehindBuffer:
+    """Test batched background writes"""
+    
+    def test_queued_records_flushed_on_close(self, tmp_path):
+        """Test queued predictions and feedback are all written at shutdown"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        database.enable_write_behind(batch_size=10, flush_interval=60)
+        
+        for i in range(25):
+            assert database.queue_prediction(f'req-{i}', 'Teks berita untuk diuji',
+                                             'faktual', 0.7, 0.2)
+        assert database.queue_feedback('Teks berita', 'hoax', 'faktual')
+        
+        database.close()
+        
+        database = Database(str(tmp_path / 'hoax.db'))
+        stats = database.get_statistics()
+        assert stats['total_predictions'] == 25
+        assert stats['total_feedback'] == 1
+    
+    def test_flush_by_interval(self, tmp_path):
+        """Test a partial batch is written once the flush interval passes"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        buffer = database.enable_write_behind(batch_size=100, flush_interval=0.05)
+        
+        database.queue_prediction('req-1', 'Teks berita untuk diuji', 'hoax', 0.9, 0.1)
+        
+        deadline = time.time() + 5
+        while buffer.get_stats()['written'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        
+        assert database.get_statistics()['total_predictions'] == 1
+        database.close()
+    
+    def test_full_queue_falls_back_to_direct_write(self, tmp_path):
+        """Test producers fall back to a synchronous write when the buffer stays full"""
+        database = Database(str(tmp_path / 'hoax.db'))
+        buffer = database.enable_write_behind(max_queue=1, put_timeout=0.01)
+        
+        with patch.object(buffer, 'put', return_value=False):
+            assert database.queue_prediction('req-1', 'Teks berita untuk diuji',
+                                             'hoax', 0.9, 0.1)
+        
+        assert database.get_statistics()['total_predictions'] == 1
+        database.close()
+
+class TestExtractionPool:
+    """Test out-of-process HTML extraction"""
+    
+    def test_peak_rss_units(self):
+        """Test peak RSS is reported in KB on macOS too, and skipped without resource"""
+        usage = Mock(ru_maxrss=40 * 1024 * 1024)
+        with patch('backend.utils.extraction_pool.sys.platform', 'darwin'), \
+             patch('backend.utils.extraction_pool.resource.getrusage', return_value=usage):
+            assert peak_rss_kb() == 40 * 1024
+        
+        with patch('backend.utils.extraction_pool.resource', None):
+            assert peak_rss_kb() is None
+    
+    def test_extract_returns_text(self):
+        """Test extraction runs in a worker and returns cleaned text"""
+        pool = ExtractionPool(parse_article_html, workers=1, start_method='fork')
+        try:
+            text = pool.extract(SAMPLE_ARTICLE_HTML)
+            assert 'subsidi energi' in text
+            assert pool.get_stats()['tasks'] == 1
+        finally:
+            pool.shutdown()
+    
+    def test_workers_recycled_after_max_tasks(self):
+        """Test workers are replaced after max_tasks_per_worker tasks"""
+        pool = ExtractionPool(parse_article_html, workers=1, max_tasks_per_worker=2,
+                              start_method='fork')
+        try:
+            for _ in range(4):
+                pool.extract(SAMPLE_ARTICLE_HTML)
+            assert pool.get_stats()['recycled'] == 2
+        finally:
+            pool.shutdown()
+    
+    def test_timeout_kills_worker(self):
+        """Test a stuck task times out and the pool keeps its capacity"""
+        pool = ExtractionPool(_slow_extract, workers=1, task_timeout=0.2,
+                              start_method='fork')
+        try:
+            with pytest.raises(ExtractionTimeout):
+                pool.extract(SAMPLE_ARTICLE_HTML)
+            
+            stats = pool.get_stats()
+            assert stats['timeouts'] == 1
+            assert stats['idle_workers'] == 1
+        finally:
+            pool.shutdown()
+
 if __name__ == '__main__':
     pytest.main([__file__]) 
\ No newline at end of file